@@ -0,0 +1,199 @@
+"""Compare the default and lean cache profiles on synthetic large guilds.
+
+Each profile runs in its own process so RSS numbers are not polluted by the
+other run. A synthetic gateway feeds READY, GUILD_CREATE and member chunk
+payloads straight into discord.py's ConnectionState, so the numbers cover the
+library's parsing and caching work without any network time.
+
+Usage: python benchmarks/bench_cache_profile.py [--guilds 5] [--members 50000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOT_ID = 1000
+CHUNK_SIZE = 1000
+
+
+def user_payload(user_id):
+    return {
+        'id': str(user_id),
+        'username': f'user{user_id}',
+        'discriminator': '0',
+        'global_name': None,
+        'avatar': None,
+    }
+
+
+def member_payload(user_id, guild_id):
+    return {
+        'user': user_payload(user_id),
+        'roles': [str(guild_id + 1 + user_id % 10)],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+    }
+
+
+def guild_payload(guild_id, member_count):
+    roles = [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+              'hoist': False, 'managed': False, 'mentionable': False}]
+    for i in range(1, 11):
+        roles.append({'id': str(guild_id + i), 'name': f'role{i}', 'permissions': '0', 'position': i, 'color': 0,
+                      'hoist': False, 'managed': False, 'mentionable': False})
+    return {
+        'id': str(guild_id),
+        'name': f'guild{guild_id}',
+        'owner_id': str(BOT_ID + 1),
+        'member_count': member_count,
+        'large': True,
+        'unavailable': False,
+        'features': [],
+        'roles': roles,
+        'emojis': [],
+        'stickers': [],
+        'channels': [],
+        'threads': [],
+        'voice_states': [],
+        'presences': [],
+        # Large guilds only send the bot's own member in GUILD_CREATE
+        'members': [member_payload(BOT_ID, guild_id)],
+    }
+
+
+class SyntheticGateway:
+    """Stands in for the gateway websocket and answers member chunk requests"""
+
+    def __init__(self, state, member_count):
+        self.state = state
+        self.member_count = member_count
+        self.chunk_requests = 0
+
+    async def request_chunks(self, guild_id, query=None, *, limit=0, user_ids=None, presences=False, nonce=None):
+        self.chunk_requests += 1
+        asyncio.get_running_loop().create_task(self.send_chunks(guild_id, nonce))
+
+    async def send_chunks(self, guild_id, nonce):
+        # member_count includes the bot itself
+        user_ids = [BOT_ID, *range(BOT_ID + 2, BOT_ID + 1 + self.member_count)]
+        chunk_count = -(-len(user_ids) // CHUNK_SIZE)
+        for index in range(chunk_count):
+            chunk = user_ids[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+            self.state.parse_guild_members_chunk({
+                'guild_id': str(guild_id),
+                'members': [member_payload(user_id, guild_id) for user_id in chunk],
+                'chunk_index': index,
+                'chunk_count': chunk_count,
+                'nonce': nonce,
+            })
+            # Real chunks arrive as separate gateway frames
+            await asyncio.sleep(0)
+
+
+async def run_profile(profile, guild_count, member_count):
+    os.environ['CACHE_PROFILE'] = profile
+
+    import discord
+    import psutil
+    from member_cache import client_cache_options, ensure_chunked
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    intents.reactions = True
+
+    ready = asyncio.Event()
+
+    class BenchClient(discord.Client):
+        async def on_ready(self):
+            ready.set()
+
+    client = BenchClient(intents=intents, guild_ready_timeout=0.1, **client_cache_options())
+    await client._async_setup_hook()
+    state = client._connection
+    gateway = SyntheticGateway(state, member_count)
+    client.ws = gateway
+
+    guild_ids = [(i + 1) * 1_000_000 for i in range(guild_count)]
+    guilds = [guild_payload(guild_id, member_count) for guild_id in guild_ids]
+
+    process = psutil.Process()
+    gc.collect()
+    rss_before = process.memory_info().rss
+
+    start_time = time.perf_counter()
+    state.parse_ready({
+        'v': 10,
+        'user': user_payload(BOT_ID) | {'bot': True},
+        'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in guild_ids],
+        'session_id': 'bench',
+        'resume_gateway_url': 'wss://gateway.invalid',
+        'application': {'id': str(BOT_ID), 'flags': 0},
+    })
+    for data in guilds:
+        state.parse_guild_create(data)
+    await ready.wait()
+    # guild_ready_timeout is idle waiting time that both profiles pay equally
+    ready_time = time.perf_counter() - start_time - state.guild_ready_timeout
+
+    gc.collect()
+    rss_ready = process.memory_info().rss
+
+    # First use of a feature that needs full membership in one guild
+    guild = client.get_guild(guild_ids[0])
+    start_time = time.perf_counter()
+    await ensure_chunked(guild)
+    first_chunk_time = time.perf_counter() - start_time
+
+    gc.collect()
+    rss_after_chunk = process.memory_info().rss
+
+    return {
+        'profile': profile,
+        'guilds': guild_count,
+        'members_per_guild': member_count,
+        'ready_ms': round(ready_time * 1000, 1),
+        'rss_ready_mb': round(rss_ready / 2**20, 1),
+        'rss_growth_mb': round((rss_ready - rss_before) / 2**20, 1),
+        'cached_members': sum(len(g.members) for g in client.guilds) - len(guild.members),
+        'first_chunk_ms': round(first_chunk_time * 1000, 1),
+        'rss_after_first_chunk_mb': round(rss_after_chunk / 2**20, 1),
+        'message_cache': state.max_messages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--members', type=int, default=50_000)
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        result = asyncio.run(run_profile(args.run, args.guilds, args.members))
+        print(json.dumps(result))
+        return
+
+    for profile in ('default', 'lean'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--run', profile, '--guilds', str(args.guilds), '--members', str(args.members)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output)
+        print(f"{result['profile']:>8}: READY->ready {result['ready_ms']}ms, "
+              f"RSS {result['rss_ready_mb']}MB (+{result['rss_growth_mb']}MB), "
+              f"cached members (excluding first guild) {result['cached_members']}, "
+              f"first chunk {result['first_chunk_ms']}ms -> RSS {result['rss_after_first_chunk_mb']}MB, "
+              f"max_messages {result['message_cache']}")
+
+
+if __name__ == '__main__':
+    main()
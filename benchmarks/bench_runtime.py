@@ -0,0 +1,336 @@
+"""Compare the default and fast runtime profiles on replayed gateway traffic.
+
+Gateway frames are fed as raw JSON text to discord.py's own websocket handler
+(DiscordWebSocket.received_message), so each event pays for JSON decoding,
+ConnectionState parsing and one event loop task per listener, just like live
+traffic minus the socket and decompression, which cost the same in every
+profile. Each profile runs in its own process on the event loop and JSON codec
+runtime.run() picks for it. The 'stdlib' baseline forces the json module, since
+discord.py already decodes with orjson on its own whenever it is installed.
+
+By default the traffic is synthetic: a mix of messages, reactions, typing,
+presence updates and member joins in a few guilds. A capture of real traffic can
+be replayed instead with --capture, one gateway payload ({"op", "t", "s", "d"})
+per line, for example collected from an on_socket_raw_receive listener.
+
+Usage: python benchmarks/bench_runtime.py [--events 50000] [--rounds 5] [--capture frames.ndjson]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOT_ID = 1000
+GUILD_COUNT = 3
+MEMBER_COUNT = 2000
+PROFILES = ('stdlib', 'default', 'fast')
+
+# Share of each event in the synthetic traffic
+EVENT_MIX = {
+    'MESSAGE_CREATE': 40,
+    'MESSAGE_REACTION_ADD': 20,
+    'MESSAGE_REACTION_REMOVE': 10,
+    'TYPING_START': 15,
+    'PRESENCE_UPDATE': 10,
+    'GUILD_MEMBER_ADD': 5,
+}
+
+
+def user_payload(user_id):
+    return {
+        'id': str(user_id),
+        'username': f'user{user_id}',
+        'discriminator': '0',
+        'global_name': f'User {user_id}',
+        'avatar': None,
+    }
+
+
+def member_payload(user_id, guild_id):
+    return {
+        'user': user_payload(user_id),
+        'roles': [str(guild_id + 1 + user_id % 10)],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+    }
+
+
+def channel_id(guild_id):
+    return guild_id + 100
+
+
+def guild_payload(guild_id):
+    roles = [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+              'hoist': False, 'managed': False, 'mentionable': False}]
+    for i in range(1, 11):
+        roles.append({'id': str(guild_id + i), 'name': f'role{i}', 'permissions': '0', 'position': i, 'color': 0,
+                      'hoist': False, 'managed': False, 'mentionable': False})
+    return {
+        'id': str(guild_id),
+        'name': f'guild{guild_id}',
+        'owner_id': str(BOT_ID + 1),
+        'member_count': MEMBER_COUNT,
+        'large': False,
+        'unavailable': False,
+        'features': [],
+        'roles': roles,
+        'emojis': [],
+        'stickers': [],
+        'channels': [{'id': str(channel_id(guild_id)), 'type': 0, 'name': 'general', 'position': 0,
+                      'permission_overwrites': [], 'nsfw': False, 'parent_id': None}],
+        'threads': [],
+        'voice_states': [],
+        'presences': [],
+        'members': [member_payload(user_id, guild_id) for user_id in range(BOT_ID, BOT_ID + MEMBER_COUNT)],
+    }
+
+
+def event_payload(event, rng, guild_id, message_ids, joined):
+    user_id = rng.randrange(BOT_ID + 1, BOT_ID + MEMBER_COUNT)
+    if event == 'MESSAGE_CREATE':
+        message_id = 10**15 + len(message_ids)
+        message_ids.append(message_id)
+        return {
+            'id': str(message_id),
+            'channel_id': str(channel_id(guild_id)),
+            'guild_id': str(guild_id),
+            'author': user_payload(user_id),
+            'member': {key: value for key, value in member_payload(user_id, guild_id).items() if key != 'user'},
+            'content': 'hello there ' * rng.randrange(1, 8),
+            'timestamp': '2024-01-01T00:00:00+00:00',
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+            'flags': 0,
+            'components': [],
+        }
+
+    if event in ('MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE'):
+        data = {
+            'user_id': str(user_id),
+            'channel_id': str(channel_id(guild_id)),
+            'message_id': str(rng.choice(message_ids) if message_ids else 10**15),
+            'guild_id': str(guild_id),
+            'emoji': {'id': None, 'name': rng.choice(['✅', '🎮', '👍'])},
+            'burst': False,
+            'type': 0,
+        }
+        if event == 'MESSAGE_REACTION_ADD':
+            data['member'] = member_payload(user_id, guild_id)
+        return data
+
+    if event == 'TYPING_START':
+        return {
+            'user_id': str(user_id),
+            'channel_id': str(channel_id(guild_id)),
+            'guild_id': str(guild_id),
+            'timestamp': 1704067200,
+        }
+
+    if event == 'PRESENCE_UPDATE':
+        return {
+            'user': {'id': str(user_id)},
+            'guild_id': str(guild_id),
+            'status': rng.choice(['online', 'idle', 'dnd']),
+            'activities': [{'name': 'a game', 'type': 0, 'created_at': 1704067200000}],
+            'client_status': {'desktop': 'online'},
+        }
+
+    # GUILD_MEMBER_ADD, new users so the member cache grows like it does live
+    joined[0] += 1
+    return member_payload(BOT_ID + MEMBER_COUNT + joined[0], guild_id) | {'guild_id': str(guild_id)}
+
+
+def synthetic_frames(count, seed=0):
+    """Generate gateway dispatch frames as JSON text"""
+    rng = random.Random(seed)
+    events = rng.choices(list(EVENT_MIX), weights=list(EVENT_MIX.values()), k=count)
+    guild_ids = [(i + 1) * 1_000_000 for i in range(GUILD_COUNT)]
+    message_ids = []
+    joined = [0]
+    frames = []
+    for seq, event in enumerate(events, start=1):
+        data = event_payload(event, rng, rng.choice(guild_ids), message_ids, joined)
+        frames.append(json.dumps({'op': 0, 't': event, 's': seq, 'd': data}))
+    return frames
+
+
+def load_capture(path):
+    """Read captured gateway payloads, one JSON object per line"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def ready_frames():
+    """READY and GUILD_CREATE frames that set up the synthetic guilds"""
+    guild_ids = [(i + 1) * 1_000_000 for i in range(GUILD_COUNT)]
+    frames = [json.dumps({'op': 0, 't': 'READY', 's': 0, 'd': {
+        'v': 10,
+        'user': user_payload(BOT_ID) | {'bot': True},
+        'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in guild_ids],
+        'session_id': 'bench',
+        'resume_gateway_url': 'wss://gateway.invalid',
+        'application': {'id': str(BOT_ID), 'flags': 0},
+    }})]
+    for guild_id in guild_ids:
+        frames.append(json.dumps({'op': 0, 't': 'GUILD_CREATE', 's': 0, 'd': guild_payload(guild_id)}))
+    return frames
+
+
+async def replay_round(frames):
+    import discord
+    from discord.gateway import DiscordWebSocket
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    intents.presences = True
+
+    ready = asyncio.Event()
+    handled = [0]
+
+    class BenchClient(discord.Client):
+        async def on_ready(self):
+            ready.set()
+
+        # Light handlers, so every event schedules a task on the loop like the bot's listeners do
+        async def on_message(self, message):
+            handled[0] += 1
+
+        async def on_raw_reaction_add(self, payload):
+            handled[0] += 1
+
+        async def on_raw_reaction_remove(self, payload):
+            handled[0] += 1
+
+        async def on_typing(self, channel, user, when):
+            handled[0] += 1
+
+        async def on_presence_update(self, before, after):
+            handled[0] += 1
+
+        async def on_member_join(self, member):
+            handled[0] += 1
+
+    client = BenchClient(intents=intents, guild_ready_timeout=0.1, chunk_guilds_at_startup=False)
+    await client._async_setup_hook()
+
+    ws = DiscordWebSocket(None, loop=asyncio.get_running_loop())
+    ws._connection = client._connection
+    ws._discord_parsers = client._connection.parsers
+    ws._dispatch = client.dispatch
+    ws.shard_id = None
+    ws.token = 'bench'
+
+    for frame in ready_frames():
+        await ws.received_message(frame)
+    await ready.wait()
+
+    gc.collect()
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+    for frame in frames:
+        await ws.received_message(frame)
+        # The gateway awaits the socket between frames, which lets handler tasks run
+        await asyncio.sleep(0)
+    while len(asyncio.all_tasks()) > 1:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start_time
+    cpu = time.process_time() - start_cpu
+
+    await client.close()
+    return elapsed, cpu, handled[0]
+
+
+async def replay(frames, rounds):
+    # A fresh client per round, so every round starts from the same cache state
+    return [await replay_round(frames) for _ in range(rounds)]
+
+
+def run_profile(profile, frames_path, rounds):
+    os.environ['RUNTIME_PROFILE'] = 'fast' if profile == 'fast' else 'default'
+
+    import discord
+    import runtime
+
+    if profile == 'stdlib':
+        runtime.install_json_codec('json', json.loads, lambda obj: json.dumps(obj, separators=(',', ':'), ensure_ascii=True))
+        runtime.active_runtime['json'] = 'json'
+
+    frames = load_capture(frames_path)
+    results = runtime.run(replay(frames, rounds))
+    # Best rounds, the others mostly measure noise from the rest of the machine
+    elapsed = min(result[0] for result in results)
+    cpu = min(result[1] for result in results)
+    handled = results[0][2]
+    return {
+        'profile': profile,
+        'loop': runtime.active_runtime['loop'],
+        'json': runtime.active_runtime['json'],
+        'events': len(frames),
+        'handled': handled,
+        'events_per_sec': round(len(frames) / elapsed),
+        'wall_ms': round(elapsed * 1000, 1),
+        'cpu_ms': round(cpu * 1000, 1),
+        'cpu_us_per_event': round(cpu * 1e6 / len(frames), 2),
+        'discord_py': discord.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=50_000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--capture', help='replay gateway payloads from this file instead of synthetic traffic')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--frames', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_profile(args.run, args.frames, args.rounds)))
+        return
+
+    if args.capture:
+        frames_path = args.capture
+    else:
+        # Written once so every profile replays exactly the same bytes
+        frames_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bench_runtime_frames.ndjson')
+        with open(frames_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(synthetic_frames(args.events)) + '\n')
+
+    try:
+        baseline = None
+        for profile in PROFILES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--run', profile, '--frames', frames_path, '--rounds', str(args.rounds)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+            baseline = baseline or result
+            print(f"{result['profile']:>8} ({result['loop']}, {result['json']}): "
+                  f"{result['events_per_sec']} events/s ({result['events_per_sec'] / baseline['events_per_sec']:.2f}x), "
+                  f"CPU {result['cpu_ms']}ms, {result['cpu_us_per_event']}us/event "
+                  f"({result['cpu_ms'] / baseline['cpu_ms']:.2f}x), "
+                  f"{result['events']} frames, {result['handled']} handler calls")
+    finally:
+        if not args.capture:
+            os.remove(frames_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Memory and lookup time of per-guild settings at 100k guilds.
+
+Compares the previous layout (a fresh dict per guild, materialized on first
+lookup) with the slotted settings records in config.py. Three scenarios:
+every guild looked up once by a reaction handler without being configured,
+10% of guilds configured with ten game roles, and the hot-path lookup done
+by the reaction handlers.
+
+Usage: python benchmarks/bench_settings.py [--guilds 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from config import GAME_ROLE_CONFIG
+
+EMOJIS = list(GAME_ROLE_CONFIG['default_games'])
+
+
+class LegacySettings:
+    """The dict-per-guild layout config.py used before the slotted records"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, guild_id):
+        if guild_id not in self.data:
+            self.data[guild_id] = {
+                'enabled': False,
+                'channel_id': None,
+                'message_id': None,
+                'game_roles': {},
+                'max_selections': GAME_ROLE_CONFIG['max_selections'],
+            }
+        return self.data[guild_id]
+
+    def add_game_role(self, guild_id, emoji, role_id):
+        self.get(guild_id)['game_roles'][emoji] = role_id
+
+    def is_game_reaction(self, guild_id, message_id, emoji):
+        settings = self.get(guild_id)
+        return settings['enabled'] and message_id == settings['message_id'] and emoji in settings['game_roles']
+
+
+class SlottedSettings:
+    """The slotted records in config.py"""
+
+    def __init__(self):
+        config.GAME_ROLE_DATA.clear()
+
+    def get(self, guild_id):
+        return config.get_game_role_settings(guild_id)
+
+    def add_game_role(self, guild_id, emoji, role_id):
+        config.add_game_role(guild_id, emoji, role_id)
+
+    def is_game_reaction(self, guild_id, message_id, emoji):
+        settings = config.get_game_role_settings(guild_id)
+        return settings.enabled and message_id == settings.message_id and emoji in settings.game_roles
+
+
+def measure(store_class, guild_count):
+    results = {}
+
+    tracemalloc.start()
+    store = store_class()
+    for guild_id in range(guild_count):
+        store.get(guild_id)
+    results['untouched_mb'] = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = store_class()
+    for guild_id in range(0, guild_count, 10):
+        for index, emoji in enumerate(EMOJIS):
+            # Emoji strings arrive as fresh objects from each gateway payload
+            store.add_game_role(guild_id, ''.join(emoji), guild_id * 100 + index)
+    for guild_id in range(guild_count):
+        store.get(guild_id)
+    results['configured_mb'] = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    lookups = 200_000
+    emoji = EMOJIS[-1]
+    guild_ids = [(i * 7919) % guild_count for i in range(lookups)]
+    timer = timeit.Timer(lambda: [store.is_game_reaction(guild_id, None, emoji) for guild_id in guild_ids])
+    results['lookup_ns'] = min(timer.repeat(repeat=5, number=1)) / lookups * 1e9
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=100_000)
+    args = parser.parse_args()
+
+    for name, store_class in (('dict', LegacySettings), ('slotted', SlottedSettings)):
+        results = measure(store_class, args.guilds)
+        print(f"{name:>8}: all guilds looked up {results['untouched_mb']:.1f}MB, "
+              f"10% configured {results['configured_mb']:.1f}MB, "
+              f"reaction lookup {results['lookup_ns']:.0f}ns")
+
+
+if __name__ == '__main__':
+    main()
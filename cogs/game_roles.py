@@ -0,0 +1,402 @@
+import discord
+from discord.ext import commands
+from config import BOT_CONFIG, COOLDOWN_CONFIG, GAME_ROLE_CONFIG, get_verification_settings, get_game_role_settings, update_game_role_settings, add_game_role, remove_game_role
+from panels import publish_panel
+from role_picker import build_picker_view
+from role_stats import role_counters
+from overload import overload, SIMPLE_EMBEDS
+from role_expiry import role_expiry, parse_duration, format_duration
+import logging
+
+logger = logging.getLogger('discord_bot.commands')
+
+class GameRoles(commands.Cog):
+    """Game role selection commands"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    def build_panel(self, guild, settings, picker=False):
+        """Build the game role selection embed and the emojis to seed on it"""
+        game_embed = discord.Embed(
+            title=GAME_ROLE_CONFIG['embed_title'],
+            description=GAME_ROLE_CONFIG['embed_description'],
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        # Add game role options
+        role_list = []
+        emoji_list = []
+        for emoji, role_id in settings.game_roles.items():
+            role = guild.get_role(role_id)
+            if role:
+                role_list.append(f"{emoji} - {role.name}")
+                emoji_list.append(emoji)
+        
+        if role_list:
+            game_embed.add_field(
+                name="Available Game Roles",
+                value="\n".join(role_list),
+                inline=False
+            )
+            if picker:
+                instructions = f"Pick your games from the menu below, your game roles will match your pick!\nMaximum {settings.max_selections} selections allowed."
+            else:
+                instructions = f"React with the emojis below to get/remove game roles!\nMaximum {settings.max_selections} selections allowed."
+            game_embed.add_field(
+                name="Instructions",
+                value=instructions,
+                inline=False
+            )
+            game_embed.set_footer(text="Game Role Selection | Click to join gaming communities!")
+        
+        # Select menu panels have no reactions to seed
+        return game_embed, [] if picker else emoji_list
+    
+    async def publish(self, ctx, channels, picker=False):
+        """Publish the game role panel to channels and report the outcome"""
+        guild_id = ctx.guild.id
+        settings = get_game_role_settings(guild_id)
+        game_embed, emoji_list = self.build_panel(ctx.guild, settings, picker)
+        view = build_picker_view(ctx.guild, settings) if picker else None
+        kind = 'select menu panel' if picker else 'panel'
+        
+        if picker and view is None:
+            await ctx.send("❌ None of the configured game roles exist anymore! Use `!addgamerole <emoji> @role` to add game roles first.")
+            return
+        
+        progress = await ctx.send(f"⏳ Publishing game role {kind} to {len(channels)} channel(s)...")
+        
+        targets = [(channel, settings.panel_in(channel.id, picker)) for channel in channels]
+        results, elapsed = await publish_panel(targets, game_embed, emoji_list, view)
+        
+        # Re-read the settings, other panels may have changed while publishing
+        field = 'picker_panels' if picker else 'panels'
+        published = {result.channel.id: result.message.id for result in results if result.message}
+        panels = tuple(
+            (channel_id, message_id) for channel_id, message_id in getattr(get_game_role_settings(guild_id), field)
+            if channel_id not in published
+        ) + tuple(published.items())
+        update_game_role_settings(guild_id, enabled=True, **{field: panels})
+        
+        lines = []
+        for result in results:
+            if result.error is not None:
+                if isinstance(result.error, discord.Forbidden):
+                    lines.append(f"{result.channel.mention}: ❌ Missing permission to send messages or add reactions")
+                else:
+                    lines.append(f"{result.channel.mention}: ❌ {result.error}")
+            else:
+                lines.append(f"{result.channel.mention}: ✅ {result.action.capitalize()}")
+        
+        failed = any(result.error is not None for result in results)
+        embed = discord.Embed(
+            title="✅ Game Role Selection Setup Complete!" if not failed else "⚠️ Game Role Selection Partially Set Up",
+            color=0x00ff00 if not failed else 0xff9900
+        )
+        embed.add_field(name="Channels", value="\n".join(lines)[:1024], inline=False)
+        embed.add_field(name="Available Roles", value=f"{len(emoji_list)} game roles", inline=True)
+        embed.add_field(name="Max Selections", value=settings.max_selections, inline=True)
+        embed.add_field(name="Elapsed", value=f"{elapsed}ms", inline=True)
+        
+        await progress.edit(content=None, embed=embed)
+        logger.info(f'Game role {kind} published to {len(channels)} channel(s) by {ctx.author} in {ctx.guild.name} in {elapsed}ms')
+    
+    @commands.command(name='setupgameroles', aliases=['gamesetup'], help='Setup game role selection in one or more channels (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    async def setup_game_roles(self, ctx, channels: commands.Greedy[discord.TextChannel] = None):
+        """Setup the game role selection system"""
+        if not channels:
+            channels = [ctx.channel]
+        
+        settings = get_game_role_settings(ctx.guild.id)
+        
+        # Check if there are any configured game roles
+        if not settings.game_roles:
+            await ctx.send("❌ No game roles configured! Use `!addgamerole <emoji> @role` to add game roles first.")
+            return
+        
+        # Channels that already have a panel get it edited in place
+        await self.publish(ctx, list(dict.fromkeys(channels)))
+    
+    @commands.command(name='setupgamepicker', aliases=['gamepicker'], help='Setup a select menu game role picker in one or more channels (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    async def setup_game_picker(self, ctx, channels: commands.Greedy[discord.TextChannel] = None):
+        """Setup game role selection with a select menu instead of reactions"""
+        if not channels:
+            channels = [ctx.channel]
+        
+        settings = get_game_role_settings(ctx.guild.id)
+        
+        if not settings.game_roles:
+            await ctx.send("❌ No game roles configured! Use `!addgamerole <emoji> @role` to add game roles first.")
+            return
+        
+        await self.publish(ctx, list(dict.fromkeys(channels)), picker=True)
+    
+    @commands.command(name='refreshgameroles', aliases=['gamerefresh'], help='Update all game role panels in place (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    async def refresh_game_roles(self, ctx):
+        """Update every published game role panel after the configuration changed"""
+        settings = get_game_role_settings(ctx.guild.id)
+        
+        published = False
+        for picker, panels in ((False, settings.panels), (True, settings.picker_panels)):
+            channels = [ctx.guild.get_channel(channel_id) for channel_id, _ in panels]
+            channels = [channel for channel in channels if channel]
+            if channels:
+                await self.publish(ctx, channels, picker)
+                published = True
+        
+        if not published:
+            await ctx.send("❌ No game role panels published! Use `!setupgameroles [#channels...]` or `!setupgamepicker [#channels...]` first.")
+    
+    @commands.command(name='addgamerole', help='Add a game role (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def add_game_role_cmd(self, ctx, emoji: str, role: discord.Role):
+        """Add a game role mapping"""
+        guild_id = ctx.guild.id
+        
+        # Add the game role mapping
+        add_game_role(guild_id, emoji, role.id)
+        role_counters.track(ctx.guild, role.id)
+        
+        embed = discord.Embed(
+            title="✅ Game Role Added",
+            description=f"Added game role: {emoji} → {role.mention}",
+            color=BOT_CONFIG['embed_color']
+        )
+        embed.add_field(name="Next Step", value="Use `!setupgameroles` to create the selection message, or `!refreshgameroles` to update existing ones", inline=False)
+        await ctx.send(embed=embed)
+        logger.info(f'Game role {emoji} → {role.name} added by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='removegamerole', help='Remove a game role (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def remove_game_role_cmd(self, ctx, emoji: str):
+        """Remove a game role mapping"""
+        guild_id = ctx.guild.id
+        settings = get_game_role_settings(guild_id)
+        
+        if emoji not in settings.game_roles:
+            await ctx.send(f"❌ Game role with emoji {emoji} not found!")
+            return
+        
+        # Get role info before removing
+        role_id = settings.game_roles[emoji]
+        role = ctx.guild.get_role(role_id)
+        role_name = role.name if role else "Unknown Role"
+        
+        # Remove the game role mapping, its duration goes with it
+        remove_game_role(guild_id, emoji)
+        await role_expiry.cancel_role(role_id)
+        
+        embed = discord.Embed(
+            title="🗑️ Game Role Removed",
+            description=f"Removed game role: {emoji} → {role_name}",
+            color=0xff9900
+        )
+        await ctx.send(embed=embed)
+        logger.info(f'Game role {emoji} → {role_name} removed by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='setgameroleexpiry', aliases=['gameroleexpiry'], help='Make a game role expire some time after it is picked, e.g. 6h, or off (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def set_game_role_expiry(self, ctx, emoji: str, duration: str):
+        """Set how long a game role is kept after being picked"""
+        guild_id = ctx.guild.id
+        settings = get_game_role_settings(guild_id)
+        
+        if emoji not in settings.game_roles:
+            await ctx.send(f"❌ Game role with emoji {emoji} not found!")
+            return
+        
+        role_id = settings.game_roles[emoji]
+        role = ctx.guild.get_role(role_id)
+        role_name = role.name if role else "Unknown Role"
+        
+        if duration.lower() == 'off':
+            seconds = None
+        else:
+            try:
+                seconds = parse_duration(duration)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+        
+        role_ttls = tuple((ttl_role_id, ttl) for ttl_role_id, ttl in settings.role_ttls if ttl_role_id != role_id)
+        if seconds is not None:
+            role_ttls += ((role_id, seconds),)
+        update_game_role_settings(guild_id, role_ttls=role_ttls)
+        
+        # Scheduled expiries outlive restarts on their own, turning the duration off has to drop them
+        cancelled = await role_expiry.cancel_role(role_id) if seconds is None else 0
+        
+        embed = discord.Embed(
+            title="⏰ Game Role Expiry Set",
+            description=(f"{emoji} → **{role_name}** now expires {format_duration(seconds)} after being picked"
+                         if seconds is not None else f"{emoji} → **{role_name}** no longer expires"),
+            color=BOT_CONFIG['embed_color']
+        )
+        if seconds is not None:
+            embed.add_field(name="Note", value="Applies to roles picked from now on, members whose role is already scheduled to expire keep that time", inline=False)
+        else:
+            embed.add_field(name="Cancelled", value=f"{cancelled} scheduled expiries", inline=True)
+        await ctx.send(embed=embed)
+        logger.info(f'Game role {emoji} → {role_name} expiry set to {duration} by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='listgameroles', aliases=['gameroles'], help='List all configured game roles')
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def list_game_roles(self, ctx):
+        """List all configured game roles"""
+        guild_id = ctx.guild.id
+        settings = get_game_role_settings(guild_id)
+        
+        embed = discord.Embed(
+            title="🎮 Game Roles Configuration",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        # Status
+        status = "✅ Enabled" if settings.enabled else "❌ Disabled"
+        embed.add_field(name="Status", value=status, inline=True)
+        embed.add_field(name="Max Selections", value=settings.max_selections, inline=True)
+        
+        # List configured roles, with member counts once they have been seeded
+        if settings.game_roles:
+            counts = role_counters.counts(ctx.guild) or {}
+            role_list = []
+            for emoji, role_id in settings.game_roles.items():
+                role = ctx.guild.get_role(role_id)
+                details = [f"{counts[role_id]} members"] if role_id in counts else []
+                if settings.ttl(role_id):
+                    details.append(f"expires after {format_duration(settings.ttl(role_id))}")
+                if role and details:
+                    role_list.append(f"{emoji} → {role.name} ({', '.join(details)})")
+                elif role:
+                    role_list.append(f"{emoji} → {role.name}")
+                else:
+                    role_list.append(f"{emoji} → ❌ Role not found")
+            
+            embed.add_field(
+                name=f"Configured Roles ({len(settings.game_roles)})",
+                value="\n".join(role_list) if role_list else "None",
+                inline=False
+            )
+        else:
+            embed.add_field(
+                name="Configured Roles",
+                value="No game roles configured\nUse `!addgamerole <emoji> @role` to add roles",
+                inline=False
+            )
+        
+        # Panel info
+        if settings.enabled and (settings.panels or settings.picker_panels):
+            panel_status = []
+            for channel_id, message_id in settings.panels + settings.picker_panels:
+                channel = ctx.guild.get_channel(channel_id)
+                if not channel:
+                    panel_status.append("❌ Channel not found")
+                    continue
+                
+                # Fetching every panel is skipped while shedding load
+                if overload.shedding(SIMPLE_EMBEDS):
+                    panel_status.append(f"{channel.mention}: ⏸️ Not checked, the bot is busy")
+                    continue
+                
+                # Check message status
+                try:
+                    await channel.fetch_message(message_id)
+                    panel_status.append(f"{channel.mention}: ✅ Active")
+                except discord.NotFound:
+                    panel_status.append(f"{channel.mention}: ❌ Message deleted")
+                except:
+                    panel_status.append(f"{channel.mention}: ⚠️ Unable to check")
+            
+            embed.add_field(name="Selection Panels", value="\n".join(panel_status)[:1024], inline=False)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='gamerolestatus', aliases=['grstatus'], help='Check game role system status')
+    @commands.has_permissions(manage_guild=True) 
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def game_role_status(self, ctx):
+        """Check the current game role system status"""
+        await self.list_game_roles(ctx)  # Same as list_game_roles
+    
+    @commands.command(name='gamerolestats', aliases=['grstats'], help='Show how many members have each game role')
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def game_role_stats(self, ctx):
+        """Show the game roles sorted by popularity"""
+        settings = get_game_role_settings(ctx.guild.id)
+        if not settings.game_roles:
+            await ctx.send(f"❌ No game roles configured! Use `{BOT_CONFIG['prefix']}addgamerole <emoji> @role` to add roles")
+            return
+        
+        # Only the first call in a guild walks the member list, later ones read the counters
+        async with ctx.typing():
+            await role_counters.ensure_seeded(ctx.guild)
+        counts = role_counters.counts(ctx.guild)
+        
+        embed = discord.Embed(
+            title="📊 Game Role Popularity",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        ranked = sorted(settings.game_roles.items(), key=lambda item: counts.get(item[1], 0), reverse=True)
+        lines = []
+        for position, (emoji, role_id) in enumerate(ranked, 1):
+            role = ctx.guild.get_role(role_id)
+            name = role.name if role else "❌ Role not found"
+            count = f"{counts[role_id]} members" if role_id in counts else "counting..."
+            lines.append(f"**{position}.** {emoji} {name}: {count}")
+        embed.add_field(name="Game Roles", value="\n".join(lines)[:1024], inline=False)
+        
+        verify_role = ctx.guild.get_role(get_verification_settings(ctx.guild.id).role_id or 0)
+        if verify_role:
+            embed.add_field(name="Verified Members", value=counts.get(verify_role.id, "counting..."), inline=True)
+        embed.add_field(name="Total Members", value=ctx.guild.member_count, inline=True)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='disablegameroles', help='Disable game role system (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def disable_game_roles(self, ctx):
+        """Disable the game role system for the server"""
+        guild_id = ctx.guild.id
+        settings = get_game_role_settings(guild_id)
+        
+        if not settings.enabled:
+            await ctx.send("❌ Game role system is not currently enabled!")
+            return
+        
+        # Disable game roles
+        update_game_role_settings(guild_id, enabled=False)
+        
+        embed = discord.Embed(
+            title="🎮 Game Roles Disabled",
+            description="Game role selection system has been disabled for this server.",
+            color=0xff9900
+        )
+        await ctx.send(embed=embed)
+        logger.info(f'Game role system disabled by {ctx.author} in {ctx.guild.name}')
+
+async def setup(bot):
+    await bot.add_cog(GameRoles(bot))
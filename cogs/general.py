@@ -0,0 +1,403 @@
+import discord
+from discord.ext import commands
+import time
+from config import BOT_CONFIG, COOLDOWN_CONFIG
+from member_cache import ensure_chunked
+from member_export import EXPORT_FORMATS, export_members
+from member_index import IndexedMember
+import logging
+
+logger = logging.getLogger('discord_bot.commands')
+
+class General(commands.Cog):
+    """General purpose and information commands"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @commands.command(name='hello', help='Greet the bot')
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.user)
+    async def hello(self, ctx):
+        """Simple greeting command"""
+        user = ctx.author
+        embed = discord.Embed(
+            title="👋 Hello!",
+            description=f"Hello {user.mention}! How can I help you today?",
+            color=BOT_CONFIG['embed_color']
+        )
+        embed.set_footer(text=f"Requested by {user.display_name}", icon_url=user.avatar.url if user.avatar else None)
+        await ctx.send(embed=embed)
+        logger.info(f'Hello command used by {user} in {ctx.guild}')
+    
+    @commands.command(name='ping', help='Check bot latency')
+    @commands.cooldown(1, COOLDOWN_CONFIG['ping_cooldown'], commands.BucketType.user)
+    async def ping(self, ctx):
+        """Check bot's latency"""
+        start_time = time.time()
+        message = await ctx.send("🏓 Pinging...")
+        end_time = time.time()
+        
+        # Calculate latencies
+        api_latency = round(self.bot.latency * 1000, 2)
+        message_latency = round((end_time - start_time) * 1000, 2)
+        
+        embed = discord.Embed(
+            title="🏓 Pong!",
+            color=BOT_CONFIG['embed_color']
+        )
+        embed.add_field(name="API Latency", value=f"{api_latency}ms", inline=True)
+        embed.add_field(name="Message Latency", value=f"{message_latency}ms", inline=True)
+        
+        # Add status indicator based on latency
+        if api_latency < 100:
+            embed.add_field(name="Status", value="🟢 Excellent", inline=True)
+        elif api_latency < 200:
+            embed.add_field(name="Status", value="🟡 Good", inline=True)
+        else:
+            embed.add_field(name="Status", value="🔴 Poor", inline=True)
+        
+        await message.edit(content=None, embed=embed)
+        logger.info(f'Ping command used by {ctx.author} - API: {api_latency}ms, Message: {message_latency}ms')
+    
+    @commands.command(name='info', aliases=['botinfo'], help='Get bot information')
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    async def info(self, ctx):
+        """Display bot information"""
+        embed = discord.Embed(
+            title="🤖 Bot Information",
+            description=BOT_CONFIG['description'],
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        # Bot stats
+        embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
+        embed.add_field(name="Users", value=len(set(self.bot.get_all_members())), inline=True)
+        embed.add_field(name="Channels", value=len(set(self.bot.get_all_channels())), inline=True)
+        
+        # System info
+        import platform
+        embed.add_field(name="Python Version", value=platform.python_version(), inline=True)
+        embed.add_field(name="Discord.py Version", value=discord.__version__, inline=True)
+        embed.add_field(name="Prefix", value=BOT_CONFIG['prefix'], inline=True)
+        
+        # Performance info (if psutil is available)
+        # psutil is imported on first use to keep it off the startup path
+        try:
+            import psutil
+            cpu_usage = psutil.cpu_percent()
+            memory_usage = psutil.virtual_memory().percent
+            embed.add_field(name="CPU Usage", value=f"{cpu_usage}%", inline=True)
+            embed.add_field(name="Memory Usage", value=f"{memory_usage}%", inline=True)
+        except:
+            pass
+        
+        if self.bot.user.avatar:
+            embed.set_thumbnail(url=self.bot.user.avatar.url)
+        
+        embed.set_footer(text=f"Bot ID: {self.bot.user.id}")
+        
+        await ctx.send(embed=embed)
+        logger.info(f'Info command used by {ctx.author} in {ctx.guild}')
+    
+    @commands.command(name='say', help='Make the bot say something')
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.user)
+    async def say(self, ctx, *, message=None):
+        """Make the bot repeat a message"""
+        if not message:
+            await ctx.send("❌ Please provide a message for me to say!")
+            return
+        
+        # Delete the original command message for cleaner chat
+        try:
+            await ctx.message.delete()
+        except discord.Forbidden:
+            pass
+        
+        # Send the message
+        await ctx.send(message)
+        logger.info(f'Say command used by {ctx.author}: {message}')
+    
+    @commands.command(name='serverinfo', aliases=['server'], help='Get server information')
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    @commands.guild_only()
+    async def server_info(self, ctx):
+        """Display server information"""
+        guild = ctx.guild
+        
+        # Human/bot counts need the full member list
+        await ensure_chunked(guild)
+        
+        embed = discord.Embed(
+            title=f"🏰 {guild.name}",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        # Basic server info
+        embed.add_field(name="Server ID", value=guild.id, inline=True)
+        embed.add_field(name="Owner", value=guild.owner.mention if guild.owner else "Unknown", inline=True)
+        embed.add_field(name="Created", value=guild.created_at.strftime("%B %d, %Y"), inline=True)
+        
+        # Member counts
+        embed.add_field(name="Total Members", value=guild.member_count, inline=True)
+        embed.add_field(name="Humans", value=len([m for m in guild.members if not m.bot]), inline=True)
+        embed.add_field(name="Bots", value=len([m for m in guild.members if m.bot]), inline=True)
+        
+        # Channel counts
+        text_channels = len(guild.text_channels)
+        voice_channels = len(guild.voice_channels)
+        embed.add_field(name="Text Channels", value=text_channels, inline=True)
+        embed.add_field(name="Voice Channels", value=voice_channels, inline=True)
+        embed.add_field(name="Roles", value=len(guild.roles), inline=True)
+        
+        if guild.icon:
+            embed.set_thumbnail(url=guild.icon.url)
+        
+        await ctx.send(embed=embed)
+        logger.info(f'Server info command used by {ctx.author} in {guild.name}')
+    
+    @commands.command(name='userinfo', aliases=['user'], help='Get user information')
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.user)
+    async def user_info(self, ctx, user: IndexedMember = None):
+        """Display user information"""
+        if user is None:
+            user = ctx.author
+        
+        embed = discord.Embed(
+            title=f"👤 {user.display_name}",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        embed.add_field(name="Username", value=f"{user.name}#{user.discriminator}", inline=True)
+        embed.add_field(name="User ID", value=user.id, inline=True)
+        embed.add_field(name="Bot", value="Yes" if user.bot else "No", inline=True)
+        
+        embed.add_field(name="Account Created", value=user.created_at.strftime("%B %d, %Y"), inline=True)
+        
+        if ctx.guild and isinstance(user, discord.Member) and user.joined_at:
+            embed.add_field(name="Joined Server", value=user.joined_at.strftime("%B %d, %Y"), inline=True)
+            
+            # Get top role (excluding @everyone)
+            top_role = user.top_role if user.top_role.name != "@everyone" else None
+            if top_role:
+                embed.add_field(name="Top Role", value=top_role.mention, inline=True)
+        
+        if user.avatar:
+            embed.set_thumbnail(url=user.avatar.url)
+        
+        await ctx.send(embed=embed)
+        logger.info(f'User info command used by {ctx.author} for user {user}')
+    
+    @commands.command(name='exportmembers', aliases=['export'], help='Export the member list as CSV or NDJSON (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.max_concurrency(1, commands.BucketType.guild)
+    @commands.cooldown(1, COOLDOWN_CONFIG['export_cooldown'], commands.BucketType.guild)
+    async def export_members_cmd(self, ctx, fmt: str = 'csv'):
+        """Upload the member roster with verification and game role state"""
+        fmt = fmt.lower()
+        if fmt not in EXPORT_FORMATS:
+            await ctx.send(f"❌ Unknown format `{fmt}`, use one of: {', '.join(EXPORT_FORMATS)}")
+            return
+        
+        progress = await ctx.send(f"📤 Exporting {ctx.guild.member_count} members as {fmt}...")
+        try:
+            result = await export_members(ctx.guild, fmt)
+        except discord.HTTPException as e:
+            logger.error(f'Error exporting members of {ctx.guild.name}: {e}')
+            await progress.edit(content=f"❌ Could not fetch the member list: {e}")
+            return
+        
+        with result.file:
+            if result.size > ctx.guild.filesize_limit:
+                await progress.edit(
+                    content=f"❌ The export is {result.size / 1024 / 1024:.1f} MB, over this server's "
+                            f"{ctx.guild.filesize_limit / 1024 / 1024:.0f} MB upload limit."
+                )
+                return
+            
+            embed = discord.Embed(
+                title="📤 Member Export",
+                color=BOT_CONFIG['embed_color']
+            )
+            embed.add_field(name="Members", value=result.rows, inline=True)
+            embed.add_field(name="Format", value=f"{fmt} (gzip)", inline=True)
+            embed.add_field(name="Size", value=f"{result.size / 1024:.1f} KB ({result.raw_size / 1024:.1f} KB raw)", inline=True)
+            embed.set_footer(text=f"Exported in {result.elapsed}ms")
+            
+            filename = f"members-{ctx.guild.id}.{fmt}.gz"
+            await ctx.send(embed=embed, file=discord.File(result.file, filename=filename))
+        
+        await progress.delete()
+        logger.info(f'Member export ({fmt}) used by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='embed', aliases=['createembed'], help='Create a custom embed')
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.user)
+    async def create_embed(self, ctx, *, content=None):
+        """Create a custom embed with various options"""
+        if not content:
+            # Show help message for embed creation
+            help_embed = discord.Embed(
+                title="🎨 Embed Creator Help",
+                description="Create custom embeds with various options!",
+                color=BOT_CONFIG['embed_color']
+            )
+            help_embed.add_field(
+                name="📝 Usage",
+                value=f"`{BOT_CONFIG['prefix']}embed title:Your Title | desc:Your Description | color:hex_color`",
+                inline=False
+            )
+            help_embed.add_field(
+                name="🎯 Available Options",
+                value="""
+**title:** Embed title
+**desc:** Embed description  
+**color:** Hex color (e.g., #ff0000 or ff0000)
+**author:** Author name
+**footer:** Footer text
+**image:** Image URL
+**thumbnail:** Thumbnail URL
+**field:** Add field (format: name,value,inline)
+                """,
+                inline=False
+            )
+            help_embed.add_field(
+                name="💡 Example",
+                value=f"`{BOT_CONFIG['prefix']}embed title:Welcome! | desc:This is a custom embed | color:#00ff00 | author:Bot Creator | footer:Made with ❤️`",
+                inline=False
+            )
+            await ctx.send(embed=help_embed)
+            return
+        
+        # Parse the content for embed options
+        embed_data = {}
+        fields = []
+        
+        # Split by | to get different options
+        options = content.split(' | ')
+        
+        for option in options:
+            if ':' not in option:
+                continue
+                
+            key, value = option.split(':', 1)
+            key = key.strip().lower()
+            value = value.strip()
+            
+            if key == 'field':
+                # Parse field: name,value,inline
+                field_parts = value.split(',')
+                if len(field_parts) >= 2:
+                    field_name = field_parts[0].strip()
+                    field_value = field_parts[1].strip()
+                    field_inline = field_parts[2].strip().lower() == 'true' if len(field_parts) > 2 else False
+                    fields.append({'name': field_name, 'value': field_value, 'inline': field_inline})
+            else:
+                embed_data[key] = value
+        
+        # Create the embed
+        embed_title = embed_data.get('title', 'Custom Embed')
+        embed_desc = embed_data.get('desc', embed_data.get('description', ''))
+        
+        # Handle color
+        embed_color = BOT_CONFIG['embed_color']
+        if 'color' in embed_data:
+            color_value = embed_data['color']
+            # Remove # if present
+            if color_value.startswith('#'):
+                color_value = color_value[1:]
+            try:
+                embed_color = int(color_value, 16)
+            except ValueError:
+                embed_color = BOT_CONFIG['embed_color']
+        
+        embed = discord.Embed(
+            title=embed_title,
+            description=embed_desc,
+            color=embed_color
+        )
+        
+        # Add author if specified
+        if 'author' in embed_data:
+            embed.set_author(name=embed_data['author'])
+        
+        # Add footer if specified
+        if 'footer' in embed_data:
+            embed.set_footer(text=embed_data['footer'])
+        
+        # Add image if specified
+        if 'image' in embed_data:
+            try:
+                embed.set_image(url=embed_data['image'])
+            except:
+                pass
+        
+        # Add thumbnail if specified
+        if 'thumbnail' in embed_data:
+            try:
+                embed.set_thumbnail(url=embed_data['thumbnail'])
+            except:
+                pass
+        
+        # Add fields
+        for field in fields:
+            embed.add_field(
+                name=field['name'],
+                value=field['value'],
+                inline=field['inline']
+            )
+        
+        # Send the embed
+        try:
+            await ctx.send(embed=embed)
+            logger.info(f'Custom embed created by {ctx.author}')
+            
+            # Try to delete the original command message for cleaner chat
+            try:
+                await ctx.message.delete()
+            except discord.Forbidden:
+                pass
+                
+        except discord.HTTPException as e:
+            await ctx.send(f"❌ Error creating embed: {str(e)}")
+    
+    @commands.command(name='embedtemplate', aliases=['embedtmpl'], help='Get embed templates')
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.user)
+    async def embed_templates(self, ctx):
+        """Show some embed templates for inspiration"""
+        template_embed = discord.Embed(
+            title="📋 Embed Templates",
+            description="Copy and paste these templates, then customize them!",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        templates = [
+            {
+                "name": "🎉 Announcement",
+                "value": f"`{BOT_CONFIG['prefix']}embed title:📢 Important Announcement | desc:We have exciting news to share! | color:#ffd700 | footer:Posted by Server Staff`"
+            },
+            {
+                "name": "👋 Welcome Message", 
+                "value": f"`{BOT_CONFIG['prefix']}embed title:Welcome to the Server! | desc:We're glad you're here! Make sure to read the rules. | color:#00ff00 | thumbnail:URL_HERE`"
+            },
+            {
+                "name": "📊 Server Stats",
+                "value": f"`{BOT_CONFIG['prefix']}embed title:📊 Server Statistics | color:#3498db | field:Members,500+ amazing people,true | field:Channels,25 different topics,true`"
+            },
+            {
+                "name": "🎮 Game Event",
+                "value": f"`{BOT_CONFIG['prefix']}embed title:🎮 Game Night Tonight! | desc:Join us for some fun games at 8 PM! | color:#9b59b6 | image:URL_HERE`"
+            }
+        ]
+        
+        for template in templates:
+            template_embed.add_field(
+                name=template["name"],
+                value=template["value"],
+                inline=False
+            )
+        
+        await ctx.send(embed=template_embed)
+        logger.info(f'Embed templates requested by {ctx.author}')
+
+async def setup(bot):
+    await bot.add_cog(General(bot))
@@ -0,0 +1,269 @@
+import io
+import discord
+from discord.ext import commands
+import time
+from config import BOT_CONFIG, EXTENSIONS
+from startup import startup_profiler
+from memory_report import memory_tracker, format_top, format_diff, structure_sizes, run_report
+from sampling_profiler import SamplingProfiler, handler_labels, loop_thread_id, MAX_PROFILE_SECONDS, IDLE_LABEL
+from runtime import active_runtime
+from overload import overload
+from reaction_filter import reaction_filter
+from instance_guard import event_claims, INSTANCE_ID
+from role_expiry import role_expiry
+import asyncio
+import logging
+
+logger = logging.getLogger('discord_bot.commands')
+
+class Owner(commands.Cog):
+    """Bot owner commands"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @commands.command(name='metrics', help='Show bot runtime metrics (Owner only)')
+    @commands.is_owner()
+    async def metrics(self, ctx):
+        """Show runtime metrics for the bot owner"""
+        embed = discord.Embed(
+            title="📈 Bot Metrics",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        embed.add_field(name="Startup Breakdown", value="\n".join(startup_profiler.breakdown()), inline=False)
+        embed.add_field(name="Gateway Latency", value=f"{round(self.bot.latency * 1000, 2)}ms", inline=True)
+        embed.add_field(name="Guilds", value=len(self.bot.guilds), inline=True)
+        embed.add_field(
+            name="Runtime",
+            value=f"{active_runtime['profile']} ({active_runtime['loop']}, {active_runtime['json']})",
+            inline=True
+        )
+        
+        claims = event_claims.stats()
+        embed.add_field(
+            name="Instance",
+            value=f"{INSTANCE_ID}\n{claims['claimed']} events claimed, {claims['duplicates']} duplicates skipped",
+            inline=True
+        )
+        
+        dispatch = self.bot.event_dispatcher.stats()
+        embed.add_field(
+            name="Event Queues",
+            value=(
+                f"{dispatch['queued']} queued in {dispatch['keys']} queues, {dispatch['in_flight']} running\n"
+                f"Peak depth {dispatch['max_depth']}, {dispatch['processed']} handled, "
+                f"{dispatch['merged']} merged, {dispatch['dropped']} dropped"
+            ),
+            inline=False
+        )
+        
+        reactions = reaction_filter.stats()
+        embed.add_field(
+            name="Reaction Filter",
+            value=f"{reactions['passed']} passed, {reactions['dropped']} dropped, {reactions['tracked']} messages tracked",
+            inline=True
+        )
+        
+        expiry = role_expiry.stats()
+        embed.add_field(
+            name="Role Expiry",
+            value=f"{expiry['scheduled']} scheduled, {expiry['due']} due, {expiry['expired']} expired, {expiry['failed']} failed",
+            inline=True
+        )
+        
+        load = overload.stats()
+        embed.add_field(
+            name="Load Shedding",
+            value=(
+                f"Level {load['level']} ({load['level_name']}), {load['changes']} changes\n"
+                f"Loop lag {load['lag_ms']}ms, {load['queued']} queued events, "
+                f"{load['rate_limits']} rate limits in the last minute ({load['rate_limits_total']} total)\n"
+                f"Seconds per level: {' / '.join(str(seconds) for seconds in load['level_seconds'])}\n"
+                f"{load['skipped_dms']} DMs skipped, {load['deferred']} commands deferred, {load['turned_down']} turned down"
+            ),
+            inline=False
+        )
+        
+        try:
+            import psutil
+            memory_info = psutil.Process().memory_info()
+            embed.add_field(name="Process RSS", value=f"{memory_info.rss / 2**20:.1f}MB", inline=True)
+        except ImportError:
+            pass
+        
+        await ctx.send(embed=embed)
+        logger.info(f'Metrics command used by {ctx.author}')
+    
+    @commands.command(name='reload', help='Reload command extensions without reconnecting (Owner only)')
+    @commands.is_owner()
+    async def reload(self, ctx, extension: str = None):
+        """Reload one or all command extensions in place"""
+        if extension is None:
+            names = EXTENSIONS
+        else:
+            names = [extension if extension.startswith('cogs.') else f'cogs.{extension}']
+        
+        # The gateway session and the settings in config.py are untouched, only the
+        # extension modules are re-imported. discord.py rolls an extension back to its
+        # previous version if the new code fails to load.
+        reloaded = []
+        failed = []
+        start_time = time.perf_counter()
+        for name in names:
+            try:
+                if name in self.bot.extensions:
+                    await self.bot.reload_extension(name)
+                else:
+                    await self.bot.load_extension(name)
+                reloaded.append(name)
+            except commands.ExtensionError as e:
+                failed.append(f"{name}: {e}")
+                logger.error(f'Failed to reload extension {name}: {e}')
+        elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+        
+        embed = discord.Embed(
+            title="🔄 Extensions Reloaded" if not failed else "⚠️ Reload Incomplete",
+            color=0x00ff00 if not failed else 0xff9900
+        )
+        embed.add_field(name="Reloaded", value="\n".join(reloaded) or "None", inline=False)
+        if failed:
+            embed.add_field(name="Failed (kept previous version)", value="\n".join(failed)[:1024], inline=False)
+        embed.add_field(name="Reload Time", value=f"{elapsed}ms", inline=True)
+        
+        await ctx.send(embed=embed)
+        logger.info(f'Reload command used by {ctx.author} - {len(reloaded)} reloaded, {len(failed)} failed in {elapsed}ms')
+
+    @commands.command(name='profile', help='Sample the event loop for N seconds and upload a flamegraph file (Owner only)')
+    @commands.is_owner()
+    @commands.max_concurrency(1)
+    async def profile(self, ctx, seconds: int = 30, top: int = 10):
+        """Run the sampling profiler and report where the event loop spends its time"""
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        top = max(1, min(top, 25))
+        
+        profiler = SamplingProfiler(loop_thread_id(), handler_labels(self.bot, self.bot.background_tasks))
+        try:
+            progress = await ctx.send(f"⏱️ Profiling the event loop for {seconds}s...")
+            # The sampler runs in a worker thread, the loop keeps handling events and heartbeats meanwhile
+            await asyncio.to_thread(profiler.run, seconds)
+        finally:
+            # If the command failed or was cancelled the thread would keep sampling with the
+            # lowered process-wide switch interval, stopping it makes run() restore it now
+            profiler.stop()
+        
+        if not profiler.samples:
+            await progress.edit(content="❌ No samples were taken.")
+            return
+        
+        handlers = profiler.by_handler()
+        busy = profiler.samples - handlers[IDLE_LABEL]
+        
+        embed = discord.Embed(
+            title="⏱️ Event Loop Profile",
+            description=f"{profiler.samples} samples over {profiler.elapsed:.1f}s, loop busy {busy / profiler.samples:.1%} of the time",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        handler_lines = [
+            f"`{count / profiler.samples:6.1%}` {label}"
+            for label, count in handlers.most_common(top)
+        ]
+        embed.add_field(name="Time by Handler", value="\n".join(handler_lines)[:1024], inline=False)
+        
+        function_lines = [
+            f"`{count / profiler.samples:6.1%}` {name}"
+            for name, count in profiler.by_function().most_common(top)
+        ]
+        embed.add_field(name="Busiest Functions (self time)", value="\n".join(function_lines)[:1024] or "Loop was idle", inline=False)
+        embed.set_footer(text="Open the attached file with flamegraph.pl or speedscope.app")
+        
+        collapsed = await asyncio.to_thread(profiler.collapsed)
+        filename = f"profile-{int(time.time())}.folded"
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(collapsed.encode('utf-8')), filename=filename))
+        await progress.delete()
+        logger.info(f'Profile command used by {ctx.author} - {profiler.samples} samples over {seconds}s')
+    
+    @commands.group(name='memory', aliases=['mem'], invoke_without_command=True, help='Profile memory with tracemalloc (Owner only)')
+    @commands.is_owner()
+    async def memory(self, ctx):
+        """Show the memory profiling subcommands"""
+        prefix = BOT_CONFIG['prefix']
+        embed = discord.Embed(
+            title="🧠 Memory Profiling",
+            description=(
+                f"`{prefix}memory start [frames]` - start tracing allocations\n"
+                f"`{prefix}memory snapshot [limit]` - snapshot and list the top allocation sites\n"
+                f"`{prefix}memory diff [limit]` - compare the last two snapshots\n"
+                f"`{prefix}memory sizes` - estimate the size of the caches and settings\n"
+                f"`{prefix}memory stop` - stop tracing and free the snapshots"
+            ),
+            color=BOT_CONFIG['embed_color']
+        )
+        embed.add_field(name="Tracing", value="🟢 Active" if memory_tracker.active else "⚪ Off", inline=True)
+        embed.add_field(name="Snapshots", value=len(memory_tracker.snapshots), inline=True)
+        await ctx.send(embed=embed)
+    
+    @memory.command(name='start', help='Start tracing allocations')
+    @commands.is_owner()
+    async def memory_start(self, ctx, frames: int = 1):
+        """Start tracemalloc, more frames give deeper tracebacks at a higher cost"""
+        frames = max(1, min(frames, 25))
+        if not memory_tracker.start(frames):
+            await ctx.send("ℹ️ Memory tracing is already active.")
+            return
+        await ctx.send(f"🟢 Memory tracing started with {frames} frame(s) per allocation. Allocations made before now are not traced.")
+        logger.info(f'Memory tracing started by {ctx.author} with {frames} frames')
+    
+    @memory.command(name='stop', help='Stop tracing allocations')
+    @commands.is_owner()
+    async def memory_stop(self, ctx):
+        """Stop tracemalloc and drop the snapshots"""
+        if not memory_tracker.stop():
+            await ctx.send("ℹ️ Memory tracing is not active.")
+            return
+        await ctx.send("⚪ Memory tracing stopped, traces and snapshots freed.")
+        logger.info(f'Memory tracing stopped by {ctx.author}')
+    
+    @memory.command(name='snapshot', aliases=['snap', 'top'], help='Snapshot and report the top allocation sites')
+    @commands.is_owner()
+    async def memory_snapshot(self, ctx, limit: int = 25):
+        """Take a snapshot and upload the top allocation sites"""
+        if not memory_tracker.active:
+            await ctx.send(f"❌ Memory tracing is off, use `{BOT_CONFIG['prefix']}memory start` first.")
+            return
+        label = memory_tracker.snapshot()
+        report = await run_report(format_top, label, memory_tracker.snapshots[-1][1], max(1, limit))
+        await self.send_report(ctx, f"📸 Snapshot {label}", report, "memory-top.txt")
+    
+    @memory.command(name='diff', help='Report the changes between the last two snapshots')
+    @commands.is_owner()
+    async def memory_diff(self, ctx, limit: int = 25):
+        """Upload what grew between the last two snapshots"""
+        if len(memory_tracker.snapshots) < 2:
+            await ctx.send(f"❌ Need two snapshots to compare, use `{BOT_CONFIG['prefix']}memory snapshot`.")
+            return
+        (old_label, old), (new_label, new) = memory_tracker.snapshots[-2:]
+        report = await run_report(format_diff, old_label, old, new_label, new, max(1, limit))
+        await self.send_report(ctx, f"📊 Snapshot {old_label} → {new_label}", report, "memory-diff.txt")
+    
+    @memory.command(name='sizes', help='Estimate the size of the caches and settings')
+    @commands.is_owner()
+    async def memory_sizes(self, ctx):
+        """Upload size estimates of the known structures, works without tracing"""
+        report = structure_sizes(self.bot)
+        await self.send_report(ctx, "📦 Structure Sizes", report, "memory-sizes.txt")
+    
+    async def send_report(self, ctx, title, report, filename):
+        """Send a text report as an attachment with its first lines as a preview"""
+        preview = "\n".join(report.splitlines()[:8])
+        embed = discord.Embed(
+            title=title,
+            description=f"```\n{preview[:3900]}\n```",
+            color=BOT_CONFIG['embed_color']
+        )
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(report.encode('utf-8')), filename=filename))
+        logger.info(f'Memory report {filename} sent to {ctx.author}')
+
+async def setup(bot):
+    await bot.add_cog(Owner(bot))
@@ -0,0 +1,391 @@
+import discord
+from discord.ext import commands
+from config import BOT_CONFIG, COOLDOWN_CONFIG, RAID_CONFIG, get_verification_settings, update_verification_settings
+from raid import raid_guard
+from role_journal import role_journal, ADD, REMOVE, SOURCE_NAMES
+from mass_roles import mass_roles, MassRoleJob, parse_filters, describe_filters, progress_embed
+from overload import overload, SIMPLE_EMBEDS
+from role_expiry import role_expiry, parse_duration, format_duration
+import logging
+
+logger = logging.getLogger('discord_bot.commands')
+
+class Verification(commands.Cog):
+    """Verification system commands"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @commands.command(name='setupverify', aliases=['verifysetup'], help='Setup verification system (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['info_cooldown'], commands.BucketType.guild)
+    async def setup_verify(self, ctx, role: discord.Role, channel: discord.TextChannel = None):
+        """Setup the verification system for the server"""
+        if channel is None:
+            channel = ctx.channel
+        
+        guild_id = ctx.guild.id
+        settings = get_verification_settings(guild_id)
+        
+        # Create verification embed
+        verify_embed = discord.Embed(
+            title="🔐 Server Verification",
+            description=settings.verify_message,
+            color=BOT_CONFIG['embed_color']
+        )
+        verify_embed.add_field(
+            name="Instructions",
+            value=f"React with {settings.emoji} below to get the **{role.name}** role and access the server!",
+            inline=False
+        )
+        verify_embed.set_footer(text="Verification System | One click to join!")
+        
+        # Send the verification message
+        try:
+            verify_message = await channel.send(embed=verify_embed)
+            await verify_message.add_reaction(settings.emoji)
+            
+            # Update settings
+            update_verification_settings(
+                guild_id,
+                enabled=True,
+                channel_id=channel.id,
+                message_id=verify_message.id,
+                role_id=role.id
+            )
+            
+            # Confirmation message
+            success_embed = discord.Embed(
+                title="✅ Verification Setup Complete!",
+                description=f"Verification system has been set up in {channel.mention}",
+                color=0x00ff00
+            )
+            success_embed.add_field(name="Verification Role", value=role.mention, inline=True)
+            success_embed.add_field(name="Verification Channel", value=channel.mention, inline=True)
+            success_embed.add_field(name="Verification Emoji", value=settings.emoji, inline=True)
+            
+            await ctx.send(embed=success_embed)
+            logger.info(f'Verification system setup by {ctx.author} in {ctx.guild.name}')
+            
+        except discord.Forbidden:
+            await ctx.send("❌ I don't have permission to send messages or add reactions in that channel!")
+        except Exception as e:
+            await ctx.send(f"❌ Error setting up verification: {str(e)}")
+    
+    @commands.command(name='disableverify', help='Disable verification system (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def disable_verify(self, ctx):
+        """Disable the verification system for the server"""
+        guild_id = ctx.guild.id
+        settings = get_verification_settings(guild_id)
+        
+        if not settings.enabled:
+            await ctx.send("❌ Verification system is not currently enabled!")
+            return
+        
+        # Disable verification
+        update_verification_settings(guild_id, enabled=False)
+        
+        embed = discord.Embed(
+            title="🔓 Verification Disabled",
+            description="Verification system has been disabled for this server.",
+            color=0xff9900
+        )
+        await ctx.send(embed=embed)
+        logger.info(f'Verification system disabled by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='verifystatus', aliases=['vstatus'], help='Check verification system status')
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def verify_status(self, ctx):
+        """Check the current verification system status"""
+        guild_id = ctx.guild.id
+        settings = get_verification_settings(guild_id)
+        
+        embed = discord.Embed(
+            title="🔍 Verification System Status",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        # Status
+        status = "✅ Enabled" if settings.enabled else "❌ Disabled"
+        embed.add_field(name="Status", value=status, inline=True)
+        
+        if settings.enabled:
+            # Get role, channel info
+            role = ctx.guild.get_role(settings.role_id) if settings.role_id else None
+            channel = ctx.guild.get_channel(settings.channel_id) if settings.channel_id else None
+            
+            embed.add_field(name="Verification Role", value=role.mention if role else "❌ Role not found", inline=True)
+            embed.add_field(name="Verification Channel", value=channel.mention if channel else "❌ Channel not found", inline=True)
+            embed.add_field(name="Reaction Emoji", value=settings.emoji, inline=True)
+            embed.add_field(name="Message ID", value=settings.message_id or "Not set", inline=True)
+            embed.add_field(name="Re-verification", value=f"After {format_duration(settings.reverify_after)} inactive" if settings.reverify_after else "Off", inline=True)
+            
+            # Check if verification message still exists, an API call that is skipped while shedding load
+            if channel and settings.message_id and overload.shedding(SIMPLE_EMBEDS):
+                embed.add_field(name="Message Status", value="⏸️ Not checked, the bot is busy", inline=True)
+            elif channel and settings.message_id:
+                try:
+                    verify_message = await channel.fetch_message(settings.message_id)
+                    embed.add_field(name="Message Status", value="✅ Active", inline=True)
+                except discord.NotFound:
+                    embed.add_field(name="Message Status", value="❌ Message deleted", inline=True)
+                except:
+                    embed.add_field(name="Message Status", value="⚠️ Unable to check", inline=True)
+        else:
+            embed.add_field(name="Info", value="Use `!setupverify <role> [channel]` to enable verification", inline=False)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='setwelcome', help='Set welcome message channel (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def set_welcome(self, ctx, channel: discord.TextChannel = None):
+        """Set the welcome message channel"""
+        if channel is None:
+            channel = ctx.channel
+        
+        guild_id = ctx.guild.id
+        update_verification_settings(guild_id, welcome_channel_id=channel.id)
+        
+        embed = discord.Embed(
+            title="👋 Welcome Channel Set",
+            description=f"Welcome messages will now be sent to {channel.mention}",
+            color=BOT_CONFIG['embed_color']
+        )
+        await ctx.send(embed=embed)
+        logger.info(f'Welcome channel set to {channel.name} by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='setraidalerts', help='Set the raid alert channel for admins (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def set_raid_alerts(self, ctx, channel: discord.TextChannel = None):
+        """Set the channel raid mode alerts are sent to"""
+        if channel is None:
+            channel = ctx.channel
+        
+        update_verification_settings(ctx.guild.id, raid_alert_channel_id=channel.id)
+        
+        embed = discord.Embed(
+            title="🚨 Raid Alert Channel Set",
+            description=f"Raid mode alerts will now be sent to {channel.mention}",
+            color=BOT_CONFIG['embed_color']
+        )
+        await ctx.send(embed=embed)
+        logger.info(f'Raid alert channel set to {channel.name} by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='setreverify', help='Take the verification role back after a period without messages, e.g. 30d, or off (Admin only)')
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def set_reverify(self, ctx, duration: str):
+        """Set the inactivity period after which members have to verify again"""
+        if duration.lower() == 'off':
+            seconds = None
+        else:
+            try:
+                seconds = parse_duration(duration)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+        
+        settings = update_verification_settings(ctx.guild.id, reverify_after=seconds)
+        
+        # Members verified before now have no deadline yet, the cached ones get one from today
+        seeded = cancelled = 0
+        if seconds is not None and settings.role_id:
+            seeded = await role_expiry.seed(ctx.guild, settings.role_id, seconds)
+        elif settings.role_id:
+            # Scheduled expiries outlive restarts on their own, turning re-verification off has to drop them
+            cancelled = await role_expiry.cancel_role(settings.role_id)
+        
+        if seconds is not None:
+            description = f"Members who send no message for {format_duration(seconds)} lose the verification role and have to react again"
+        else:
+            description = "Verified members keep the verification role however long they are inactive"
+        embed = discord.Embed(
+            title="⏰ Re-verification Set" if seconds is not None else "⏰ Re-verification Off",
+            description=description,
+            color=BOT_CONFIG['embed_color']
+        )
+        if seconds is not None:
+            embed.add_field(name="Already Verified", value=f"{seeded} cached members scheduled to re-verify in {format_duration(seconds)} unless they send a message", inline=False)
+            if not ctx.guild.chunked:
+                embed.add_field(name="Note", value="Verified members outside the member cache are only scheduled once they send a message", inline=False)
+        else:
+            embed.add_field(name="Cancelled", value=f"{cancelled} scheduled re-verifications", inline=True)
+        await ctx.send(embed=embed)
+        logger.info(f'Re-verification set to {duration} by {ctx.author} in {ctx.guild.name}')
+    
+    @commands.command(name='raidstatus', help='Check join rate and raid mode status')
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.guild)
+    async def raid_status(self, ctx):
+        """Show the join rate, raid mode state and verification queue depth"""
+        guild_id = ctx.guild.id
+        state = raid_guard.state(guild_id)
+        in_raid = raid_guard.in_raid_mode(guild_id)
+        
+        embed = discord.Embed(
+            title="🛡️ Raid Protection Status",
+            color=0xff0000 if in_raid else BOT_CONFIG['embed_color']
+        )
+        embed.add_field(name="Raid Mode", value="🚨 Active" if in_raid else "✅ Inactive", inline=True)
+        embed.add_field(name="Join Rate", value=f"{raid_guard.join_rate(guild_id)} joins / {RAID_CONFIG['window_seconds']}s", inline=True)
+        embed.add_field(name="Trip Threshold", value=f"{RAID_CONFIG['join_threshold']} joins / {RAID_CONFIG['window_seconds']}s", inline=True)
+        embed.add_field(name="Verification Queue", value=raid_guard.queue_depth(guild_id), inline=True)
+        embed.add_field(
+            name="Release Rate",
+            value=f"{RAID_CONFIG['release_batch']} every {RAID_CONFIG['release_interval']}s",
+            inline=True
+        )
+        if state and state.dropped:
+            embed.add_field(name="Dropped (queue full)", value=state.dropped, inline=True)
+        
+        settings = get_verification_settings(guild_id)
+        alert_channel = ctx.guild.get_channel(settings.raid_alert_channel_id) if settings.raid_alert_channel_id else None
+        embed.add_field(
+            name="Alert Channel",
+            value=alert_channel.mention if alert_channel else "Not set, use `!setraidalerts [#channel]`",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='roleaudit', aliases=['rolehistory'], help='Show the role changes the bot made for a member')
+    @commands.has_permissions(manage_roles=True)
+    @commands.guild_only()
+    @commands.cooldown(1, COOLDOWN_CONFIG['default_cooldown'], commands.BucketType.user)
+    async def role_audit(self, ctx, user: discord.User, limit: int = 10):
+        """Show a member's latest role changes from the role journal"""
+        limit = max(1, min(limit, 25))
+        changes = role_journal.history(ctx.guild.id, user.id, limit)
+        
+        embed = discord.Embed(
+            title=f"📜 Role Changes for {user.display_name}",
+            color=BOT_CONFIG['embed_color']
+        )
+        
+        if not changes:
+            embed.description = "No role changes recorded for this member."
+        else:
+            lines = []
+            for entry, status in changes:
+                role = ctx.guild.get_role(entry.role_id)
+                role_name = role.mention if role else f"deleted role `{entry.role_id}`"
+                action = "➕" if entry.op == ADD else "➖"
+                lines.append(
+                    f"{action} {role_name} via {SOURCE_NAMES.get(entry.source, 'unknown')}: "
+                    f"**{status}** <t:{int(entry.timestamp)}:R>"
+                )
+            embed.description = "\n".join(lines)[:4096]
+        
+        embed.set_footer(text=f"User ID: {user.id}")
+        await ctx.send(embed=embed)
+    
+    @commands.group(name='massrole', aliases=['bulkrole'], invoke_without_command=True,
+                    help='Add or remove a role for every matching member (Manage Roles)')
+    @commands.has_permissions(manage_roles=True)
+    @commands.bot_has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def mass_role(self, ctx):
+        """Show the running mass role job, or how to start one"""
+        job = mass_roles.jobs.get(ctx.guild.id)
+        if job is not None:
+            await ctx.send(embed=progress_embed(job, ctx.guild))
+            return
+        
+        embed = discord.Embed(
+            title="👥 Mass Role",
+            description=(
+                f"`{BOT_CONFIG['prefix']}massrole add @role [filters]` or `{BOT_CONFIG['prefix']}massrole remove @role [filters]`\n"
+                f"`{BOT_CONFIG['prefix']}massrole cancel` stops the running job"
+            ),
+            color=BOT_CONFIG['embed_color']
+        )
+        embed.add_field(
+            name="Filters",
+            value=(
+                "`bots` / `humans`\n"
+                "`has-role:@role` / `lacks-role:@role`\n"
+                "`joined-before:YYYY-MM-DD` / `joined-after:YYYY-MM-DD`"
+            ),
+            inline=False
+        )
+        await ctx.send(embed=embed)
+    
+    @mass_role.command(name='add', help='Give a role to every matching member')
+    @commands.has_permissions(manage_roles=True)
+    @commands.bot_has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def mass_role_add(self, ctx, role: discord.Role, *filters: str):
+        """Start adding a role to every matching member"""
+        await self.start_mass_role(ctx, ADD, role, filters)
+    
+    @mass_role.command(name='remove', help='Take a role from every matching member')
+    @commands.has_permissions(manage_roles=True)
+    @commands.bot_has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def mass_role_remove(self, ctx, role: discord.Role, *filters: str):
+        """Start removing a role from every matching member"""
+        await self.start_mass_role(ctx, REMOVE, role, filters)
+    
+    @mass_role.command(name='cancel', help='Stop the running mass role job')
+    @commands.has_permissions(manage_roles=True)
+    @commands.bot_has_permissions(manage_roles=True)
+    @commands.guild_only()
+    async def mass_role_cancel(self, ctx):
+        """Cancel the running mass role job"""
+        if mass_roles.cancel(ctx.guild.id):
+            await ctx.send("⏹️ Stopping the mass role job, changes already made are kept.")
+            logger.info(f'Mass role job cancelled by {ctx.author} in {ctx.guild.name}')
+        else:
+            await ctx.send("❌ No mass role job is running.")
+    
+    async def start_mass_role(self, ctx, op, role, filters):
+        """Check and start a mass role job"""
+        if ctx.guild.id in mass_roles.jobs:
+            await ctx.send(f"❌ A mass role job is already running. Use `{BOT_CONFIG['prefix']}massrole cancel` to stop it.")
+            return
+        if role.is_default() or role.managed:
+            await ctx.send("❌ That role can't be assigned by the bot.")
+            return
+        if role >= ctx.guild.me.top_role:
+            await ctx.send("❌ That role is above my highest role, move my role up first.")
+            return
+        if role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+            await ctx.send("❌ You can only manage roles below your highest role.")
+            return
+        
+        try:
+            filters = parse_filters(ctx.guild, filters)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        
+        action = "Adding" if op == ADD else "Removing"
+        progress = await ctx.send(f"⏳ {action} {role.mention} for {describe_filters(ctx.guild, filters)}...")
+        job = MassRoleJob(ctx.guild.id, ctx.channel.id, progress.id, str(ctx.author), op, role.id, filters)
+        mass_roles.start(self.bot, job)
+        logger.info(f'Mass role job ({action.lower()} {role.name}) started by {ctx.author} in {ctx.guild.name}')
+    
+    # Handle setup_verify command errors
+    @setup_verify.error
+    async def setup_verify_error(self, ctx, error):
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("❌ You need Administrator permissions to setup verification!")
+        elif isinstance(error, commands.BadArgument):
+            await ctx.send("❌ Please provide a valid role! Usage: `!setupverify @RoleName [#channel]`")
+        elif isinstance(error, commands.MissingRequiredArgument):
+            await ctx.send("❌ Please specify a role! Usage: `!setupverify @RoleName [#channel]`")
+
+async def setup(bot):
+    await bot.add_cog(Verification(bot))
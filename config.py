@@ -1,4 +1,6 @@
 import os
+import sys
+from dataclasses import dataclass, replace
 
 # Bot configuration
 BOT_CONFIG = {
@@ -25,11 +27,71 @@ if BOT_CONFIG['owner_id']:
     except ValueError:
         BOT_CONFIG['owner_id'] = None
 
+# Gateway session persistence across process restarts
+SESSION_CONFIG = {
+    # Save the gateway session on shutdown and try to RESUME it on the next boot
+    'persist': os.getenv('PERSIST_GATEWAY_SESSION', 'False').lower() == 'true',
+    
+    # Where the session is stored between restarts
+    'path': os.getenv('GATEWAY_SESSION_FILE', 'gateway_session.json'),
+    
+    # Sessions older than this (in seconds) are not worth trying to resume
+    'max_age': int(os.getenv('GATEWAY_SESSION_MAX_AGE', '120')),
+    
+    # A RESUME needs the guild cache rebuilt over REST, which beats a fresh READY only for a few guilds
+    'max_guilds': int(os.getenv('GATEWAY_SESSION_MAX_GUILDS', '50')),
+}
+
+# Single active instance configuration
+INSTANCE_CONFIG = {
+    # Lock file held by the active instance, a second process on the same host waits on it
+    'lock_path': os.getenv('INSTANCE_LOCK_FILE', 'bot.lock'),
+    
+    # Wait as a standby and take over when the active instance dies, instead of exiting
+    'standby': os.getenv('INSTANCE_STANDBY', 'True').lower() == 'true',
+    
+    # Seconds between a standby's attempts to take the lock
+    'standby_poll_interval': float(os.getenv('INSTANCE_STANDBY_POLL_INTERVAL', '0.25')),
+    
+    # SQLite database of handled message and interaction ids, shared by every instance on the host
+    'claims_path': os.getenv('EVENT_CLAIMS_FILE', 'event_claims.sqlite3'),
+    
+    # Ids remembered in memory per process, and seconds claims are kept in the database
+    'claims_cache_size': int(os.getenv('EVENT_CLAIMS_CACHE_SIZE', '10000')),
+    'claims_retention': int(os.getenv('EVENT_CLAIMS_RETENTION', '3600')),
+}
+
+# Command extensions (cogs) loaded at startup and swapped in place by !reload
+EXTENSIONS = [
+    'cogs.general',
+    'cogs.verification',
+    'cogs.game_roles',
+    'cogs.owner',
+]
+
 # Command cooldown settings (in seconds)
 COOLDOWN_CONFIG = {
     'default_cooldown': 3,
     'ping_cooldown': 5,
     'info_cooldown': 10,
+    'export_cooldown': 60,
+}
+
+# Cache profile configuration
+CACHE_CONFIG = {
+    # 'default' keeps discord.py's stock caching (message cache, member chunking at startup)
+    # 'lean' disables the message cache and member cache, and chunks guilds on first use
+    'profile': os.getenv('CACHE_PROFILE', 'default').lower(),
+    
+    # Seconds before a lazily chunked guild is considered stale and chunked again
+    'chunk_refresh_interval': int(os.getenv('CHUNK_REFRESH_INTERVAL', '3600')),
+}
+
+# Runtime profile configuration
+RUNTIME_CONFIG = {
+    # 'default' runs on asyncio's event loop with discord.py's own JSON handling
+    # 'fast' runs on uvloop and the fastest installed JSON codec (orjson, msgspec, ujson), each only if installed
+    'profile': os.getenv('RUNTIME_PROFILE', 'default').lower(),
 }
 
 # Verification system configuration
@@ -41,28 +103,83 @@ VERIFICATION_CONFIG = {
     'welcome_message': 'Welcome {user} to {server}! Please check the verification channel to get started.',
 }
 
+# Raid detection configuration
+RAID_CONFIG = {
+    # Joins are counted over a sliding window made of this many buckets
+    'window_seconds': int(os.getenv('RAID_WINDOW_SECONDS', '10')),
+    'window_buckets': 10,
+    
+    # Joins within the window that switch a guild into raid mode
+    'join_threshold': int(os.getenv('RAID_JOIN_THRESHOLD', '15')),
+    
+    # Seconds the join rate must stay under half the threshold before raid mode ends
+    'calm_seconds': int(os.getenv('RAID_CALM_SECONDS', '120')),
+    
+    # Queued verifications are granted this many at a time, every release_interval seconds
+    'release_batch': int(os.getenv('RAID_RELEASE_BATCH', '5')),
+    'release_interval': float(os.getenv('RAID_RELEASE_INTERVAL', '2')),
+    
+    # Pending verifications kept per guild, further ones have to react again later
+    'max_queue': int(os.getenv('RAID_MAX_QUEUE', '10000')),
+}
+
+# Role mutation journal configuration
+JOURNAL_CONFIG = {
+    # Append-only binary journal of role changes, replayed on startup
+    'path': os.getenv('ROLE_JOURNAL_FILE', 'role_journal.bin'),
+    
+    # Unfinished role changes older than this (in seconds) are expired instead of replayed
+    'replay_max_age': int(os.getenv('ROLE_JOURNAL_REPLAY_MAX_AGE', '900')),
+    
+    # The journal is compacted once it grows past this many bytes
+    'compact_size': int(os.getenv('ROLE_JOURNAL_COMPACT_SIZE', str(8 * 1024 * 1024))),
+    'compact_check_interval': 600,
+    
+    # Days of finished role changes kept for !roleaudit
+    'retention_days': int(os.getenv('ROLE_JOURNAL_RETENTION_DAYS', '30')),
+    
+    # fsync every record, survives power loss rather than only process crashes
+    'fsync': os.getenv('ROLE_JOURNAL_FSYNC', 'False').lower() == 'true',
+}
+
 # In-memory storage for verification settings per guild
 # In production, this should be stored in a database
+# Only configured guilds have an entry, all others share DEFAULT_VERIFICATION_SETTINGS
 VERIFICATION_DATA = {}
 
+@dataclass(frozen=True, slots=True)
+class VerificationSettings:
+    """Verification settings for a guild"""
+    enabled: bool = False
+    channel_id: int = None
+    message_id: int = None
+    role_id: int = None
+    emoji: str = VERIFICATION_CONFIG['default_verify_emoji']
+    verify_message: str = VERIFICATION_CONFIG['default_verify_message']
+    welcome_channel_id: int = None
+    raid_alert_channel_id: int = None
+    reverify_after: int = None  # seconds without a message before the verification role is taken back
+
+DEFAULT_VERIFICATION_SETTINGS = VerificationSettings()
+
+# Ids of every verification message and reaction panel, reactions to other messages are dropped at the gateway
+TRACKED_MESSAGES = set()
+
+def retrack_messages(old_ids, new_ids):
+    """Update the tracked message ids after a guild's settings changed"""
+    TRACKED_MESSAGES.difference_update(old_ids - new_ids)
+    TRACKED_MESSAGES.update(message_id for message_id in new_ids - old_ids if message_id is not None)
+
 def get_verification_settings(guild_id):
     """Get verification settings for a guild"""
-    if guild_id not in VERIFICATION_DATA:
-        VERIFICATION_DATA[guild_id] = {
-            'enabled': False,
-            'channel_id': None,
-            'message_id': None,
-            'role_id': None,
-            'emoji': VERIFICATION_CONFIG['default_verify_emoji'],
-            'verify_message': VERIFICATION_CONFIG['default_verify_message'],
-            'welcome_channel_id': None,
-        }
-    return VERIFICATION_DATA[guild_id]
+    return VERIFICATION_DATA.get(guild_id, DEFAULT_VERIFICATION_SETTINGS)
 
 def update_verification_settings(guild_id, **kwargs):
     """Update verification settings for a guild"""
-    settings = get_verification_settings(guild_id)
-    settings.update(kwargs)
+    old_settings = get_verification_settings(guild_id)
+    settings = replace(old_settings, **kwargs)
+    VERIFICATION_DATA[guild_id] = settings
+    retrack_messages({old_settings.message_id}, {settings.message_id})
     return settings
 
 # Game role selection configuration
@@ -84,36 +201,219 @@ GAME_ROLE_CONFIG = {
     'embed_description': 'React with the games you play to get the corresponding roles!',
 }
 
-# In-memory storage for game role settings per guild  
+class EmojiRoleTable:
+    """Immutable emoji -> role id table stored as two parallel tuples
+
+    Tables are small (a few dozen entries at most), so a scan over interned emoji
+    strings is as fast as a dict lookup at a fraction of the memory.
+    """
+    __slots__ = ('emojis', 'role_ids')
+
+    def __init__(self, pairs=()):
+        pairs = tuple(pairs)
+        self.emojis = tuple(sys.intern(emoji) for emoji, _ in pairs)
+        self.role_ids = tuple(role_id for _, role_id in pairs)
+
+    def get(self, emoji, default=None):
+        """Get the role id mapped to an emoji"""
+        try:
+            return self.role_ids[self.emojis.index(emoji)]
+        except ValueError:
+            return default
+
+    def __getitem__(self, emoji):
+        try:
+            return self.role_ids[self.emojis.index(emoji)]
+        except ValueError:
+            raise KeyError(emoji) from None
+
+    def __contains__(self, emoji):
+        return emoji in self.emojis
+
+    def __iter__(self):
+        return iter(self.emojis)
+
+    def __len__(self):
+        return len(self.emojis)
+
+    def items(self):
+        """Iterate over (emoji, role id) pairs"""
+        return zip(self.emojis, self.role_ids)
+
+    def with_role(self, emoji, role_id):
+        """Get a copy of the table with an emoji mapped to a role"""
+        return EmojiRoleTable([*((e, r) for e, r in self.items() if e != emoji), (emoji, role_id)])
+
+    def without(self, emoji):
+        """Get a copy of the table without an emoji"""
+        return EmojiRoleTable((e, r) for e, r in self.items() if e != emoji)
+
+EMPTY_ROLE_TABLE = EmojiRoleTable()
+
+# Game role panel publishing configuration
+PANEL_CONFIG = {
+    # Channels published to at the same time, leaves rate limit room for other commands
+    'max_concurrent_publishes': int(os.getenv('PANEL_MAX_CONCURRENT_PUBLISHES', '3')),
+}
+
+# Event dispatcher configuration (reaction and member join events)
+DISPATCH_CONFIG = {
+    # Events are queued per 'member' (guild and user) or per 'guild', and handled in order within a queue
+    'key': os.getenv('DISPATCH_KEY', 'member').lower(),
+    
+    # Handlers running at the same time, across all queues
+    'workers': int(os.getenv('DISPATCH_WORKERS', '16')),
+    
+    # Pending events per queue and in total before the overflow policy kicks in
+    'max_queue_per_key': int(os.getenv('DISPATCH_MAX_QUEUE_PER_KEY', '50')),
+    'max_queued': int(os.getenv('DISPATCH_MAX_QUEUED', '10000')),
+    
+    # 'drop_oldest' or 'drop_newest' pending event when a queue is full
+    'overflow': os.getenv('DISPATCH_OVERFLOW', 'drop_oldest').lower(),
+    
+    # Replace a pending event with a newer one for the same reaction or member
+    'merge': os.getenv('DISPATCH_MERGE', 'True').lower() == 'true',
+    
+    # Drop reaction events for messages other than verification messages and panels before discord.py parses them
+    'filter_reactions': os.getenv('FILTER_UNTRACKED_REACTIONS', 'True').lower() == 'true',
+}
+
+# Load shedding configuration
+OVERLOAD_CONFIG = {
+    'enabled': os.getenv('OVERLOAD_ENABLED', 'True').lower() == 'true',
+    
+    # Seconds between load checks
+    'check_interval': float(os.getenv('OVERLOAD_CHECK_INTERVAL', '0.5')),
+    
+    # Thresholds for shedding levels 1, 2 and 3 (skip DMs, simplify embeds, defer commands)
+    # Event loop lag in seconds
+    'lag_thresholds': tuple(float(value) for value in os.getenv('OVERLOAD_LAG_THRESHOLDS', '0.1,0.25,0.5').split(',')),
+    # Events waiting in the event dispatcher queues
+    'queue_thresholds': tuple(int(value) for value in os.getenv('OVERLOAD_QUEUE_THRESHOLDS', '500,2000,5000').split(',')),
+    # REST responses with status 429 within the rate limit window
+    'rate_limit_thresholds': tuple(int(value) for value in os.getenv('OVERLOAD_RATE_LIMIT_THRESHOLDS', '3,10,30').split(',')),
+    'rate_limit_window': 60,
+    
+    # A level is left once every signal is below this share of its threshold for recover_seconds
+    'recover_ratio': 0.5,
+    'recover_seconds': int(os.getenv('OVERLOAD_RECOVER_SECONDS', '30')),
+    
+    # Seconds a deferred command waits for the load to drop before it is turned down
+    'defer_timeout': int(os.getenv('OVERLOAD_DEFER_TIMEOUT', '30')),
+    
+    # Commands that are deferred at level 3, everything else (setup, admin, owner) always runs
+    'deferrable_commands': {
+        'hello', 'info', 'say', 'serverinfo', 'userinfo', 'exportmembers', 'embed', 'embedtemplate',
+        'verifystatus', 'raidstatus', 'roleaudit', 'listgameroles', 'gamerolestatus', 'gamerolestats',
+    },
+}
+
+# Bulk role assignment configuration
+MASS_ROLE_CONFIG = {
+    # Running !massrole jobs are checkpointed here and resumed after a restart
+    'path': os.getenv('MASS_ROLE_FILE', 'mass_role_jobs.json'),
+    
+    # Role changes in flight at once per job
+    'concurrency': int(os.getenv('MASS_ROLE_CONCURRENCY', '2')),
+    
+    # Role changes per second, halved on every 429 and raised again while requests go through
+    # The ceiling stays well under the 50 per second global limit, leaving room for interactive traffic
+    'start_rate': float(os.getenv('MASS_ROLE_START_RATE', '5')),
+    'min_rate': 0.5,
+    'max_rate': float(os.getenv('MASS_ROLE_MAX_RATE', '10')),
+    
+    # Seconds between checkpoints and between progress message edits
+    'checkpoint_interval': 5,
+    'progress_interval': int(os.getenv('MASS_ROLE_PROGRESS_INTERVAL', '5')),
+}
+
+# Time-limited role configuration
+EXPIRY_CONFIG = {
+    # Snapshot of the expiry schedule, loaded on startup so expiries survive restarts
+    'path': os.getenv('ROLE_EXPIRY_FILE', 'role_expiry.bin'),
+    
+    # Seconds between snapshots while the schedule has changed
+    'checkpoint_interval': int(os.getenv('ROLE_EXPIRY_CHECKPOINT_INTERVAL', '30')),
+    
+    # Expired roles are removed this many at a time, every batch_interval seconds
+    'batch_size': int(os.getenv('ROLE_EXPIRY_BATCH_SIZE', '5')),
+    'batch_interval': float(os.getenv('ROLE_EXPIRY_BATCH_INTERVAL', '2')),
+    
+    # Activity only pushes a re-verification deadline back once it has moved by this many seconds
+    'activity_granularity': int(os.getenv('ROLE_EXPIRY_ACTIVITY_GRANULARITY', '3600')),
+}
+
+# Member roster export configuration
+EXPORT_CONFIG = {
+    # Bytes of export data kept in memory before the temp file spills to disk
+    'spool_max_size': int(os.getenv('EXPORT_SPOOL_MAX_SIZE', str(4 * 1024 * 1024))),
+    
+    # Rows encoded and written to the temp file at a time
+    'batch_size': int(os.getenv('EXPORT_BATCH_SIZE', '100')),
+    
+    # Longest the export runs before yielding to the event loop (in milliseconds)
+    'max_block_ms': float(os.getenv('EXPORT_MAX_BLOCK_MS', '2')),
+    
+    # gzip level, compression runs in a worker thread
+    'compress_level': int(os.getenv('EXPORT_COMPRESS_LEVEL', '6')),
+}
+
+# In-memory storage for game role settings per guild
+# Only configured guilds have an entry, all others share DEFAULT_GAME_ROLE_SETTINGS
 GAME_ROLE_DATA = {}
 
+@dataclass(frozen=True, slots=True)
+class GameRoleSettings:
+    """Game role settings for a guild"""
+    enabled: bool = False
+    panels: tuple = ()  # (channel_id, message_id) of every published reaction panel
+    picker_panels: tuple = ()  # (channel_id, message_id) of every published select menu panel
+    game_roles: EmojiRoleTable = EMPTY_ROLE_TABLE  # emoji -> role_id mapping
+    max_selections: int = GAME_ROLE_CONFIG['max_selections']
+    role_ttls: tuple = ()  # (role_id, seconds) of game roles that expire after being picked
+
+    def ttl(self, role_id):
+        """Get the seconds a game role is kept for, None if it is permanent"""
+        for ttl_role_id, seconds in self.role_ttls:
+            if ttl_role_id == role_id:
+                return seconds
+        return None
+
+    def is_panel(self, message_id):
+        """Check if a message is one of the published reaction panels"""
+        return any(panel_message_id == message_id for _, panel_message_id in self.panels)
+
+    def panel_in(self, channel_id, picker=False):
+        """Get the id of the reaction (or select menu) panel published in a channel, if any"""
+        for panel_channel_id, panel_message_id in (self.picker_panels if picker else self.panels):
+            if panel_channel_id == channel_id:
+                return panel_message_id
+        return None
+
+DEFAULT_GAME_ROLE_SETTINGS = GameRoleSettings()
+
 def get_game_role_settings(guild_id):
     """Get game role settings for a guild"""
-    if guild_id not in GAME_ROLE_DATA:
-        GAME_ROLE_DATA[guild_id] = {
-            'enabled': False,
-            'channel_id': None,
-            'message_id': None,
-            'game_roles': {},  # emoji -> role_id mapping
-            'max_selections': GAME_ROLE_CONFIG['max_selections'],
-        }
-    return GAME_ROLE_DATA[guild_id]
+    return GAME_ROLE_DATA.get(guild_id, DEFAULT_GAME_ROLE_SETTINGS)
 
 def update_game_role_settings(guild_id, **kwargs):
     """Update game role settings for a guild"""
-    settings = get_game_role_settings(guild_id)
-    settings.update(kwargs)
+    old_settings = get_game_role_settings(guild_id)
+    settings = replace(old_settings, **kwargs)
+    GAME_ROLE_DATA[guild_id] = settings
+    retrack_messages({message_id for _, message_id in old_settings.panels}, {message_id for _, message_id in settings.panels})
     return settings
 
 def add_game_role(guild_id, emoji, role_id):
     """Add a game role mapping"""
     settings = get_game_role_settings(guild_id)
-    settings['game_roles'][emoji] = role_id
-    return settings
+    return update_game_role_settings(guild_id, game_roles=settings.game_roles.with_role(emoji, role_id))
 
 def remove_game_role(guild_id, emoji):
     """Remove a game role mapping"""
     settings = get_game_role_settings(guild_id)
-    if emoji in settings['game_roles']:
-        del settings['game_roles'][emoji]
-    return settings
+    if emoji not in settings.game_roles:
+        return settings
+    role_id = settings.game_roles[emoji]
+    role_ttls = tuple((ttl_role_id, seconds) for ttl_role_id, seconds in settings.role_ttls if ttl_role_id != role_id)
+    return update_game_role_settings(guild_id, game_roles=settings.game_roles.without(emoji), role_ttls=role_ttls)
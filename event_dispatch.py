@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from collections import deque
+from config import DISPATCH_CONFIG
+
+logger = logging.getLogger('discord_bot.event_dispatch')
+
+def reaction_route(payload):
+    """Route a raw reaction event: the reacting member, and the reaction it sets the state of"""
+    return payload.guild_id, payload.user_id, ('reaction', payload.message_id, payload.user_id, str(payload.emoji))
+
+def member_join_route(member):
+    """Route a member join event"""
+    return member.guild.id, member.id, ('join', member.id)
+
+# Events handled by the dispatcher instead of one task per event, with how they are routed
+ROUTES = {
+    'raw_reaction_add': reaction_route,
+    'raw_reaction_remove': reaction_route,
+    'member_join': member_join_route,
+}
+
+class QueuedEvent:
+    """An event waiting for its handler"""
+    __slots__ = ('name', 'handler', 'args', 'identity')
+
+    def __init__(self, name, handler, args, identity):
+        self.name = name
+        self.handler = handler
+        self.args = args
+        self.identity = identity
+
+class EventDispatcher:
+    """Runs event handlers from ordered per guild or per member queues on a fixed pool of workers
+
+    Events with the same key are handled one at a time in the order they
+    arrived, so two reactions of one member can no longer race on its roles.
+    Different keys are handled concurrently by up to DISPATCH_WORKERS workers.
+    A pending event is replaced by a newer one setting the same state (the same
+    member's reaction on the same emoji, or a repeated join), and queues are
+    capped, so memory stays bounded during bursts.
+    """
+
+    def __init__(self):
+        self.queues = {}  # key -> deque of QueuedEvent
+        self.ready = asyncio.Queue()  # keys with events and no worker on them
+        self.workers = []
+        self.depth = 0
+        self.in_flight = 0
+        self.max_depth = 0
+        self.processed = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the worker pool, call it from the event loop"""
+        for number in range(DISPATCH_CONFIG['workers']):
+            self.workers.append(asyncio.create_task(self.work(), name=f'event-worker-{number}'))
+
+    def key(self, guild_id, member_id):
+        """Get the queue an event goes to"""
+        return (guild_id, member_id) if DISPATCH_CONFIG['key'] == 'member' else guild_id
+
+    def submit(self, name, handler, args):
+        """Queue an event for its handler, returning False if it was dropped"""
+        guild_id, member_id, identity = ROUTES[name](*args)
+        key = self.key(guild_id, member_id)
+        event = QueuedEvent(name, handler, args, identity)
+
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+            # A key has at most one entry in ready, added when its queue is created
+            self.ready.put_nowait(key)
+
+        if DISPATCH_CONFIG['merge']:
+            for index, pending in enumerate(queue):
+                if pending.identity == identity:
+                    # Only the latest state matters, a reaction added then removed just needs the removal
+                    del queue[index]
+                    self.depth -= 1
+                    self.merged += 1
+                    break
+
+        if len(queue) >= DISPATCH_CONFIG['max_queue_per_key'] or self.depth >= DISPATCH_CONFIG['max_queued']:
+            self.dropped += 1
+            if DISPATCH_CONFIG['overflow'] == 'drop_newest' or not queue:
+                logger.warning(f'Event queue full, dropped {name} for {key}')
+                return False
+            oldest = queue.popleft()
+            self.depth -= 1
+            logger.warning(f'Event queue full, dropped {oldest.name} for {key}')
+
+        queue.append(event)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        return True
+
+    async def work(self):
+        """Handle events one key at a time"""
+        while True:
+            key = await self.ready.get()
+            queue = self.queues.get(key)
+            if not queue:
+                self.queues.pop(key, None)
+                continue
+
+            event = queue.popleft()
+            self.depth -= 1
+            self.in_flight += 1
+            try:
+                await event.handler(*event.args)
+            except Exception as e:
+                logger.exception(f'Error handling {event.name}: {e}')
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+
+            if queue:
+                # Back of the line, so one busy key cannot starve the others
+                self.ready.put_nowait(key)
+            else:
+                del self.queues[key]
+
+    def stats(self):
+        """Get the queue depth and throughput counters"""
+        return {
+            'queued': self.depth,
+            'keys': len(self.queues),
+            'in_flight': self.in_flight,
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'merged': self.merged,
+            'dropped': self.dropped,
+        }
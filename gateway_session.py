@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import aiohttp
+import yarl
+import discord
+from discord.gateway import DiscordWebSocket, ReconnectWebSocket
+from discord.state import ConnectionState
+from config import SESSION_CONFIG
+from member_cache import ensure_chunked, is_lean
+
+logger = logging.getLogger('discord_bot.gateway_session')
+
+# Close codes after which resuming (or reconnecting at all) is pointless
+FATAL_CLOSE_CODES = (4004, 4010, 4011, 4012, 4013, 4014)
+
+# discord.py major version whose private internals GatewayInternals was written against
+SUPPORTED_DISCORD_MAJOR = 2
+
+# Wall clock time at which the previous process saved its session, if we loaded one
+restart_started_at = None
+
+class GatewayInternals:
+    """The private discord.py API that resuming another process' session relies on
+
+    A RESUME skips READY and GUILD_CREATE, so the client state has to be built and
+    finished by hand. Every private access lives here and is checked against the
+    installed discord.py, so an upgrade that changes them turns persistence off
+    instead of breaking startup.
+    """
+
+    def __init__(self):
+        self.supported = (
+            discord.version_info.major == SUPPORTED_DISCORD_MAJOR
+            and all(hasattr(discord.Guild, name) for name in ('_add_channel', '_add_member'))
+            and all(hasattr(ConnectionState, name) for name in ('_add_guild', 'call_handlers'))
+        )
+        if SESSION_CONFIG['persist'] and not self.supported:
+            logger.warning(f'Gateway session persistence is not supported on discord.py {discord.__version__}, disabling it')
+
+    def cache_guild(self, bot, guild, channels, me):
+        """Add a guild fetched over REST to the client cache as if GUILD_CREATE had arrived"""
+        for channel in channels:
+            guild._add_channel(channel)
+        guild._add_member(me)
+        guild._member_count = guild.approximate_member_count
+        bot._connection._add_guild(guild)
+
+    def close_resumably(self, ws, guild_ids):
+        """Make the next close of a websocket keep its session resumable and save it"""
+        close_websocket = ws.close
+
+        async def close_resumable(code=4000):
+            # Closing with 1000 invalidates the session, any 4xxx code keeps it resumable
+            await close_websocket(code=4000)
+            save_session(ws, guild_ids)
+
+        ws.close = close_resumable
+
+    def finish_startup(self, bot):
+        """Mark the client ready after a RESUME, the way READY would"""
+        bot._connection.call_handlers('ready')
+
+gateway_internals = GatewayInternals()
+
+def persistence_enabled():
+    """Check if gateway sessions are saved and resumed across restarts"""
+    return SESSION_CONFIG['persist'] and gateway_internals.supported
+
+def save_session(ws, guild_ids):
+    """Write the gateway session of a closed websocket to disk so the next process can RESUME it"""
+    if not ws.session_id or ws.sequence is None:
+        return
+
+    data = {
+        'session_id': ws.session_id,
+        'sequence': ws.sequence,
+        'resume_url': str(ws.gateway),
+        'guild_ids': list(guild_ids),
+        'saved_at': time.time(),
+    }
+
+    try:
+        # The session id lets anyone with the token take over the session, keep it private
+        fd = os.open(SESSION_CONFIG['path'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        logger.info(f"Saved gateway session {ws.session_id} at sequence {ws.sequence}")
+    except OSError as e:
+        logger.error(f'Error saving gateway session: {e}')
+
+def load_session():
+    """Load and consume the gateway session saved by the previous process"""
+    global restart_started_at
+
+    path = SESSION_CONFIG['path']
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f'Ignoring unreadable gateway session file: {e}')
+        return None
+    finally:
+        # A session can only be resumed once, never try the same one twice
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    restart_started_at = data.get('saved_at')
+    age = time.time() - (restart_started_at or 0)
+
+    if age > SESSION_CONFIG['max_age']:
+        logger.info(f'Saved gateway session is {age:.0f}s old, identifying instead')
+        return None
+    if len(data.get('guild_ids', [])) > SESSION_CONFIG['max_guilds']:
+        # Rebuilding the guild cache over REST would take longer than a fresh READY
+        logger.info(f"Saved gateway session covers {len(data['guild_ids'])} guilds, identifying instead")
+        return None
+
+    return data
+
+def restart_downtime():
+    """Get the seconds between the previous process saving its session and now"""
+    if restart_started_at is None:
+        return None
+    return time.time() - restart_started_at
+
+async def hydrate_guilds(bot, guild_ids):
+    """Rebuild the guild cache over REST, since a RESUME does not replay READY or GUILD_CREATE"""
+    for guild_id in guild_ids:
+        try:
+            guild = await bot.fetch_guild(guild_id, with_counts=True)
+            channels = await guild.fetch_channels()
+            me = await guild.fetch_member(bot.user.id)
+            gateway_internals.cache_guild(bot, guild, channels, me)
+        except discord.HTTPException as e:
+            logger.warning(f'Could not rebuild guild {guild_id} for resume: {e}')
+
+async def refresh_members(bot):
+    """Chunk the guilds of a resumed session, since no GUILD_CREATE triggered it
+
+    Only the default profile chunks at startup, the lean profile chunks lazily anyway.
+    """
+    if not bot.intents.members or is_lean():
+        return
+
+    for guild in bot.guilds:
+        try:
+            await ensure_chunked(guild)
+        except (discord.HTTPException, asyncio.TimeoutError) as e:
+            logger.warning(f'Could not chunk {guild.name} after resuming: {e}')
+
+async def connect_resumed(bot, session):
+    """Run the gateway connection on a saved session for as long as it can be resumed
+
+    Returns when the session is gone (invalidated or the connection failed), so the
+    caller can fall back to a normal IDENTIFY.
+    """
+    ws_params = {
+        'initial': True,
+        'shard_id': bot.shard_id,
+        'gateway': yarl.URL(session['resume_url']),
+        'session': session['session_id'],
+        'sequence': session['sequence'],
+        'resume': True,
+    }
+
+    while not bot.is_closed():
+        try:
+            coro = DiscordWebSocket.from_client(bot, **ws_params)
+            bot.ws = await asyncio.wait_for(coro, timeout=60.0)
+            ws_params['initial'] = False
+            while True:
+                await bot.ws.poll_event()
+        except ReconnectWebSocket as e:
+            bot.dispatch('disconnect')
+            if not e.resume:
+                logger.info('Gateway session was invalidated, identifying instead')
+                return
+            ws_params.update(gateway=bot.ws.gateway, session=bot.ws.session_id, sequence=bot.ws.sequence)
+        except (OSError, discord.HTTPException, discord.GatewayNotFound, discord.ConnectionClosed,
+                aiohttp.ClientError, asyncio.TimeoutError) as e:
+            bot.dispatch('disconnect')
+            if bot.is_closed():
+                return
+            if isinstance(e, discord.ConnectionClosed) and e.code in FATAL_CLOSE_CODES:
+                raise
+            logger.warning(f'Resumed gateway connection failed ({e}), identifying instead')
+            return
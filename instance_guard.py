@@ -0,0 +1,191 @@
+import os
+import time
+import fcntl
+import socket
+import asyncio
+import logging
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import discord
+from config import INSTANCE_CONFIG
+
+logger = logging.getLogger('discord_bot.instance_guard')
+
+# Identifies this process in the lock file and the claims database
+INSTANCE_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+# Seconds between prunes of expired claims
+CLAIMS_PRUNE_INTERVAL = 600
+
+class InstanceLock:
+    """Advisory lock making one process the active instance on a host
+
+    The kernel drops a flock when its process exits, crashed or not, so a
+    standby polling the lock takes over within a poll interval of the active
+    instance dying. Only the active instance logs in, so a standby never
+    touches the gateway, the REST API or the role journal.
+    """
+
+    def __init__(self):
+        self.path = INSTANCE_CONFIG['lock_path']
+        self.fd = None
+
+    def try_acquire(self):
+        """Take the lock if it is free, returning True if this process is now the active instance"""
+        if self.fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f'{INSTANCE_ID} {time.time():.0f}\n'.encode())
+        self.fd = fd
+        return True
+
+    def holder(self):
+        """Get the instance id written by the process holding the lock"""
+        try:
+            with open(self.path) as f:
+                return f.read().split(' ')[0] or 'unknown'
+        except OSError:
+            return 'unknown'
+
+    async def acquire(self, bot):
+        """Become the active instance, waiting as a standby while another one is running
+
+        Returns False if this process should not run, either because standby is
+        disabled or because the bot was closed while waiting.
+        """
+        if self.try_acquire():
+            logger.info(f'Running as the active instance ({INSTANCE_ID})')
+            return True
+
+        if not INSTANCE_CONFIG['standby']:
+            logger.error(f'Another instance ({self.holder()}) is already running on this token, exiting')
+            return False
+
+        logger.warning(f'Another instance ({self.holder()}) is already running, waiting as a standby')
+        start_time = time.perf_counter()
+        while not bot.is_closed():
+            await asyncio.sleep(INSTANCE_CONFIG['standby_poll_interval'])
+            if self.try_acquire():
+                logger.warning(f'Active instance is gone, taking over after {time.perf_counter() - start_time:.1f}s as standby')
+                return True
+        return False
+
+class EventClaims:
+    """Records which instance handled each message and interaction id
+
+    Claims go through a SQLite table shared by every process on the host, so
+    even if two instances end up connected at once (a lock file on a filesystem
+    without flock, a second host), each event is handled by one of them. Ids
+    seen recently are kept in a small in-memory LRU, so replayed events after a
+    RESUME skip the database. Database calls run on a single worker thread, an
+    insert waiting on the other instance's write lock never blocks the loop.
+    """
+
+    def __init__(self):
+        self.path = INSTANCE_CONFIG['claims_path']
+        self.db = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='event-claims')
+        self.recent = OrderedDict()  # event id -> True if this instance handles it
+        self.claimed = 0
+        self.duplicates = 0
+
+    def open(self):
+        """Open the claims database"""
+        # Only ever used from the worker thread after this
+        self.db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS claims (event_id INTEGER PRIMARY KEY, instance TEXT NOT NULL, claimed_at REAL NOT NULL)')
+
+    async def claim(self, event_id):
+        """Claim an event for this instance, returning False if it was already handled"""
+        owned = self.recent.get(event_id)
+        if owned is not None:
+            self.recent.move_to_end(event_id)
+        else:
+            owned = await asyncio.get_running_loop().run_in_executor(self.executor, self.claim_stored, event_id)
+            # A copy redelivered while the insert ran was settled by the database, the first result stands
+            self.recent.setdefault(event_id, owned)
+            if len(self.recent) > INSTANCE_CONFIG['claims_cache_size']:
+                self.recent.popitem(last=False)
+            if owned:
+                self.claimed += 1
+                return True
+
+        # Either another instance claimed it, or it was redelivered to this one
+        self.duplicates += 1
+        return False
+
+    def claim_stored(self, event_id):
+        """Insert the claim, the primary key lets only the first instance succeed"""
+        if self.db is None:
+            return True
+        try:
+            cursor = self.db.execute(
+                'INSERT OR IGNORE INTO claims (event_id, instance, claimed_at) VALUES (?, ?, ?)',
+                (event_id, INSTANCE_ID, time.time()),
+            )
+        except sqlite3.Error as e:
+            # Better to risk a duplicate than to drop the event
+            logger.error(f'Error claiming event {event_id}: {e}')
+            return True
+        return cursor.rowcount == 1
+
+    def prune(self):
+        """Delete claims of events older than the retention period"""
+        # Ids are snowflakes, so the primary key doubles as a creation time index
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=INSTANCE_CONFIG['claims_retention'])
+        return self.db.execute('DELETE FROM claims WHERE event_id < ?', (discord.utils.time_snowflake(cutoff),)).rowcount
+
+    def stats(self):
+        """Get the claim counters"""
+        return {'claimed': self.claimed, 'duplicates': self.duplicates, 'cached': len(self.recent)}
+
+def guard_interactions(bot):
+    """Drop interactions another instance has already claimed before discord.py handles them
+
+    This swaps the INTERACTION_CREATE entry of ConnectionState.parsers, which is
+    private discord.py API (checked against 2.x, where the gateway looks parsers
+    up in the same dict). Parsers are synchronous, so the claim runs in a task
+    and the original parser is called once it is settled.
+    """
+    parsers = bot._connection.parsers
+    parse_interaction_create = parsers['INTERACTION_CREATE']
+    claiming = set()
+
+    async def claim_interaction(data):
+        if await event_claims.claim(int(data['id'])):
+            parse_interaction_create(data)
+        else:
+            logger.warning(f"Interaction {data['id']} was already handled, skipping it")
+
+    def parse_claimed_interaction(data):
+        task = asyncio.create_task(claim_interaction(data))
+        # The loop only keeps weak references to tasks
+        claiming.add(task)
+        task.add_done_callback(claiming.discard)
+
+    parsers['INTERACTION_CREATE'] = parse_claimed_interaction
+
+async def maintain_claims(bot):
+    """Prune expired claims until the bot closes"""
+    while not bot.is_closed():
+        await asyncio.sleep(CLAIMS_PRUNE_INTERVAL)
+        try:
+            pruned = await asyncio.get_running_loop().run_in_executor(event_claims.executor, event_claims.prune)
+            logger.debug(f'Pruned {pruned} expired event claims')
+        except sqlite3.Error as e:
+            logger.error(f'Error pruning event claims: {e}')
+
+instance_lock = InstanceLock()
+event_claims = EventClaims()
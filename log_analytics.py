@@ -0,0 +1,439 @@
+"""Summarize bot.log files offline: command counts, guild activity, ping latency, error rates and duplicate instances.
+
+Log files are read one line at a time, so memory does not grow with their
+size: counters are kept per command, per guild and per time bucket, ping
+latencies go into log-scale histograms (1% precision) instead of being stored,
+and duplicate detection only remembers the last few seconds of records. Files
+ending in .gz are decompressed on the fly, and --rotated expands bot.log into
+its rotations (bot.log.3.gz, bot.log.2, bot.log.1, bot.log) oldest first.
+
+Duplicate instances show up in two ways: "Starting bot" lines from two
+processes within a few seconds of each other, and the same command or event
+being logged twice within a second, which is what two connected processes
+handling every event look like.
+
+Usage: python log_analytics.py bot.log [more.log.gz ...] [--rotated] [--interval hour]
+                               [--format json|csv] [--table commands|guilds|events|timeline|incidents]
+"""
+import os
+import re
+import csv
+import sys
+import glob
+import gzip
+import json
+import math
+import argparse
+import calendar
+from collections import Counter, OrderedDict
+
+# Slices of the asctime timestamp ('2025-08-22 08:35:08,404') that make up each bucket size
+INTERVALS = {'minute': 16, 'hour': 13, 'day': 10}
+
+TABLES = ('commands', 'guilds', 'events', 'timeline', 'incidents')
+
+# Latency histogram bins grow by 1%, so percentiles are within 1% of the exact value
+LATENCY_GROWTH = 1.01
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# Seconds between two "Starting bot" lines for them to count as two processes running at once
+START_WINDOW = 10.0
+
+# Incidents kept in the report, the totals per kind count all of them
+MAX_INCIDENTS = 1000
+
+# "<Name> command used by" lines, the command name is the lowercased name without spaces
+COMMAND_USED = re.compile(r'^(\w[\w ]*?) command used by ')
+
+# Other command log lines of the cogs, by command name
+COMMAND_PATTERNS = [
+    ('exportmembers', re.compile(r'^Member export \(\w+\) used by ')),
+    ('embed', re.compile(r'^Custom embed created by ')),
+    ('embedtemplate', re.compile(r'^Embed templates requested by ')),
+    ('setupverify', re.compile(r'^Verification system setup by ')),
+    ('disableverify', re.compile(r'^Verification system disabled by ')),
+    ('setwelcome', re.compile(r'^Welcome channel set to .* by ')),
+    ('setraidalerts', re.compile(r'^Raid alert channel set to .* by ')),
+    ('setreverify', re.compile(r'^Re-verification set to .* by ')),
+    ('setupgamepicker', re.compile(r'^Game role select menu panel published to ')),
+    ('setupgameroles', re.compile(r'^Game role (panel published to|selection setup by) ')),
+    ('setgameroleexpiry', re.compile(r'^Game role .* expiry set to .* by ')),
+    ('disablegameroles', re.compile(r'^Game role system disabled by ')),
+    ('addgamerole', re.compile(r'^Game role .* added by ')),
+    ('removegamerole', re.compile(r'^Game role .* removed by ')),
+    ('massrole', re.compile(r'^Mass role job .*(started|cancelled) by ')),
+    ('memory', re.compile(r'^Memory (tracing (started|stopped) by|report .* sent to) ')),
+]
+
+# Member and guild events logged by the bot's handlers, by event name
+EVENT_PATTERNS = [
+    ('member_join', re.compile(r'^New member joined: ')),
+    ('verify', re.compile(r'^Verified user: ')),
+    ('unverify', re.compile(r'^Removed verification from user: ')),
+    ('game_role_add', re.compile(r'^Game role .* added to ')),
+    ('game_role_remove', re.compile(r'^Game role .* removed from ')),
+    ('game_role_picker', re.compile(r'^Game roles for .* set through picker')),
+    ('role_expired', re.compile(r'^Role .* expired for ')),
+    ('verification_released', re.compile(r'^Released \d+ queued verifications in ')),
+    ('guild_join', re.compile(r'^Bot joined guild: ')),
+    ('guild_leave', re.compile(r'^Bot left guild: ')),
+]
+
+# The guild name at the end of a command or event line ("... by user in Guild", "... in Guild in 12.5ms")
+GUILD_SUFFIX = re.compile(r'(?:by|to|from|for|user:|joined:) \S+ in (.+?)(?: in [\d.]+ms)?$')
+GUILD_JOINED = re.compile(r'^Bot (?:joined|left) guild: (.+) \(id: \d+\)$')
+
+PING_LATENCY = re.compile(r'API: ([\d.]+)ms, Message: ([\d.]+)ms$')
+COMMAND_ERROR = re.compile(r'^Unhandled error in command (\S+):')
+
+# Varying parts of a line ignored when looking for the same line logged twice
+LINE_NOISE = re.compile(r'\d+(?:\.\d+)?ms')
+
+def command_name(message):
+    """Get the command a discord_bot.commands line was logged by, None if it is not a command line"""
+    match = COMMAND_USED.match(message)
+    if match:
+        return match.group(1).lower().replace(' ', '')
+    for name, pattern in COMMAND_PATTERNS:
+        if pattern.match(message):
+            return name
+    return None
+
+def event_name(message):
+    """Get the event a handler line was logged for, None if it is not an event line"""
+    for name, pattern in EVENT_PATTERNS:
+        if pattern.match(message):
+            return name
+    return None
+
+def guild_name(message):
+    """Get the guild name a command or event line ends with, if any"""
+    match = GUILD_SUFFIX.search(message) or GUILD_JOINED.match(message)
+    return match.group(1) if match else None
+
+def parse_line(line):
+    """Split a log line into (timestamp, logger, level, message), None for tracebacks and other continuation lines"""
+    parts = line.rstrip('\n').split(' - ', 3)
+    if len(parts) != 4 or len(parts[0]) != 23 or parts[0][4] != '-' or parts[0][19] != ',':
+        return None
+    return parts
+
+class Clock:
+    """Turns asctime timestamps into seconds, parsing each date once"""
+
+    def __init__(self):
+        self.date = None
+        self.midnight = 0
+
+    def seconds(self, timestamp):
+        date = timestamp[:10]
+        if date != self.date:
+            self.date = date
+            self.midnight = calendar.timegm((int(date[:4]), int(date[5:7]), int(date[8:10]), 0, 0, 0))
+        return (self.midnight + int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60
+                + int(timestamp[17:19]) + int(timestamp[20:23]) / 1000)
+
+class LatencyHistogram:
+    """Log-scale histogram of latencies in milliseconds"""
+    __slots__ = ('bins', 'count', 'max')
+
+    def __init__(self):
+        self.bins = Counter()
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.bins[math.ceil(math.log(max(ms, 0.01), LATENCY_GROWTH))] += 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, percent):
+        """Get the upper bound of the bin holding the given percentile"""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                return round(min(LATENCY_GROWTH ** index, self.max), 2)
+        return round(self.max, 2)
+
+    def summary(self, prefix):
+        """Get the count, percentiles and maximum as flat fields"""
+        fields = {f'{prefix}_count': self.count}
+        for percent in LATENCY_PERCENTILES:
+            fields[f'{prefix}_p{percent}'] = self.percentile(percent)
+        fields[f'{prefix}_max'] = round(self.max, 2) if self.count else None
+        return fields
+
+class Bucket:
+    """Counters of one time bucket"""
+    __slots__ = ('records', 'errors', 'warnings', 'rate_limits', 'commands', 'command_errors', 'events', 'api', 'message')
+
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.warnings = 0
+        self.rate_limits = 0
+        self.commands = 0
+        self.command_errors = 0
+        self.events = 0
+        self.api = LatencyHistogram()
+        self.message = LatencyHistogram()
+
+    def row(self, bucket):
+        row = {
+            'bucket': bucket,
+            'records': self.records,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.records, 4) if self.records else 0.0,
+            'warnings': self.warnings,
+            'rate_limits': self.rate_limits,
+            'commands': self.commands,
+            'command_errors': self.command_errors,
+            'events': self.events,
+        }
+        row.update(self.api.summary('ping_api_ms'))
+        row.update(self.message.summary('ping_message_ms'))
+        return row
+
+class DuplicateDetector:
+    """Finds signs of two bot processes running on the same token
+
+    Only the records of the last window seconds are remembered, in arrival
+    order, so memory is bounded by the log rate rather than the log size.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.recent = OrderedDict()  # normalized (logger, message) -> seconds it was last logged at
+        self.last_start = None
+        self.totals = Counter()
+        self.incidents = []
+
+    def incident(self, kind, timestamp, detail):
+        self.totals[kind] += 1
+        if len(self.incidents) < MAX_INCIDENTS:
+            self.incidents.append({'time': timestamp, 'kind': kind, 'detail': detail})
+
+    def start(self, seconds, timestamp):
+        """Record a "Starting bot" line"""
+        self.totals['starts'] += 1
+        if self.last_start is not None and 0 <= seconds - self.last_start <= START_WINDOW:
+            self.incident('concurrent_start', timestamp, f'started {seconds - self.last_start:.1f}s after another process')
+        self.last_start = seconds
+
+    def handled(self, seconds, timestamp, logger, message):
+        """Record a command or event line, flagging it if the same line was just logged"""
+        recent = self.recent
+        while recent:
+            key, last_seen = next(iter(recent.items()))
+            if seconds - last_seen <= self.window:
+                break
+            del recent[key]
+
+        key = (logger, LINE_NOISE.sub('', message))
+        last_seen = recent.pop(key, None)
+        if last_seen is not None:
+            self.incident('duplicate_handling', timestamp, f'logged twice {seconds - last_seen:.3f}s apart: {message}')
+        recent[key] = seconds
+
+class LogStats:
+    """Streaming aggregation of bot.log records"""
+
+    def __init__(self, interval='hour', duplicate_window=1.0):
+        self.bucket_size = INTERVALS[interval]
+        self.clock = Clock()
+        self.files = []
+        self.lines = 0
+        self.records = 0
+        self.first = None
+        self.last = None
+        self.levels = Counter()
+        self.commands = Counter()
+        self.command_errors = Counter()
+        self.events = Counter()
+        self.guilds = {}  # guild name -> Counter of commands and events
+        self.buckets = {}
+        self.duplicates = DuplicateDetector(duplicate_window)
+
+    def read(self, path):
+        """Aggregate every line of a log file, plain or gzipped, or stdin for '-'"""
+        self.files.append(path)
+        if path == '-':
+            self.feed(sys.stdin)
+            return
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            self.feed(f)
+
+    def feed(self, lines):
+        for line in lines:
+            self.lines += 1
+            record = parse_line(line)
+            if record is not None:
+                self.add(*record)
+
+    def add(self, timestamp, logger, level, message):
+        """Aggregate one record"""
+        self.records += 1
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        self.levels[level] += 1
+
+        bucket_key = timestamp[:self.bucket_size]
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self.buckets[bucket_key] = Bucket()
+        bucket.records += 1
+        if level in ('ERROR', 'CRITICAL'):
+            bucket.errors += 1
+        elif level == 'WARNING':
+            bucket.warnings += 1
+
+        if not logger.startswith('discord_bot'):
+            if logger == 'discord.http' and message.startswith('We are being rate limited'):
+                bucket.rate_limits += 1
+            return
+
+        if message.startswith('Starting bot'):
+            self.duplicates.start(self.clock.seconds(timestamp), timestamp)
+            return
+        if 'was already handled, skipping it' in message:
+            # The instance guard caught a duplicate before it was handled twice
+            self.duplicates.totals['claims_skipped'] += 1
+            return
+        if 'waiting as a standby' in message:
+            self.duplicates.totals['standby_waits'] += 1
+            return
+
+        match = COMMAND_ERROR.match(message)
+        if match:
+            self.command_errors[match.group(1)] += 1
+            bucket.command_errors += 1
+            return
+
+        if logger == 'discord_bot.commands':
+            name = command_name(message)
+            if name is None:
+                return
+            self.commands[name] += 1
+            bucket.commands += 1
+            kind = 'commands'
+            if name == 'ping':
+                latency = PING_LATENCY.search(message)
+                if latency:
+                    bucket.api.add(float(latency.group(1)))
+                    bucket.message.add(float(latency.group(2)))
+        else:
+            name = event_name(message)
+            if name is None:
+                return
+            self.events[name] += 1
+            bucket.events += 1
+            kind = 'events'
+
+        guild = guild_name(message)
+        if guild is not None:
+            counts = self.guilds.get(guild)
+            if counts is None:
+                counts = self.guilds[guild] = Counter()
+            counts[kind] += 1
+        self.duplicates.handled(self.clock.seconds(timestamp), timestamp, logger, message)
+
+    def table(self, name):
+        """Get the rows of one report table"""
+        if name == 'commands':
+            names = sorted(set(self.commands) | set(self.command_errors), key=lambda command: -self.commands[command])
+            return [{'command': command, 'count': self.commands[command], 'errors': self.command_errors[command]} for command in names]
+        if name == 'guilds':
+            return [{'guild': guild, 'commands': counts['commands'], 'events': counts['events']}
+                    for guild, counts in sorted(self.guilds.items(), key=lambda item: -sum(item[1].values()))]
+        if name == 'events':
+            return [{'event': event, 'count': count} for event, count in self.events.most_common()]
+        if name == 'timeline':
+            return [self.buckets[bucket].row(bucket) for bucket in sorted(self.buckets)]
+        return self.duplicates.incidents
+
+    def report(self):
+        """Get the whole report as one JSON-ready dict"""
+        errors = self.levels['ERROR'] + self.levels['CRITICAL']
+        commands = sum(self.commands.values())
+        return {
+            'files': self.files,
+            'lines': self.lines,
+            'records': self.records,
+            'first': self.first,
+            'last': self.last,
+            'levels': dict(self.levels),
+            'error_rate': round(errors / self.records, 4) if self.records else 0.0,
+            'command_error_rate': round(sum(self.command_errors.values()) / commands, 4) if commands else 0.0,
+            'commands': self.table('commands'),
+            'events': self.table('events'),
+            'guilds': self.table('guilds'),
+            'timeline': self.table('timeline'),
+            'duplicates': {
+                'totals': {kind: self.duplicates.totals[kind] for kind in
+                           ('starts', 'concurrent_start', 'duplicate_handling', 'claims_skipped', 'standby_waits')},
+                'incidents': self.duplicates.incidents,
+            },
+        }
+
+def rotated_paths(path):
+    """Expand a log path into its rotations, oldest first (bot.log.2.gz, bot.log.1, bot.log)"""
+    rotations = []
+    for rotated in glob.glob(glob.escape(path) + '.*'):
+        suffix = rotated[len(path) + 1:].removesuffix('.gz')
+        if suffix.isdigit():
+            rotations.append((int(suffix), rotated))
+    paths = [rotated for _, rotated in sorted(rotations, reverse=True)]
+    if os.path.exists(path):
+        paths.append(path)
+    return paths
+
+def write_csv(rows, out):
+    """Write table rows as CSV with a header taken from the first row"""
+    if not rows:
+        return
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help="log files, plain or .gz, in chronological order ('-' for stdin)")
+    parser.add_argument('--rotated', action='store_true', help='also read the numbered rotations of each path, oldest first')
+    parser.add_argument('--interval', choices=list(INTERVALS), default='hour', help='time bucket of the timeline')
+    parser.add_argument('--duplicate-window', type=float, default=1.0,
+                        help='seconds within which the same command or event line logged twice counts as duplicate handling')
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--table', choices=TABLES, help='table to write with --format csv')
+    parser.add_argument('--output', '-o', help='write to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.format == 'csv' and not args.table:
+        parser.error(f"--format csv needs --table, one of {', '.join(TABLES)}")
+
+    paths = []
+    for path in args.paths:
+        paths.extend(rotated_paths(path) if args.rotated and path != '-' else [path])
+
+    stats = LogStats(args.interval, args.duplicate_window)
+    for path in paths:
+        stats.read(path)
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            write_csv(stats.table(args.table), out)
+        else:
+            json.dump(stats.report(), out, indent=2, ensure_ascii=False)
+            out.write('\n')
+    finally:
+        if args.output:
+            out.close()
+
+if __name__ == '__main__':
+    main()
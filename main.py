@@ -1,9 +1,28 @@
+from startup import startup_profiler
 import discord
 from discord.ext import commands
 import os
+import signal
+import asyncio
 import logging
-from config import BOT_CONFIG, VERIFICATION_CONFIG, get_verification_settings, get_game_role_settings
+from config import BOT_CONFIG, VERIFICATION_CONFIG, OVERLOAD_CONFIG, DISPATCH_CONFIG, get_verification_settings, get_game_role_settings
 from commands import setup_commands
+from member_cache import client_cache_options, forget_guild, resolve_member, is_lean
+from role_picker import GameRoleSelect, GameRoleClear
+from raid import raid_guard, send_raid_alert, release_verifications
+from role_stats import role_counters
+from member_index import member_index
+from event_dispatch import EventDispatcher, ROUTES
+from reaction_filter import reaction_filter
+from role_journal import role_journal, maintain_journal, ADD, CANCELLED, SOURCE_VERIFY, SOURCE_GAME_REACTION, SOURCE_RAID
+from overload import overload, Overloaded, SIMPLE_EMBEDS
+from instance_guard import instance_lock, event_claims, guard_interactions, maintain_claims
+from mass_roles import mass_roles
+from role_expiry import role_expiry
+import runtime
+from gateway_session import load_session, hydrate_guilds, connect_resumed, refresh_members, restart_downtime, gateway_internals, persistence_enabled
+
+startup_profiler.mark('imports')
 
 # Configure logging
 logging.basicConfig(
@@ -27,18 +46,116 @@ class DiscordBot(commands.Bot):
         super().__init__(
             command_prefix=BOT_CONFIG['prefix'],
             intents=intents,
-            help_command=commands.DefaultHelpCommand()
+            help_command=commands.DefaultHelpCommand(),
+            owner_id=BOT_CONFIG['owner_id'],
+            **client_cache_options()
         )
+        self.event_dispatcher = EventDispatcher()
+        # Functions run as background tasks, so the profiler can attribute their samples
+        self.background_tasks = []
+        # Once per invocation, so the help command's check filtering is never held back
+        self.add_check(overload.defer_command, call_once=True)
+    
+    def dispatch(self, event_name, /, *args, **kwargs):
+        """Send routed events to the ordered worker queues instead of a new task each"""
+        if event_name in ROUTES:
+            self.event_dispatcher.submit(event_name, getattr(self, f'handle_{event_name}'), args)
+        # Listeners and wait_for still see every event
+        super().dispatch(event_name, *args, **kwargs)
+    
+    async def setup_hook(self):
+        """Called once before connecting to the gateway"""
+        # Select menu panels are routed by custom_id, so one registration serves every guild
+        self.add_dynamic_items(GameRoleSelect, GameRoleClear)
+        self.event_dispatcher.start()
+        if DISPATCH_CONFIG['filter_reactions']:
+            reaction_filter.install(self)
+        role_journal.open()
+        # Listening before the journal replay, so replayed grants are scheduled to expire as well
+        role_expiry.load()
+        role_journal.listeners.append(role_expiry.roles_changed)
+        # Replayed raid grants go back through the batched release instead of all at once
+        role_journal.deferred[SOURCE_RAID] = raid_guard.requeue_replayed
+        self.start_task(role_expiry.run)
+        self.start_task(maintain_journal)
+        event_claims.open()
+        guard_interactions(self)
+        self.start_task(maintain_claims)
+        mass_roles.load()
+        self.start_task(mass_roles.resume)
+        # Jobs are started as tasks by resume and !massrole
+        self.background_tasks.append(mass_roles.run)
+        self.start_task(release_verifications)
+        if OVERLOAD_CONFIG['enabled']:
+            self.start_task(overload.monitor)
+    
+    def start_task(self, func):
+        """Run func(bot) as a background task and register it with the profiler labels"""
+        if func not in self.background_tasks:
+            self.background_tasks.append(func)
+        return self.loop.create_task(func(self))
+    
+    async def login(self, token):
+        """Log in and record how long it took"""
+        await super().login(token)
+        startup_profiler.mark('login')
+    
+    async def connect(self, *, reconnect=True):
+        """Connect to the gateway, resuming the previous process' session when possible"""
+        session = load_session() if persistence_enabled() else None
+        if session is not None:
+            # Replayed events need their guilds cached before the RESUME is sent
+            await hydrate_guilds(self, session['guild_ids'])
+            startup_profiler.mark('guild hydration')
+            await connect_resumed(self, session)
+            if self.is_closed():
+                return
+        
+        await super().connect(reconnect=reconnect)
+    
+    async def close(self):
+        """Close the bot, keeping the gateway session resumable if persistence is enabled"""
+        if persistence_enabled() and not self.is_closed() and self.ws is not None and self.ws.open:
+            gateway_internals.close_resumably(self.ws, [guild.id for guild in self.guilds])
+        
+        await super().close()
+    
+    async def on_connect(self):
+        """Called when the gateway READY event has been received"""
+        startup_profiler.mark('READY')
     
     async def on_ready(self):
         """Called when the bot is ready and connected to Discord"""
         logger.info(f'{self.user} has connected to Discord!')
         logger.info(f'Bot is in {len(self.guilds)} guild(s)')
         
+        # Only the first ready is part of startup, later ones are reconnects
+        if not startup_profiler.has_phase('guilds available'):
+            startup_profiler.mark('guilds available')
+            startup_profiler.log_breakdown()
+            
+            downtime = restart_downtime()
+            if downtime is not None:
+                logger.info(f'Restart to serving took {downtime:.2f}s')
+        
         # Set bot activity status
         activity = discord.Game(name=f"{BOT_CONFIG['prefix']}help")
         await self.change_presence(activity=activity)
     
+    async def on_resumed(self):
+        """Called when a gateway session has been resumed"""
+        if self.is_ready():
+            return
+        
+        # A session saved by the previous process was resumed, so READY will never
+        # arrive. Finish startup the same way READY would.
+        logger.info(f'Resumed gateway session from the previous process with {len(self.guilds)} guild(s)')
+        startup_profiler.mark('RESUMED')
+        gateway_internals.finish_startup(self)
+        self.dispatch('ready')
+        # Member caches and role counters need the member lists a READY would have chunked
+        self.start_task(refresh_members)
+    
     async def on_guild_join(self, guild):
         """Called when the bot joins a new guild"""
         logger.info(f'Bot joined guild: {guild.name} (id: {guild.id})')
@@ -46,6 +163,9 @@ class DiscordBot(commands.Bot):
     async def on_guild_remove(self, guild):
         """Called when the bot leaves a guild"""
         logger.info(f'Bot left guild: {guild.name} (id: {guild.id})')
+        forget_guild(guild.id)
+        role_counters.forget_guild(guild.id)
+        member_index.forget_guild(guild.id)
     
     async def on_command_error(self, ctx, error):
         """Global error handler for commands"""
@@ -59,21 +179,34 @@ class DiscordBot(commands.Bot):
             await ctx.send("❌ You don't have permission to use this command.")
         elif isinstance(error, commands.BotMissingPermissions):
             await ctx.send("❌ I don't have the required permissions to execute this command.")
+        elif isinstance(error, commands.NotOwner):
+            await ctx.send("❌ This command is only available to the bot owner.")
+        elif isinstance(error, Overloaded):
+            await ctx.send("⏳ The bot is under heavy load right now. Please try again in a minute.")
         else:
             logger.error(f'Unhandled error in command {ctx.command}: {error}')
             await ctx.send("❌ An unexpected error occurred. Please try again later.")
     
-    async def on_member_join(self, member):
-        """Called when a new member joins the server"""
+    async def handle_member_join(self, member):
+        """Called by the event dispatcher when a new member joins the server"""
         guild_id = member.guild.id
         settings = get_verification_settings(guild_id)
         
-        logger.info(f'New member joined: {member} in {member.guild.name}')
+        logger.log(overload.event_log_level(), f'New member joined: {member} in {member.guild.name}')
+        role_counters.apply(guild_id, added_ids=[role.id for role in member.roles])
+        member_index.add(member)
+        
+        if raid_guard.record_join(guild_id):
+            await send_raid_alert(member.guild, "🚨 Raid Mode Enabled", 0xff0000)
+        
+        # Welcome embeds are suppressed while the guild is being raided
+        if raid_guard.in_raid_mode(guild_id):
+            return
         
         # Send welcome message if enabled and channel is set
-        if VERIFICATION_CONFIG['welcome_message_enabled'] and settings.get('welcome_channel_id'):
+        if VERIFICATION_CONFIG['welcome_message_enabled'] and settings.welcome_channel_id:
             try:
-                welcome_channel = member.guild.get_channel(settings['welcome_channel_id'])
+                welcome_channel = member.guild.get_channel(settings.welcome_channel_id)
                 if welcome_channel:
                     welcome_text = VERIFICATION_CONFIG['welcome_message'].format(
                         user=member.mention,
@@ -86,8 +219,8 @@ class DiscordBot(commands.Bot):
                         color=BOT_CONFIG['embed_color']
                     )
                     
-                    if settings['enabled'] and settings['channel_id']:
-                        verify_channel = member.guild.get_channel(settings['channel_id'])
+                    if settings.enabled and settings.channel_id:
+                        verify_channel = member.guild.get_channel(settings.channel_id)
                         if verify_channel:
                             welcome_embed.add_field(
                                 name="🔐 Verification Required",
@@ -95,14 +228,32 @@ class DiscordBot(commands.Bot):
                                 inline=False
                             )
                     
-                    welcome_embed.set_thumbnail(url=member.avatar.url if member.avatar else None)
+                    # Avatar thumbnails are dropped while shedding load
+                    if not overload.shedding(SIMPLE_EMBEDS):
+                        welcome_embed.set_thumbnail(url=member.avatar.url if member.avatar else None)
                     await welcome_channel.send(embed=welcome_embed)
                     
             except Exception as e:
                 logger.error(f'Error sending welcome message: {e}')
     
-    async def on_raw_reaction_add(self, payload):
-        """Called when a reaction is added to any message"""
+    async def on_member_update(self, before, after):
+        """Called when a cached member's profile or roles change"""
+        role_counters.member_updated(before, after)
+        member_index.member_updated(before, after)
+    
+    async def on_user_update(self, before, after):
+        """Called when a user's name or avatar changes"""
+        member_index.user_updated(before, after)
+    
+    async def on_raw_member_remove(self, payload):
+        """Called when a member leaves or is removed from a guild"""
+        member_index.remove(payload.guild_id, payload.user.id)
+        # Only cached members come with their roles
+        if isinstance(payload.user, discord.Member):
+            role_counters.apply(payload.guild_id, removed_ids=[role.id for role in payload.user.roles])
+    
+    async def handle_raw_reaction_add(self, payload):
+        """Called by the event dispatcher when a reaction is added to any message"""
         # Ignore bot reactions
         if payload.user_id == self.user.id:
             return
@@ -111,24 +262,42 @@ class DiscordBot(commands.Bot):
         if not guild:
             return
         
-        member = guild.get_member(payload.user_id)
-        if not member:
+        verification_settings = get_verification_settings(guild.id)
+        game_settings = get_game_role_settings(guild.id)
+        
+        is_verify_reaction = (verification_settings.enabled and 
+            payload.message_id == verification_settings.message_id and 
+            str(payload.emoji) == verification_settings.emoji)
+        is_game_reaction = (game_settings.enabled and 
+            game_settings.is_panel(payload.message_id) and 
+            str(payload.emoji) in game_settings.game_roles)
+        
+        if not (is_verify_reaction or is_game_reaction):
             return
         
-        # Check verification system
-        verification_settings = get_verification_settings(guild.id)
+        member = await resolve_member(guild, payload.user_id, payload.member)
+        if not member:
+            return
         
         # Check if this is a verification reaction
-        if (verification_settings['enabled'] and 
-            payload.message_id == verification_settings['message_id'] and 
-            str(payload.emoji) == verification_settings['emoji']):
+        if is_verify_reaction:
             
             try:
-                role = guild.get_role(verification_settings['role_id'])
+                role = guild.get_role(verification_settings.role_id)
                 
-                if role and role not in member.roles:
-                    await member.add_roles(role, reason="Verified through reaction role")
-                    logger.info(f'Verified user: {member} in {guild.name}')
+                # During a raid grants are queued and released in rate controlled batches
+                if role and role not in member.roles and raid_guard.in_raid_mode(guild.id):
+                    if not raid_guard.is_queued(guild.id, member.id):
+                        # Journaled when queued so the grant survives a restart
+                        seqs = role_journal.begin(ADD, SOURCE_RAID, guild.id, member.id, [role.id])
+                        if not raid_guard.queue_verification(guild.id, member.id, seqs[0]):
+                            role_journal.finish(seqs, CANCELLED)
+                            logger.warning(f'Verification queue full in {guild.name}, dropped {member}')
+                
+                elif role and role not in member.roles:
+                    await role_journal.add_roles(member, role, source=SOURCE_VERIFY, reason="Verified through reaction role")
+                    role_counters.record_uncached(guild, member, added_ids=[role.id])
+                    logger.log(overload.event_log_level(), f'Verified user: {member} in {guild.name}')
                     
                     # Send DM confirmation (optional)
                     try:
@@ -137,7 +306,7 @@ class DiscordBot(commands.Bot):
                             description=f"You have been verified in **{guild.name}**! You now have access to the server.",
                             color=0x00ff00
                         )
-                        await member.send(embed=dm_embed)
+                        await overload.optional_dm(member, dm_embed)
                     except discord.Forbidden:
                         # User has DMs disabled, that's fine
                         pass
@@ -145,27 +314,22 @@ class DiscordBot(commands.Bot):
             except Exception as e:
                 logger.error(f'Error in verification reaction: {e}')
                 
-        # Check game role system
-        game_settings = get_game_role_settings(guild.id)
-        
         # Check if this is a game role reaction
-        if (game_settings['enabled'] and 
-            payload.message_id == game_settings['message_id'] and 
-            str(payload.emoji) in game_settings['game_roles']):
+        if is_game_reaction:
             
             try:
-                role_id = game_settings['game_roles'][str(payload.emoji)]
+                role_id = game_settings.game_roles[str(payload.emoji)]
                 role = guild.get_role(role_id)
                 
                 if role and role not in member.roles:
                     # Check if member has reached max selections
                     current_game_roles = []
-                    for emoji, check_role_id in game_settings['game_roles'].items():
+                    for emoji, check_role_id in game_settings.game_roles.items():
                         check_role = guild.get_role(check_role_id)
                         if check_role and check_role in member.roles:
                             current_game_roles.append(check_role)
                     
-                    max_selections = game_settings.get('max_selections', 5)
+                    max_selections = game_settings.max_selections
                     if len(current_game_roles) >= max_selections:
                         # Remove reaction and notify user
                         try:
@@ -180,7 +344,7 @@ class DiscordBot(commands.Bot):
                                     description=f"You can only have {max_selections} game roles maximum in **{guild.name}**!\nRemove some roles first before adding new ones.",
                                     color=0xff9900
                                 )
-                                await member.send(embed=limit_embed)
+                                await overload.optional_dm(member, limit_embed)
                             except discord.Forbidden:
                                 pass
                                 
@@ -189,8 +353,9 @@ class DiscordBot(commands.Bot):
                         return
                     
                     # Add the game role
-                    await member.add_roles(role, reason="Game role selected through reaction")
-                    logger.info(f'Game role {role.name} added to {member} in {guild.name}')
+                    await role_journal.add_roles(member, role, source=SOURCE_GAME_REACTION, reason="Game role selected through reaction")
+                    role_counters.record_uncached(guild, member, added_ids=[role.id])
+                    logger.log(overload.event_log_level(), f'Game role {role.name} added to {member} in {guild.name}')
                     
                     # Send DM confirmation (optional)
                     try:
@@ -199,7 +364,7 @@ class DiscordBot(commands.Bot):
                             description=f"You now have the **{role.name}** role in **{guild.name}**!",
                             color=0x00ff00
                         )
-                        await member.send(embed=dm_embed)
+                        await overload.optional_dm(member, dm_embed)
                     except discord.Forbidden:
                         # User has DMs disabled, that's fine
                         pass
@@ -207,8 +372,8 @@ class DiscordBot(commands.Bot):
             except Exception as e:
                 logger.error(f'Error in game role reaction: {e}')
     
-    async def on_raw_reaction_remove(self, payload):
-        """Called when a reaction is removed from any message"""
+    async def handle_raw_reaction_remove(self, payload):
+        """Called by the event dispatcher when a reaction is removed from any message"""
         # Ignore bot reactions
         if payload.user_id == self.user.id:
             return
@@ -217,24 +382,39 @@ class DiscordBot(commands.Bot):
         if not guild:
             return
         
-        member = guild.get_member(payload.user_id)
-        if not member:
+        verification_settings = get_verification_settings(guild.id)
+        game_settings = get_game_role_settings(guild.id)
+        
+        is_verify_reaction = (verification_settings.enabled and 
+            payload.message_id == verification_settings.message_id and 
+            str(payload.emoji) == verification_settings.emoji)
+        is_game_reaction = (game_settings.enabled and 
+            game_settings.is_panel(payload.message_id) and 
+            str(payload.emoji) in game_settings.game_roles)
+        
+        if not (is_verify_reaction or is_game_reaction):
             return
         
-        # Check verification system
-        verification_settings = get_verification_settings(guild.id)
+        # Removal payloads carry no member data, so uncached members are fetched
+        member = await resolve_member(guild, payload.user_id)
+        if not member:
+            return
         
         # Check if this is a verification reaction removal
-        if (verification_settings['enabled'] and 
-            payload.message_id == verification_settings['message_id'] and 
-            str(payload.emoji) == verification_settings['emoji']):
+        if is_verify_reaction:
             
             try:
-                role = guild.get_role(verification_settings['role_id'])
+                role = guild.get_role(verification_settings.role_id)
+                
+                # A verification still waiting in the raid queue is simply withdrawn
+                seq = raid_guard.dequeue_verification(guild.id, member.id)
+                if seq is not None:
+                    role_journal.finish([seq], CANCELLED)
                 
                 if role and role in member.roles:
-                    await member.remove_roles(role, reason="Verification reaction removed")
-                    logger.info(f'Removed verification from user: {member} in {guild.name}')
+                    await role_journal.remove_roles(member, role, source=SOURCE_VERIFY, reason="Verification reaction removed")
+                    role_counters.record_uncached(guild, member, removed_ids=[role.id])
+                    logger.log(overload.event_log_level(), f'Removed verification from user: {member} in {guild.name}')
                     
                     # Send DM notification (optional)
                     try:
@@ -243,7 +423,7 @@ class DiscordBot(commands.Bot):
                             description=f"Your verification in **{guild.name}** has been removed. React again to regain access.",
                             color=0xff9900
                         )
-                        await member.send(embed=dm_embed)
+                        await overload.optional_dm(member, dm_embed)
                     except discord.Forbidden:
                         # User has DMs disabled, that's fine
                         pass
@@ -251,21 +431,17 @@ class DiscordBot(commands.Bot):
             except Exception as e:
                 logger.error(f'Error in verification reaction removal: {e}')
                 
-        # Check game role system
-        game_settings = get_game_role_settings(guild.id)
-        
         # Check if this is a game role reaction removal
-        if (game_settings['enabled'] and 
-            payload.message_id == game_settings['message_id'] and 
-            str(payload.emoji) in game_settings['game_roles']):
+        if is_game_reaction:
             
             try:
-                role_id = game_settings['game_roles'][str(payload.emoji)]
+                role_id = game_settings.game_roles[str(payload.emoji)]
                 role = guild.get_role(role_id)
                 
                 if role and role in member.roles:
-                    await member.remove_roles(role, reason="Game role deselected through reaction removal")
-                    logger.info(f'Game role {role.name} removed from {member} in {guild.name}')
+                    await role_journal.remove_roles(member, role, source=SOURCE_GAME_REACTION, reason="Game role deselected through reaction removal")
+                    role_counters.record_uncached(guild, member, removed_ids=[role.id])
+                    logger.log(overload.event_log_level(), f'Game role {role.name} removed from {member} in {guild.name}')
                     
                     # Send DM confirmation (optional)
                     try:
@@ -274,7 +450,7 @@ class DiscordBot(commands.Bot):
                             description=f"The **{role.name}** role has been removed from your profile in **{guild.name}**.",
                             color=0xff9900
                         )
-                        await member.send(embed=dm_embed)
+                        await overload.optional_dm(member, dm_embed)
                     except discord.Forbidden:
                         # User has DMs disabled, that's fine
                         pass
@@ -292,6 +468,15 @@ class DiscordBot(commands.Bot):
         if BOT_CONFIG.get('log_messages', False):
             logger.debug(f'Message from {message.author}: {message.content}')
         
+        # Sending a message keeps a member verified when re-verification is on
+        if isinstance(message.author, discord.Member):
+            role_expiry.touch(message.author)
+        
+        # A command is handled by whichever instance claims the message first
+        if message.content.startswith(BOT_CONFIG['prefix']) and not await event_claims.claim(message.id):
+            logger.warning(f'Message {message.id} was already handled, skipping it')
+            return
+        
         # Process commands
         await self.process_commands(message)
 
@@ -308,12 +493,24 @@ async def main():
     # Create and setup bot
     bot = DiscordBot()
     
+    # Close cleanly on SIGTERM (deploys, process managers) so the session can be saved
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass
+    
     # Setup commands
     await setup_commands(bot)
+    startup_profiler.mark('command registration')
+    
+    # Only one process per host talks to Discord, a second one waits as a standby
+    if not await instance_lock.acquire(bot):
+        return
+    startup_profiler.mark('instance lock')
     
     try:
         # Start the bot
-        logger.info('Starting bot...')
+        logger.info(f"Starting bot with the {'lean' if is_lean() else 'default'} cache profile...")
         await bot.start(token)
     except discord.LoginFailure:
         logger.error('Invalid Discord token provided!')
@@ -333,5 +530,5 @@ if __name__ == '__main__':
     except ImportError:
         logger.warning('python-dotenv not available. Environment variables must be set manually.')
     
-    import asyncio
-    asyncio.run(main())
+    # Event loop and JSON codec depend on RUNTIME_PROFILE
+    runtime.run(main())
@@ -0,0 +1,406 @@
+import os
+import re
+import json
+import time
+import heapq
+import asyncio
+import logging
+from bisect import bisect_right
+from datetime import datetime, timezone
+import discord
+from config import BOT_CONFIG, MASS_ROLE_CONFIG
+from role_stats import role_counters
+from role_journal import role_journal, ADD, SOURCE_MASS
+from overload import overload, SKIP_DMS, SIMPLE_EMBEDS
+
+logger = logging.getLogger('discord_bot.mass_roles')
+
+# Longest a scan of cached members runs before yielding to the event loop, in seconds
+MAX_BLOCK_SECONDS = 0.002
+
+# Cached members sorted by id between yields to the event loop
+SORT_SLICE = 2000
+
+# Successful role changes between rate increases
+RATE_STEP_AFTER = 10
+
+ROLE_MENTION = re.compile(r'<@&(\d+)>$')
+
+def find_role(guild, text):
+    """Resolve a role mention, id or name"""
+    match = ROLE_MENTION.match(text)
+    if match or text.isdigit():
+        role = guild.get_role(int(match.group(1) if match else text))
+    else:
+        role = discord.utils.find(lambda r: r.name.lower() == text.lower(), guild.roles)
+    if role is None:
+        raise ValueError(f"Role `{text}` not found")
+    return role
+
+def parse_date(text):
+    """Parse a YYYY-MM-DD date as a UTC timestamp"""
+    try:
+        return datetime.strptime(text, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        raise ValueError(f"`{text}` is not a date, use YYYY-MM-DD") from None
+
+def parse_filters(guild, tokens):
+    """Parse massrole filters into a JSON serializable dict
+
+    Filters: bots, humans, has-role:<role>, lacks-role:<role>, joined-before:<date>, joined-after:<date>.
+    """
+    filters = {'has': [], 'lacks': [], 'joined_before': None, 'joined_after': None, 'bots': None}
+    for token in tokens:
+        name, _, value = token.partition(':')
+        name = name.lower().removesuffix('-role')
+        if name in ('bots', 'humans') and not value:
+            filters['bots'] = name == 'bots'
+        elif name in ('has', 'lacks') and value:
+            filters[name].append(find_role(guild, value).id)
+        elif name in ('joined-before', 'joined-after') and value:
+            filters[name.replace('-', '_')] = parse_date(value)
+        else:
+            raise ValueError(f"Unknown filter `{token}`")
+    return filters
+
+def member_matches(member, filters):
+    """Check a member against massrole filters"""
+    if filters['bots'] is not None and member.bot != filters['bots']:
+        return False
+    if any(member.get_role(role_id) is None for role_id in filters['has']):
+        return False
+    if any(member.get_role(role_id) is not None for role_id in filters['lacks']):
+        return False
+    if filters['joined_before'] is not None or filters['joined_after'] is not None:
+        if member.joined_at is None:
+            return False
+        joined = member.joined_at.timestamp()
+        if filters['joined_before'] is not None and joined >= filters['joined_before']:
+            return False
+        if filters['joined_after'] is not None and joined < filters['joined_after']:
+            return False
+    return True
+
+def describe_filters(guild, filters):
+    """Describe massrole filters for an embed"""
+    parts = []
+    if filters['bots'] is not None:
+        parts.append('bots' if filters['bots'] else 'humans')
+    for name in ('has', 'lacks'):
+        for role_id in filters[name]:
+            role = guild.get_role(role_id)
+            parts.append(f"{name} {role.mention if role else role_id}")
+    for name in ('joined_before', 'joined_after'):
+        if filters[name] is not None:
+            parts.append(f"{name.replace('_', ' ')} <t:{int(filters[name])}:d>")
+    return ', '.join(parts) or 'all members'
+
+def member_id(member):
+    return member.id
+
+async def iter_members_after(guild, after_id):
+    """Yield the members of a guild in id order, starting after a member id"""
+    if not guild.chunked:
+        # The API pages members by ascending id, which is what makes resuming possible
+        async for member in guild.fetch_members(limit=None, after=discord.Object(after_id) if after_id else None):
+            yield member
+        return
+
+    # Each slice is sorted on its own and the slices are merged lazily, so no
+    # single step sorts the whole member list while the loop waits
+    members = guild.members
+    runs = []
+    for start in range(0, len(members), SORT_SLICE):
+        run = sorted(members[start:start + SORT_SLICE], key=member_id)
+        runs.append(run[bisect_right(run, after_id, key=member_id):])
+        await asyncio.sleep(0)
+
+    slice_start = time.perf_counter()
+    for member in heapq.merge(*runs, key=member_id):
+        yield member
+        # Most cached members need no API call, do not hold the loop through all of them
+        if time.perf_counter() - slice_start > MAX_BLOCK_SECONDS:
+            await asyncio.sleep(0)
+            slice_start = time.perf_counter()
+
+class MassRoleJob:
+    """A running !massrole job, as checkpointed to disk"""
+    __slots__ = (
+        'guild_id', 'channel_id', 'message_id', 'author', 'op', 'role_id', 'filters', 'cursor',
+        'scanned', 'matched', 'changed', 'unchanged', 'failed', 'elapsed', 'cancelled', 'error',
+    )
+    SAVED = __slots__[:-2]
+
+    def __init__(self, guild_id, channel_id, message_id, author, op, role_id, filters, cursor=0,
+                 scanned=0, matched=0, changed=0, unchanged=0, failed=0, elapsed=0.0):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.author = author
+        self.op = op
+        self.role_id = role_id
+        self.filters = filters
+        self.cursor = cursor  # id of the last member looked at
+        self.scanned = scanned
+        self.matched = matched
+        self.changed = changed
+        self.unchanged = unchanged
+        self.failed = failed
+        self.elapsed = elapsed  # seconds spent running, across restarts
+        self.cancelled = False
+        self.error = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.SAVED}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.SAVED if name in data})
+
+    def eta(self, member_count):
+        """Estimate the seconds left from the share of the member list scanned so far"""
+        if not self.scanned or not self.elapsed:
+            return None
+        remaining = max(member_count - self.scanned, 0)
+        return self.elapsed / self.scanned * remaining
+
+class RatePacer:
+    """Spaces out role changes, backing off whenever Discord answers with a 429
+
+    The rate is halved on every rate limit the bot hits, whatever caused it, and
+    raised a little after each run of successful changes, so a job settles just
+    under the limit. It waits entirely while the bot is shedding load, so the
+    job never competes with reactions and commands for the same buckets.
+    """
+
+    def __init__(self):
+        self.rate = MASS_ROLE_CONFIG['start_rate']
+        self.next_at = 0.0
+        self.seen_limits = overload.rate_limits.total
+        self.streak = 0
+
+    async def wait(self):
+        """Wait until the next role change may start"""
+        while overload.shedding(SKIP_DMS):
+            await asyncio.sleep(1)
+
+        if overload.rate_limits.total != self.seen_limits:
+            self.seen_limits = overload.rate_limits.total
+            self.rate = max(MASS_ROLE_CONFIG['min_rate'], self.rate / 2)
+            self.streak = 0
+
+        now = time.monotonic()
+        if self.next_at > now:
+            await asyncio.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + 1 / self.rate
+
+    def succeeded(self):
+        """Count a successful change, raising the rate after a run of them"""
+        self.streak += 1
+        if self.streak >= RATE_STEP_AFTER:
+            self.streak = 0
+            self.rate = min(MASS_ROLE_CONFIG['max_rate'], self.rate + 0.5)
+
+def progress_embed(job, guild, rate=None):
+    """Build the progress embed of a job"""
+    role = guild.get_role(job.role_id)
+    action = "Adding" if job.op == ADD else "Removing"
+    if job.error:
+        title, color = "❌ Mass Role Stopped", 0xff0000
+    elif job.cancelled:
+        title, color = "⏹️ Mass Role Cancelled", 0xff9900
+    elif rate is None:
+        title, color = "✅ Mass Role Complete", 0x00ff00
+    else:
+        title, color = "⏳ Mass Role in Progress", BOT_CONFIG['embed_color']
+
+    embed = discord.Embed(
+        title=title,
+        description=f"{action} {role.mention if role else job.role_id} for {describe_filters(guild, job.filters)}",
+        color=color
+    )
+    embed.add_field(name="Scanned", value=f"{job.scanned} / {max(guild.member_count or 0, job.scanned)}", inline=True)
+    embed.add_field(name="Matched", value=job.matched, inline=True)
+    embed.add_field(name="Changed", value=job.changed, inline=True)
+    embed.add_field(name="Already Done", value=job.unchanged, inline=True)
+    embed.add_field(name="Failed", value=job.failed, inline=True)
+    if rate is not None:
+        eta = job.eta(guild.member_count or 0)
+        embed.add_field(name="Rate", value=f"{rate:.1f} changes/s", inline=True)
+        embed.add_field(name="ETA", value=f"{eta / 60:.0f} min" if eta is not None else "Estimating...", inline=True)
+    if job.error:
+        embed.add_field(name="Error", value=job.error[:1024], inline=False)
+    embed.set_footer(text=f"Started by {job.author} | {job.elapsed:.0f}s elapsed")
+    return embed
+
+class MassRoleManager:
+    """Runs !massrole jobs, one per guild, checkpointed so they survive restarts"""
+
+    def __init__(self):
+        self.path = MASS_ROLE_CONFIG['path']
+        self.jobs = {}  # guild_id -> MassRoleJob
+        self.tasks = {}  # guild_id -> asyncio.Task
+
+    def load(self):
+        """Load the jobs checkpointed by the previous process"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f'Ignoring unreadable mass role checkpoint: {e}')
+            return
+        for entry in data:
+            job = MassRoleJob.from_dict(entry)
+            self.jobs[job.guild_id] = job
+        if self.jobs:
+            logger.info(f'Loaded {len(self.jobs)} unfinished mass role jobs')
+
+    def save(self):
+        """Checkpoint the running jobs, replacing the file atomically"""
+        path = self.path + '.tmp'
+        try:
+            with open(path, 'w') as f:
+                json.dump([job.to_dict() for job in self.jobs.values()], f)
+            os.replace(path, self.path)
+        except OSError as e:
+            logger.error(f'Error saving mass role checkpoint: {e}')
+
+    def start(self, bot, job):
+        """Start running a job"""
+        self.jobs[job.guild_id] = job
+        self.save()
+        self.tasks[job.guild_id] = asyncio.create_task(self.run(bot, job))
+
+    async def resume(self, bot):
+        """Resume the checkpointed jobs once the guilds are available"""
+        await bot.wait_until_ready()
+        for job in list(self.jobs.values()):
+            if job.guild_id not in self.tasks:
+                logger.info(f'Resuming mass role job in guild {job.guild_id} after member {job.cursor}')
+                self.tasks[job.guild_id] = asyncio.create_task(self.run(bot, job))
+
+    def cancel(self, guild_id):
+        """Ask the job of a guild to stop, returning False if there is none"""
+        job = self.jobs.get(guild_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        return True
+
+    async def run(self, bot, job):
+        """Go through the members of the guild, changing the role of the matching ones"""
+        guild = bot.get_guild(job.guild_id)
+        role = guild.get_role(job.role_id) if guild else None
+        if role is None:
+            logger.warning(f'Dropping mass role job in guild {job.guild_id}, the guild or role is gone')
+            self.finish(job)
+            return
+
+        pacer = RatePacer()
+        slots = asyncio.Semaphore(MASS_ROLE_CONFIG['concurrency'])
+        in_flight = set()
+        started = time.monotonic() - job.elapsed
+        last_checkpoint = last_progress = time.monotonic()
+        try:
+            async for member in iter_members_after(guild, job.cursor):
+                if job.cancelled or job.error:
+                    break
+                matched = member_matches(member, job.filters)
+                done = (member.get_role(role.id) is not None) == (job.op == ADD)
+                if matched and not done:
+                    await slots.acquire()
+                    await pacer.wait()
+                    # Journaled before the cursor moves past the member, so a change that has
+                    # not started yet at a shutdown or crash is still redone by the replay
+                    seqs = role_journal.begin(job.op, SOURCE_MASS, guild.id, member.id, [role.id])
+                    task = asyncio.create_task(self.change(job, member, role, pacer, slots, seqs))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+                # Counted only once the change is journaled, a shutdown while waiting redoes this member
+                job.scanned += 1
+                job.cursor = member.id
+                if matched:
+                    job.matched += 1
+                    job.unchanged += done
+
+                now = time.monotonic()
+                job.elapsed = now - started
+                # Members whose change is still in flight at a crash are redone by the role journal replay,
+                # their intents were written before the cursor moved past them
+                if now - last_checkpoint >= MASS_ROLE_CONFIG['checkpoint_interval']:
+                    self.save()
+                    last_checkpoint = now
+                if now - last_progress >= MASS_ROLE_CONFIG['progress_interval']:
+                    await self.report(bot, job, guild, pacer.rate)
+                    last_progress = now
+
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        except discord.HTTPException as e:
+            job.error = f"Could not fetch the member list: {e}"
+            logger.error(f'Error in mass role job in {guild.name}: {e}')
+        except asyncio.CancelledError:
+            # The bot is shutting down, pick up from here after the restart
+            job.elapsed = time.monotonic() - started
+            self.save()
+            raise
+
+        job.elapsed = time.monotonic() - started
+        await self.report(bot, job, guild)
+        logger.info(
+            f'Mass role job in {guild.name} {"cancelled" if job.cancelled else "stopped" if job.error else "finished"}: '
+            f'{job.changed} changed, {job.unchanged} already done, {job.failed} failed in {job.elapsed:.0f}s'
+        )
+        self.finish(job)
+
+    async def change(self, job, member, role, pacer, slots, seqs):
+        """Change the role of one member, its intent already journaled as seqs"""
+        action = 'add' if job.op == ADD else 'remove'
+        try:
+            await role_journal.apply(member, job.op, [role], SOURCE_MASS, f"!massrole {action} by {job.author}", seqs)
+            if job.op == ADD:
+                role_counters.record_uncached(member.guild, member, added_ids=[role.id])
+            else:
+                role_counters.record_uncached(member.guild, member, removed_ids=[role.id])
+            job.changed += 1
+            pacer.succeeded()
+        except discord.Forbidden as e:
+            # Lost the permission or the role moved above the bot, every other change would fail too
+            job.failed += 1
+            job.error = f"Missing permissions to {action} the role: {e}"
+        except discord.HTTPException as e:
+            job.failed += 1
+            logger.error(f'Error in mass role change for {member}: {e}')
+        finally:
+            slots.release()
+
+    async def report(self, bot, job, guild, rate=None):
+        """Update the progress message, posting a new one if it is gone"""
+        # Progress edits are optional work, the final report always goes out
+        if rate is not None and overload.shedding(SIMPLE_EMBEDS):
+            return
+        channel = guild.get_channel(job.channel_id)
+        if channel is None:
+            return
+        embed = progress_embed(job, guild, rate)
+        try:
+            await channel.get_partial_message(job.message_id).edit(embed=embed)
+        except discord.NotFound:
+            try:
+                message = await channel.send(embed=embed)
+                job.message_id = message.id
+            except discord.HTTPException as e:
+                logger.error(f'Error posting mass role progress: {e}')
+        except discord.HTTPException as e:
+            logger.error(f'Error updating mass role progress: {e}')
+
+    def finish(self, job):
+        """Forget a job that is done"""
+        self.jobs.pop(job.guild_id, None)
+        self.tasks.pop(job.guild_id, None)
+        self.save()
+
+mass_roles = MassRoleManager()
@@ -0,0 +1,63 @@
+import time
+import logging
+import discord
+from config import CACHE_CONFIG
+
+logger = logging.getLogger('discord_bot.member_cache')
+
+# guild_id -> monotonic time of the last lazy chunk
+_chunked_at = {}
+
+def is_lean():
+    """Check if the lean cache profile is active"""
+    return CACHE_CONFIG['profile'] == 'lean'
+
+def client_cache_options():
+    """Get the discord.py client caching options for the configured profile"""
+    if not is_lean():
+        return {}
+
+    return {
+        # All reaction handling uses raw events, so the message cache is never read
+        'max_messages': None,
+        # handle_raw_reaction_add gets the member from the payload, nothing else needs a cache
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        # Guilds are chunked lazily by ensure_chunked instead
+        'chunk_guilds_at_startup': False,
+    }
+
+async def ensure_chunked(guild):
+    """Make sure the full member list of a guild is cached, chunking it on first use"""
+    if guild.chunked:
+        return
+
+    # With the lean profile new joins are not cached, so a chunked guild drifts out
+    # of sync over time. Only chunk again once the refresh interval has passed.
+    chunked_at = _chunked_at.get(guild.id)
+    if chunked_at is not None and time.monotonic() - chunked_at < CACHE_CONFIG['chunk_refresh_interval']:
+        return
+
+    start_time = time.perf_counter()
+    await guild.chunk(cache=True)
+    _chunked_at[guild.id] = time.monotonic()
+
+    elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+    logger.info(f'Chunked {guild.member_count} members of {guild.name} in {elapsed}ms')
+
+def forget_guild(guild_id):
+    """Drop the lazy chunking state of a guild the bot has left"""
+    _chunked_at.pop(guild_id, None)
+
+async def resolve_member(guild, user_id, member=None):
+    """Get a member from the event payload, the cache, or the API as a last resort"""
+    if member is not None:
+        return member
+
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+
+    try:
+        return await guild.fetch_member(user_id)
+    except (discord.NotFound, discord.HTTPException):
+        return None
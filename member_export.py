@@ -0,0 +1,139 @@
+import io
+import csv
+import gzip
+import json
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+from config import EXPORT_CONFIG, get_verification_settings, get_game_role_settings
+
+logger = logging.getLogger('discord_bot.member_export')
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+CSV_COLUMNS = ('id', 'name', 'display_name', 'bot', 'joined_at', 'roles', 'verified', 'game_roles')
+
+class ExportResult:
+    """Compressed member export ready to upload"""
+    __slots__ = ('file', 'rows', 'raw_size', 'size', 'elapsed')
+
+    def __init__(self, file, rows, raw_size, size, elapsed):
+        self.file = file
+        self.rows = rows
+        self.raw_size = raw_size
+        self.size = size
+        self.elapsed = elapsed
+
+async def iter_members(guild):
+    """Yield every member of a guild without building rows for all of them up front"""
+    if guild.chunked:
+        # Already in the cache. guild.members copies it into a list of references
+        # (8 bytes per member), which the walk needs: the cache itself changes
+        # size whenever someone joins or leaves while this generator is suspended.
+        for member in guild.members:
+            yield member
+        return
+
+    # Not cached (lean profile), page through the API 1000 members at a time
+    # instead of chunking the whole guild into the cache
+    async for member in guild.fetch_members(limit=None):
+        yield member
+
+def member_rows(members, guild):
+    """Build an export row for each member, as an async generator"""
+    verify_role_id = get_verification_settings(guild.id).role_id
+    game_role_ids = set(get_game_role_settings(guild.id).game_roles.role_ids)
+
+    async def rows():
+        async for member in members:
+            roles = [role for role in member.roles if not role.is_default()]
+            yield {
+                'id': member.id,
+                'name': member.name,
+                'display_name': member.display_name,
+                'bot': member.bot,
+                'joined_at': member.joined_at.isoformat() if member.joined_at else None,
+                'roles': [role.name for role in roles],
+                'verified': verify_role_id is not None and any(role.id == verify_role_id for role in roles),
+                'game_roles': [role.name for role in roles if role.id in game_role_ids],
+            }
+
+    return rows()
+
+def encode_csv(batch, header):
+    """Encode a batch of rows as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for row in batch:
+        writer.writerow([';'.join(row[key]) if key in ('roles', 'game_roles') else row[key] for key in CSV_COLUMNS])
+    return buffer.getvalue().encode('utf-8')
+
+def encode_ndjson(batch, header):
+    """Encode a batch of rows as newline delimited JSON"""
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch).encode('utf-8')
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson}
+
+async def write_rows(rows, fmt, out):
+    """Write rows to a file in batches, yielding to the event loop every few milliseconds
+
+    The yield check runs between rows, so the longest the loop is held is
+    EXPORT_MAX_BLOCK_MS plus the encoding of one batch. At most one batch of
+    rows is held at a time.
+    """
+    encode = ENCODERS[fmt]
+    batch_size = EXPORT_CONFIG['batch_size']
+    max_block = EXPORT_CONFIG['max_block_ms'] / 1000
+    count = 0
+    batch = []
+    resumed_at = time.perf_counter()
+
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            out.write(encode(batch, count == 0))
+            count += len(batch)
+            batch.clear()
+
+        # Cached members never await anything, give other events a turn
+        if time.perf_counter() - resumed_at >= max_block:
+            await asyncio.sleep(0)
+            resumed_at = time.perf_counter()
+
+    if batch or count == 0:
+        out.write(encode(batch, count == 0))
+        count += len(batch)
+
+    return count
+
+def compress(source):
+    """gzip a file into a new spooled temp file, blocking, run it in a worker thread"""
+    source.seek(0)
+    target = tempfile.SpooledTemporaryFile(max_size=EXPORT_CONFIG['spool_max_size'])
+    with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=EXPORT_CONFIG['compress_level']) as gz:
+        shutil.copyfileobj(source, gz, 64 * 1024)
+    size = target.tell()
+    target.seek(0)
+    return target, size
+
+async def export_members(guild, fmt='csv'):
+    """Stream the member roster of a guild into a gzipped CSV or NDJSON temp file
+
+    Members flow through a generator pipeline into a spooled temp file that
+    spills to disk past EXPORT_SPOOL_MAX_SIZE. Memory is bounded by one reference
+    per cached member, one batch of rows and EXPORT_SPOOL_MAX_SIZE for each of the
+    raw and compressed files. The caller owns and must close the returned file.
+    """
+    start_time = time.perf_counter()
+
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_CONFIG['spool_max_size']) as raw:
+        count = await write_rows(member_rows(iter_members(guild), guild), fmt, raw)
+        raw_size = raw.tell()
+        compressed, size = await asyncio.to_thread(compress, raw)
+
+    elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+    logger.info(f'Exported {count} members of {guild.name} as {fmt}: {raw_size} bytes, {size} gzipped, in {elapsed}ms')
+    return ExportResult(compressed, count, raw_size, size, elapsed)
@@ -0,0 +1,214 @@
+import re
+import time
+import heapq
+import bisect
+import itertools
+import asyncio
+import logging
+from discord.ext import commands
+
+logger = logging.getLogger('discord_bot.member_index')
+
+# Members indexed between yields to the event loop while building an index
+INDEX_BUILD_SLICE = 2000
+
+# Members sharing one name (ignoring case) that are checked for an exact match
+INDEX_MAX_SAME_NAME = 25
+
+def member_keys(member):
+    """Get the names a member can be looked up by: user name, global name and nickname"""
+    keys = (member.name,)
+    if member.global_name and member.global_name not in keys:
+        keys += (member.global_name,)
+    if member.nick and member.nick not in keys:
+        keys += (member.nick,)
+    return keys
+
+def lowered_keys(member):
+    """Get the lowercased names of a member, as stored in the index"""
+    return tuple({key.lower(): None for key in member_keys(member)})
+
+class GuildMemberIndex:
+    """Name lookup index over the cached members of one guild
+
+    names is a sorted list of (lowercased name, member id) searched with bisect,
+    so exact and prefix lookups cost O(log members) instead of a scan.
+    """
+    __slots__ = ('names', 'keys')
+
+    def __init__(self):
+        self.names = []  # sorted (name.lower(), member id)
+        self.keys = {}  # member id -> lowercased names indexed for it
+
+    async def build(self, members):
+        """Index a full member list, yielding to the event loop between slices"""
+        # Each slice is sorted on its own, then they are merged a slice at a
+        # time, so no single step blocks the loop for the whole guild
+        runs = []
+        for start in range(0, len(members), INDEX_BUILD_SLICE):
+            run = []
+            for member in members[start:start + INDEX_BUILD_SLICE]:
+                keys = self.keys[member.id] = lowered_keys(member)
+                run.extend((key, member.id) for key in keys)
+            run.sort()
+            runs.append(run)
+            await asyncio.sleep(0)
+
+        merged = heapq.merge(*runs)
+        while True:
+            chunk = list(itertools.islice(merged, INDEX_BUILD_SLICE))
+            self.names.extend(chunk)
+            if len(chunk) < INDEX_BUILD_SLICE:
+                break
+            await asyncio.sleep(0)
+
+    def add(self, member):
+        """Index a member, replacing the names indexed for it before"""
+        keys = lowered_keys(member)
+        if self.keys.get(member.id) == keys:
+            return
+        self.remove(member.id)
+        self.keys[member.id] = keys
+        for key in keys:
+            bisect.insort(self.names, (key, member.id))
+
+    def remove(self, member_id):
+        """Drop a member from the index"""
+        for key in self.keys.pop(member_id, ()):
+            entry = (key, member_id)
+            index = bisect.bisect_left(self.names, entry)
+            if index < len(self.names) and self.names[index] == entry:
+                del self.names[index]
+
+    def lookup(self, name, prefix=False, limit=2):
+        """Get up to limit distinct ids of members named name, or with a name starting with it, case insensitively"""
+        name = name.lower()
+        ids = []
+        index = bisect.bisect_left(self.names, (name,))
+        while index < len(self.names) and len(ids) < limit:
+            key, member_id = self.names[index]
+            if key != name and not (prefix and key.startswith(name)):
+                break
+            if member_id not in ids:
+                ids.append(member_id)
+            index += 1
+        return ids
+
+class MemberIndex:
+    """Per guild member name indexes, built on first lookup and kept up to date from member events"""
+
+    def __init__(self):
+        self.guilds = {}
+        self.building = {}  # guild_id -> task building its index
+
+    async def get(self, guild):
+        """Get the index of a guild, building it if its member list is cached"""
+        index = self.guilds.get(guild.id)
+        if index is not None or not guild.chunked:
+            return index
+
+        task = self.building.get(guild.id)
+        if task is None:
+            task = self.building[guild.id] = asyncio.create_task(self.build(guild))
+        return await asyncio.shield(task)
+
+    async def build(self, guild):
+        """Build the index of a guild from its cached members"""
+        start_time = time.perf_counter()
+        index = GuildMemberIndex()
+        try:
+            await index.build(guild.members)
+        finally:
+            self.building.pop(guild.id, None)
+        # Registered once complete, members that join meanwhile are found by the gateway fallback
+        self.guilds[guild.id] = index
+
+        elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+        logger.info(f'Indexed {len(index.keys)} members of {guild.name} in {elapsed}ms')
+        return index
+
+    async def find(self, guild, argument):
+        """Look up a member by name#discriminator, exact name, or an unambiguous name prefix"""
+        index = await self.get(guild)
+        if index is None:
+            return None
+
+        username, _, discriminator = argument.rpartition('#')
+        if username and (discriminator == '0' or (len(discriminator) == 4 and discriminator.isdigit())):
+            for member in self.members(guild, index, index.lookup(username, limit=INDEX_MAX_SAME_NAME)):
+                if member.name == username and member.discriminator == discriminator:
+                    return member
+            return None
+
+        # Exact match first, the same as Guild.get_member_named
+        found = list(self.members(guild, index, index.lookup(argument, limit=INDEX_MAX_SAME_NAME)))
+        for member in found:
+            if argument in member_keys(member):
+                return member
+
+        # Then a case insensitive or partial match, as long as it points at a single member
+        if len(found) != 1:
+            found = list(self.members(guild, index, index.lookup(argument, prefix=True)))
+        if len(found) == 1:
+            return found[0]
+        return None
+
+    def members(self, guild, index, member_ids):
+        """Resolve indexed ids to cached members, dropping the ones that left the cache"""
+        for member_id in list(member_ids):
+            member = guild.get_member(member_id)
+            if member is None:
+                index.remove(member_id)
+            else:
+                yield member
+
+    def add(self, member):
+        """Index a member that joined"""
+        index = self.guilds.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    def remove(self, guild_id, member_id):
+        """Drop a member that left"""
+        index = self.guilds.get(guild_id)
+        if index is not None:
+            index.remove(member_id)
+
+    def member_updated(self, before, after):
+        """Reindex a member whose nickname changed"""
+        if before.nick != after.nick:
+            self.add(after)
+
+    def user_updated(self, before, after):
+        """Reindex a user whose user name or global name changed, in every guild"""
+        if before.name == after.name and before.global_name == after.global_name:
+            return
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                self.add(member)
+
+    def forget_guild(self, guild_id):
+        """Drop the index of a guild the bot has left"""
+        self.guilds.pop(guild_id, None)
+        task = self.building.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+member_index = MemberIndex()
+
+class IndexedMember(commands.MemberConverter):
+    """Member converter that looks names up in the member index instead of scanning the member list"""
+
+    async def convert(self, ctx, argument):
+        if ctx.guild is None or self._get_id_match(argument) or re.match(r'<@!?([0-9]{15,20})>$', argument):
+            # Ids and mentions are already dict lookups
+            return await super().convert(ctx, argument)
+
+        member = await member_index.find(ctx.guild, argument)
+        if member is None:
+            # Not cached (lean profile), or joined after the index was built: let Discord search it
+            member = await self.query_member_named(ctx.guild, argument)
+        if member is None:
+            raise commands.MemberNotFound(argument)
+        return member
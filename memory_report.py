@@ -0,0 +1,173 @@
+import sys
+import time
+import random
+import asyncio
+import logging
+import tracemalloc
+import discord
+from discord.state import ConnectionState
+import config
+from role_stats import role_counters
+from member_index import member_index
+from role_journal import role_journal
+from raid import raid_guard
+
+logger = logging.getLogger('discord_bot.memory_report')
+
+# Snapshots kept for diffing, oldest dropped first
+MAX_SNAPSHOTS = 5
+
+# Entries sampled per structure when estimating its size
+SIZE_SAMPLE = 200
+
+# Objects shared by everything in the cache, followed they would count the whole bot
+SHARED_TYPES = (
+    discord.Client, ConnectionState, discord.Guild, discord.abc.GuildChannel, discord.abc.PrivateChannel,
+    discord.Role, discord.ClientUser, type, type(sys), type(lambda: None),
+)
+
+# tracemalloc's own bookkeeping and the import system are noise in the reports
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+class MemoryTracker:
+    """tracemalloc session driven by the owner, nothing is traced until it is started"""
+
+    def __init__(self):
+        self.snapshots = []  # (label, snapshot)
+        self.started_at = None
+
+    @property
+    def active(self):
+        """Check if allocations are being traced"""
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        """Start tracing allocations, keeping frames of traceback per allocation"""
+        if self.active:
+            return False
+        tracemalloc.start(frames)
+        self.started_at = time.monotonic()
+        return True
+
+    def stop(self):
+        """Stop tracing and free the traces and snapshots"""
+        if not self.active:
+            return False
+        tracemalloc.stop()
+        self.snapshots.clear()
+        self.started_at = None
+        return True
+
+    def snapshot(self):
+        """Take a snapshot, returning its label"""
+        label = f"#{len(self.snapshots) + 1} at +{time.monotonic() - self.started_at:.0f}s"
+        # Filtering is slow in Python, the reports do it in their worker thread
+        self.snapshots.append((label, tracemalloc.take_snapshot()))
+        del self.snapshots[:-MAX_SNAPSHOTS]
+        return label
+
+def format_top(label, snapshot, limit, key_type='lineno'):
+    """Report the top allocation sites of a snapshot, blocking, run it in a worker thread"""
+    stats = snapshot.filter_traces(SNAPSHOT_FILTERS).statistics(key_type)
+    total = sum(stat.size for stat in stats)
+    lines = [f"Top {limit} allocation sites by {key_type} in snapshot {label}, {total / 2**20:.1f} MiB traced", ""]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:9} blocks  {frame.filename}:{frame.lineno}")
+        for extra in stat.traceback[1:]:
+            lines.append(f"{'':32}{extra.filename}:{extra.lineno}")
+    return "\n".join(lines)
+
+def format_diff(old_label, old, new_label, new, limit):
+    """Report what grew between two snapshots, blocking, run it in a worker thread"""
+    stats = new.filter_traces(SNAPSHOT_FILTERS).compare_to(old.filter_traces(SNAPSHOT_FILTERS), 'lineno')
+    growth = sum(stat.size_diff for stat in stats)
+    lines = [f"Top {limit} changes from snapshot {old_label} to {new_label}, {growth / 2**20:+.2f} MiB overall", ""]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+9} blocks  "
+            f"(now {stat.size / 1024:.1f} KiB)  {frame.filename}:{frame.lineno}"
+        )
+    return "\n".join(lines)
+
+def deep_size(obj, seen):
+    """Size of an object and what it references, stopping at objects shared across the cache"""
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                slots = getattr(cls, '__slots__', ())
+                for name in (slots,) if isinstance(slots, str) else slots:
+                    if name.startswith('__'):
+                        continue
+                    value = getattr(obj, name, None)
+                    if value is not None:
+                        stack.append(value)
+    return size
+
+def estimate_size(values):
+    """Estimate the size of many similar objects from a random sample of them, returning (count, bytes)"""
+    values = list(values)
+    if not values:
+        return 0, 0
+    sample = random.sample(values, min(SIZE_SAMPLE, len(values)))
+    seen = set()
+    sampled = sum(deep_size(value, seen) for value in sample)
+    return len(values), sampled * len(values) // len(sample)
+
+def structure_sizes(bot):
+    """Estimate the memory held by the bot's main in-memory structures
+
+    Runs on the event loop since it walks live discord.py objects, sampling
+    keeps it to a few hundred objects per structure.
+    """
+    state = bot._connection
+    members = [member for guild in bot.guilds for member in guild._members.values()]
+    cooldowns = [bucket for command in bot.walk_commands() for bucket in command._buckets._cache.values()]
+
+    structures = {
+        'VERIFICATION_DATA (guild settings)': estimate_size(config.VERIFICATION_DATA.values()),
+        'GAME_ROLE_DATA (guild settings)': estimate_size(config.GAME_ROLE_DATA.values()),
+        'Member cache': estimate_size(members),
+        'Message cache': estimate_size(state._messages or ()),
+        'User cache': estimate_size(state._users.values()),
+        'Cooldown buckets': estimate_size(cooldowns),
+        'Role counters': estimate_size(role_counters.guilds.values()),
+        'Member name indexes': estimate_size(member_index.guilds.values()),
+        'Role journal offsets': estimate_size(role_journal.offsets.values()),
+        'Raid guard state': estimate_size(raid_guard.guilds.values()),
+    }
+    lines = ["Estimated sizes of known structures (sampled, shared guild and client objects excluded)", ""]
+    for name, (count, size) in structures.items():
+        lines.append(f"{name:40} {count:9} entries  ~{size / 2**20:8.2f} MiB")
+    return "\n".join(lines)
+
+async def run_report(func, *args):
+    """Build a report in a worker thread so the event loop keeps running"""
+    start_time = time.perf_counter()
+    report = await asyncio.to_thread(func, *args)
+    elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+    logger.info(f'Built {func.__name__} memory report in {elapsed}ms')
+    return report
+
+memory_tracker = MemoryTracker()
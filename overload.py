@@ -0,0 +1,182 @@
+import time
+import asyncio
+import logging
+from discord.ext import commands
+from config import OVERLOAD_CONFIG
+from rate_window import SlidingWindowCounter
+
+logger = logging.getLogger('discord_bot.overload')
+
+# Buckets of the 429 counter's sliding window
+RATE_LIMIT_BUCKETS = 12
+
+# Shedding levels, each one also sheds everything below it
+NORMAL, SKIP_DMS, SIMPLE_EMBEDS, DEFER_COMMANDS = 0, 1, 2, 3
+LEVEL_NAMES = {
+    NORMAL: 'normal',
+    SKIP_DMS: 'skipping DMs',
+    SIMPLE_EMBEDS: 'simple embeds',
+    DEFER_COMMANDS: 'deferring commands',
+}
+
+class Overloaded(commands.CheckFailure):
+    """A non-critical command was deferred and the load did not drop in time"""
+
+class RateLimitCounter(logging.Handler):
+    """Counts the 429 responses discord.py logs on discord.http"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.window = SlidingWindowCounter(OVERLOAD_CONFIG['rate_limit_window'], RATE_LIMIT_BUCKETS)
+        self.total = 0
+
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith('We are being rate limited'):
+            self.window.record(time.monotonic())
+            self.total += 1
+
+    def recent(self):
+        """Get the number of 429 responses within the window"""
+        return self.window.count(time.monotonic())
+
+def signal_level(value, thresholds):
+    """Get the shedding level a signal asks for"""
+    return sum(1 for threshold in thresholds if value >= threshold)
+
+class OverloadController:
+    """Steps through shedding levels as the bot falls behind, and back once it has caught up
+
+    The loop lag, the event dispatcher backlog and the rate of 429 responses are
+    checked every check_interval seconds. The level goes up one step per check
+    while any signal is past the threshold of the next level, and down one step
+    once every signal has stayed under recover_ratio of the current level's
+    thresholds for recover_seconds, so it does not flap around a threshold.
+    """
+
+    def __init__(self):
+        self.level = NORMAL
+        self.lag = 0.0
+        self.queued = 0
+        self.rate_limits = RateLimitCounter()
+        self.calm_since = None
+        self.changed_at = time.monotonic()
+        self.level_seconds = [0.0] * len(LEVEL_NAMES)
+        self.changes = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.turned_down = 0
+        self.relieved = asyncio.Event()
+        self.relieved.set()
+
+    def shedding(self, level):
+        """Check if work that is shed at the given level should be skipped"""
+        return self.level >= level
+
+    def event_log_level(self):
+        """Log level for per event info lines, which are dropped to debug while shedding"""
+        return logging.DEBUG if self.level >= SKIP_DMS else logging.INFO
+
+    def signal_levels(self, ratio=1.0):
+        """Get the level each signal asks for, with thresholds scaled by ratio"""
+        return {
+            'loop lag': signal_level(self.lag, [t * ratio for t in OVERLOAD_CONFIG['lag_thresholds']]),
+            'event queue': signal_level(self.queued, [t * ratio for t in OVERLOAD_CONFIG['queue_thresholds']]),
+            'rate limits': signal_level(self.rate_limits.recent(), [t * ratio for t in OVERLOAD_CONFIG['rate_limit_thresholds']]),
+        }
+
+    def update(self, lag, queued):
+        """Take new readings and step the level if needed"""
+        # Lag rises at once but decays gradually, a single quiet check does not hide a backlog
+        self.lag = lag if lag > self.lag else self.lag * 0.7 + lag * 0.3
+        self.queued = queued
+
+        levels = self.signal_levels()
+        wanted = max(levels.values())
+        if wanted > self.level:
+            self.calm_since = None
+            cause = max(levels, key=levels.get)
+            self.set_level(self.level + 1, cause)
+            return
+
+        calm = max(self.signal_levels(OVERLOAD_CONFIG['recover_ratio']).values()) < self.level
+        if not calm:
+            self.calm_since = None
+        elif self.calm_since is None:
+            self.calm_since = time.monotonic()
+        elif time.monotonic() - self.calm_since >= OVERLOAD_CONFIG['recover_seconds']:
+            self.calm_since = None
+            self.set_level(self.level - 1, 'recovery')
+
+    def set_level(self, level, cause):
+        """Switch to a shedding level"""
+        now = time.monotonic()
+        self.level_seconds[self.level] += now - self.changed_at
+        self.changed_at = now
+        old_level, self.level = self.level, level
+        self.changes += 1
+
+        if level >= DEFER_COMMANDS:
+            self.relieved.clear()
+        else:
+            self.relieved.set()
+
+        message = (f'Load shedding level {old_level} ({LEVEL_NAMES[old_level]}) -> {level} ({LEVEL_NAMES[level]}) '
+                   f'on {cause}, loop lag {self.lag * 1000:.0f}ms, {self.queued} queued events, '
+                   f'{self.rate_limits.recent()} rate limits in {OVERLOAD_CONFIG["rate_limit_window"]}s')
+        if level > old_level:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+    async def monitor(self, bot):
+        """Measure the loop lag and backlog, and adjust the level, until the bot closes"""
+        interval = OVERLOAD_CONFIG['check_interval']
+        loop = asyncio.get_running_loop()
+        while not bot.is_closed():
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.update(max(0.0, loop.time() - start - interval), bot.event_dispatcher.depth)
+
+    async def defer_command(self, ctx):
+        """Global command check holding non-critical commands back while the bot is overloaded"""
+        if self.level < DEFER_COMMANDS or ctx.command.qualified_name not in OVERLOAD_CONFIG['deferrable_commands']:
+            return True
+
+        self.deferred += 1
+        logger.info(f'Deferring {ctx.command} from {ctx.author} in {ctx.guild} while overloaded')
+        try:
+            await asyncio.wait_for(self.relieved.wait(), OVERLOAD_CONFIG['defer_timeout'])
+        except asyncio.TimeoutError:
+            self.turned_down += 1
+            raise Overloaded(f'{ctx.command} deferred for too long')
+        return True
+
+    async def optional_dm(self, member, embed):
+        """Send a DM that is skipped while shedding"""
+        if self.level >= SKIP_DMS:
+            self.skipped += 1
+            return
+        await member.send(embed=embed)
+
+    def stats(self):
+        """Get the current level and shedding counters"""
+        level_seconds = list(self.level_seconds)
+        level_seconds[self.level] += time.monotonic() - self.changed_at
+        return {
+            'level': self.level,
+            'level_name': LEVEL_NAMES[self.level],
+            'lag_ms': round(self.lag * 1000, 1),
+            'queued': self.queued,
+            'rate_limits': self.rate_limits.recent(),
+            'rate_limits_total': self.rate_limits.total,
+            'changes': self.changes,
+            'level_seconds': [round(seconds) for seconds in level_seconds],
+            'skipped_dms': self.skipped,
+            'deferred': self.deferred,
+            'turned_down': self.turned_down,
+        }
+
+overload = OverloadController()
+
+# Counted whether or not the monitor runs, the mass role pacer backs off on them too
+logging.getLogger('discord.http').addHandler(overload.rate_limits)
@@ -0,0 +1,88 @@
+import time
+import asyncio
+import logging
+import discord
+from config import PANEL_CONFIG
+
+logger = logging.getLogger('discord_bot.panels')
+
+class PanelResult:
+    """Outcome of publishing a panel to one channel"""
+    __slots__ = ('channel', 'message', 'action', 'error')
+
+    def __init__(self, channel, message=None, action=None, error=None):
+        self.channel = channel
+        self.message = message
+        self.action = action  # 'posted', 'updated' or 'unchanged'
+        self.error = error
+
+def embeds_match(message, embed):
+    """Check if a message already shows an embed"""
+    if not message.embeds:
+        return False
+    current = message.embeds[0].to_dict()
+    wanted = embed.to_dict()
+    return all(current.get(key) == wanted.get(key) for key in ('title', 'description', 'fields', 'footer', 'color'))
+
+async def seed_reactions(message, emojis):
+    """Bring the bot's reactions on a panel in line with the configured emojis"""
+    own_reactions = [str(reaction.emoji) for reaction in message.reactions if reaction.me]
+    stale = [emoji for emoji in own_reactions if emoji not in emojis]
+    missing = [emoji for emoji in emojis if emoji not in own_reactions]
+
+    # Reactions show up in the order they were added, so one panel is seeded
+    # sequentially. discord.py queues each request on its rate limit bucket and
+    # retries 429s, so requests go out as fast as the bucket allows.
+    for emoji in stale:
+        await message.remove_reaction(emoji, message.guild.me)
+    for emoji in missing:
+        await message.add_reaction(emoji)
+
+    return len(stale) + len(missing)
+
+async def publish_to_channel(channel, embed, emojis, message_id=None, view=None):
+    """Post a panel to a channel, or edit the existing one in place"""
+    message = None
+    if message_id is not None:
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            message = None
+
+    if message is None:
+        message = await channel.send(embed=embed, view=view)
+        action = 'posted'
+    elif not embeds_match(message, embed) or view is not None:
+        # Select menu options can change without the embed changing
+        message = await message.edit(embed=embed, view=view)
+        action = 'updated'
+    else:
+        action = 'unchanged'
+
+    if await seed_reactions(message, emojis) and action == 'unchanged':
+        action = 'updated'
+
+    return PanelResult(channel, message, action)
+
+async def publish_panel(targets, embed, emojis, view=None):
+    """Publish a panel to many channels at once
+
+    targets is a list of (channel, existing message id or None). Different
+    channels are published concurrently, bounded so that a large publish does
+    not use up the global rate limit that interactive commands also need.
+    """
+    semaphore = asyncio.Semaphore(PANEL_CONFIG['max_concurrent_publishes'])
+
+    async def publish(channel, message_id):
+        async with semaphore:
+            try:
+                return await publish_to_channel(channel, embed, emojis, message_id, view)
+            except discord.HTTPException as e:
+                logger.error(f'Error publishing panel to {channel}: {e}')
+                return PanelResult(channel, error=e)
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(publish(channel, message_id) for channel, message_id in targets))
+    elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+
+    return results, elapsed
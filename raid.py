@@ -0,0 +1,206 @@
+import time
+import asyncio
+import logging
+import discord
+from config import BOT_CONFIG, RAID_CONFIG, get_verification_settings
+from member_cache import resolve_member
+from role_stats import role_counters
+from rate_window import SlidingWindowCounter
+from role_journal import role_journal, ADD, DONE, CANCELLED, SOURCE_RAID
+
+logger = logging.getLogger('discord_bot.raid')
+
+class GuildRaidState:
+    """Raid detection state for one guild"""
+    __slots__ = ('joins', 'raid_mode', 'raid_started', 'last_busy', 'queue', 'dropped')
+
+    def __init__(self):
+        self.joins = SlidingWindowCounter(RAID_CONFIG['window_seconds'], RAID_CONFIG['window_buckets'])
+        self.raid_mode = False
+        self.raid_started = None
+        self.last_busy = 0.0
+        self.queue = {}  # member_id -> journal sequence number, in the order they were queued
+        self.dropped = 0
+
+class RaidGuard:
+    """Tracks join rates per guild and holds verification grants back during raids"""
+
+    def __init__(self):
+        self.guilds = {}
+
+    def state(self, guild_id):
+        """Get the raid state of a guild, if it has one"""
+        return self.guilds.get(guild_id)
+
+    def in_raid_mode(self, guild_id):
+        """Check if a guild is currently in raid mode"""
+        state = self.guilds.get(guild_id)
+        return state is not None and state.raid_mode
+
+    def join_rate(self, guild_id):
+        """Get the number of joins within the detection window"""
+        state = self.guilds.get(guild_id)
+        return state.joins.count(time.monotonic()) if state else 0
+
+    def record_join(self, guild_id):
+        """Count a member join, returning True if it switched the guild into raid mode"""
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = self.guilds[guild_id] = GuildRaidState()
+
+        now = time.monotonic()
+        state.joins.record(now)
+        joins = state.joins.count(now)
+
+        if joins >= RAID_CONFIG['join_threshold'] // 2:
+            state.last_busy = now
+
+        if not state.raid_mode and joins >= RAID_CONFIG['join_threshold']:
+            state.raid_mode = True
+            state.raid_started = now
+            return True
+        return False
+
+    def is_queued(self, guild_id, member_id):
+        """Check if a member's verification grant is waiting in the queue"""
+        state = self.guilds.get(guild_id)
+        return state is not None and member_id in state.queue
+
+    def queue_verification(self, guild_id, member_id, seq):
+        """Hold a journaled verification grant back until the batched release, returning False if the queue is full"""
+        state = self.guilds[guild_id]
+        if member_id in state.queue:
+            return True
+        if len(state.queue) >= RAID_CONFIG['max_queue']:
+            state.dropped += 1
+            return False
+        state.queue[member_id] = seq
+        return True
+
+    def requeue_replayed(self, intent, seq):
+        """Put a queued grant replayed from the journal back in the batched release queue"""
+        state = self.guilds.get(intent.guild_id)
+        if state is None:
+            state = self.guilds[intent.guild_id] = GuildRaidState()
+        if state.queue.get(intent.member_id, seq) != seq:
+            # The member already has a grant queued, this one is a duplicate
+            role_journal.finish([seq], CANCELLED)
+        elif not self.queue_verification(intent.guild_id, intent.member_id, seq):
+            role_journal.finish([seq], CANCELLED)
+            logger.warning(f'Verification queue full in guild {intent.guild_id}, dropped replayed grant for {intent.member_id}')
+
+    def dequeue_verification(self, guild_id, member_id):
+        """Drop a pending verification grant, returning its journal sequence number if it was queued"""
+        state = self.guilds.get(guild_id)
+        if state is None:
+            return None
+        return state.queue.pop(member_id, None)
+
+    def queue_depth(self, guild_id):
+        """Get the number of pending verification grants"""
+        state = self.guilds.get(guild_id)
+        return len(state.queue) if state else 0
+
+    def take_batch(self, guild_id, size):
+        """Remove and return up to size pending verification grants as (member_id, seq), oldest first"""
+        state = self.guilds[guild_id]
+        batch = []
+        for item in state.queue.items():
+            batch.append(item)
+            if len(batch) >= size:
+                break
+        for member_id, _ in batch:
+            del state.queue[member_id]
+        return batch
+
+    def end_calm_raids(self):
+        """Switch guilds that have been calm long enough back to normal, returning their ids"""
+        now = time.monotonic()
+        ended = []
+        for guild_id, state in self.guilds.items():
+            # Hysteresis: raid mode starts at the threshold but only ends after
+            # the rate stayed under half of it for the calm period
+            if state.raid_mode and now - state.last_busy >= RAID_CONFIG['calm_seconds']:
+                state.raid_mode = False
+                state.raid_started = None
+                ended.append(guild_id)
+        return ended
+
+    def forget_idle(self):
+        """Drop state of guilds that are not in raid mode and have nothing queued"""
+        now = time.monotonic()
+        idle = [
+            guild_id for guild_id, state in self.guilds.items()
+            if not state.raid_mode and not state.queue and now - state.last_busy >= RAID_CONFIG['calm_seconds']
+            and state.joins.count(now) == 0
+        ]
+        for guild_id in idle:
+            del self.guilds[guild_id]
+
+raid_guard = RaidGuard()
+
+async def send_raid_alert(guild, title, color):
+    """Report the join rate and verification queue of a guild to its admins"""
+    settings = get_verification_settings(guild.id)
+    joins = raid_guard.join_rate(guild.id)
+    depth = raid_guard.queue_depth(guild.id)
+    logger.warning(f'{title} in {guild.name}: {joins} joins in {RAID_CONFIG["window_seconds"]}s, {depth} verifications queued')
+
+    channel = guild.get_channel(settings.raid_alert_channel_id) if settings.raid_alert_channel_id else None
+    if not channel:
+        return
+
+    embed = discord.Embed(title=title, color=color)
+    embed.add_field(name="Join Rate", value=f"{joins} joins / {RAID_CONFIG['window_seconds']}s", inline=True)
+    embed.add_field(name="Verification Queue", value=depth, inline=True)
+    embed.add_field(name="Status", value=f"Use `{BOT_CONFIG['prefix']}raidstatus` for details", inline=False)
+    try:
+        await channel.send(embed=embed)
+    except discord.HTTPException as e:
+        logger.error(f'Error sending raid alert: {e}')
+
+async def release_verifications(bot):
+    """Grant queued verifications in small batches and end raid mode once guilds calm down"""
+    await bot.wait_until_ready()
+
+    while not bot.is_closed():
+        await asyncio.sleep(RAID_CONFIG['release_interval'])
+
+        try:
+            for guild_id in raid_guard.end_calm_raids():
+                guild = bot.get_guild(guild_id)
+                if guild:
+                    await send_raid_alert(guild, "✅ Raid Mode Ended", 0x00ff00)
+
+            for guild_id, state in list(raid_guard.guilds.items()):
+                if not state.queue:
+                    continue
+
+                guild = bot.get_guild(guild_id)
+                settings = get_verification_settings(guild_id)
+                role = guild.get_role(settings.role_id) if guild and settings.enabled else None
+                batch = raid_guard.take_batch(guild_id, RAID_CONFIG['release_batch'])
+                if not role:
+                    role_journal.finish([seq for _, seq in batch], CANCELLED)
+                    continue
+
+                for member_id, seq in batch:
+                    member = await resolve_member(guild, member_id)
+                    if not member:
+                        role_journal.finish([seq], CANCELLED)
+                        continue
+                    if role in member.roles:
+                        role_journal.finish([seq], DONE)
+                        continue
+                    try:
+                        await role_journal.apply(member, ADD, [role], SOURCE_RAID,
+                                                 "Verified through reaction role (raid mode release)", [seq])
+                        role_counters.record_uncached(guild, member, added_ids=[role.id])
+                    except discord.HTTPException as e:
+                        logger.error(f'Error releasing queued verification: {e}')
+
+                logger.info(f'Released {len(batch)} queued verifications in {guild.name}, {len(state.queue)} left')
+
+            raid_guard.forget_idle()
+        except Exception as e:
+            logger.error(f'Error in verification release loop: {e}')
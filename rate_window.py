@@ -0,0 +1,27 @@
+class SlidingWindowCounter:
+    """Sliding window event counter over a fixed ring of time buckets
+
+    Memory stays constant no matter how many events are recorded: each bucket
+    holds a count and the bucket index it was last used for.
+    """
+    __slots__ = ('bucket_seconds', 'counts', 'stamps')
+
+    def __init__(self, window_seconds, bucket_count):
+        self.bucket_seconds = window_seconds / bucket_count
+        self.counts = [0] * bucket_count
+        self.stamps = [-1] * bucket_count
+
+    def record(self, now):
+        """Count an event at the given time"""
+        index = int(now / self.bucket_seconds)
+        slot = index % len(self.counts)
+        if self.stamps[slot] != index:
+            self.stamps[slot] = index
+            self.counts[slot] = 0
+        self.counts[slot] += 1
+
+    def count(self, now):
+        """Get the number of events within the window ending at the given time"""
+        index = int(now / self.bucket_seconds)
+        size = len(self.counts)
+        return sum(count for count, stamp in zip(self.counts, self.stamps) if index - stamp < size)
@@ -0,0 +1,44 @@
+import logging
+from config import TRACKED_MESSAGES
+
+logger = logging.getLogger('discord_bot.reaction_filter')
+
+# Gateway events filtered, everything the handlers need is in these two
+FILTERED_EVENTS = ('MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE')
+
+class ReactionFilter:
+    """Drops reactions to untracked messages before discord.py builds any model for them
+
+    On large guilds most gateway events are reactions to ordinary messages,
+    which the reaction handlers ignore anyway. Checking the message id in the
+    decoded payload skips the RawReactionActionEvent, PartialEmoji and Member
+    construction and the dispatch for all of them. The reaction counts of cached
+    messages that are not tracked go stale, nothing in the bot reads them.
+    """
+
+    def __init__(self):
+        self.passed = 0
+        self.dropped = 0
+
+    def install(self, bot):
+        """Put the filter in front of the reaction parsers of a bot's connection"""
+        parsers = bot._connection.parsers
+        for event in FILTERED_EVENTS:
+            parsers[event] = self.wrap(parsers[event])
+        logger.info(f'Dropping reactions to untracked messages, {len(TRACKED_MESSAGES)} messages tracked')
+
+    def wrap(self, parse):
+        """Wrap a reaction parser so only tracked messages reach it"""
+        def parse_tracked(data):
+            if int(data['message_id']) in TRACKED_MESSAGES:
+                self.passed += 1
+                parse(data)
+            else:
+                self.dropped += 1
+        return parse_tracked
+
+    def stats(self):
+        """Get the passed and dropped event counters"""
+        return {'passed': self.passed, 'dropped': self.dropped, 'tracked': len(TRACKED_MESSAGES)}
+
+reaction_filter = ReactionFilter()
@@ -0,0 +1,404 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from array import array
+from collections import deque
+import discord
+from config import EXPIRY_CONFIG, get_verification_settings, get_game_role_settings
+from member_cache import resolve_member
+from role_journal import role_journal, REMOVE, SOURCE_EXPIRY
+from role_stats import role_counters
+from overload import overload, SKIP_DMS
+
+logger = logging.getLogger('discord_bot.role_expiry')
+
+MAGIC = b'REXP\x01\x00\x00\x00'
+
+# Every level of the wheel has 64 slots, a slot of level n spans 64**n one second ticks
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+# The top level reaches 64**4 seconds ahead, about 194 days, later deadlines wait in an overflow list
+LEVELS = 4
+
+ROLE_MASK = (1 << 64) - 1
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+DURATION_PART = re.compile(r'(\d+)\s*([smhdw])')
+
+def parse_duration(text):
+    """Parse a duration like '6h', '30d' or '1d12h' into seconds, raising ValueError if it is not one"""
+    text = text.strip().lower()
+    parts = DURATION_PART.findall(text)
+    if not parts or DURATION_PART.sub('', text).strip():
+        raise ValueError(f'`{text}` is not a duration, use something like `6h`, `30d` or `1d12h`')
+    seconds = sum(int(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+    if seconds <= 0:
+        raise ValueError('The duration must be longer than zero')
+    return seconds
+
+def format_duration(seconds):
+    """Format seconds as a short duration like '1d 12h'"""
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60), ('s', 1)):
+        if seconds >= size:
+            parts.append(f'{seconds // size}{unit}')
+            seconds %= size
+    return ' '.join(parts) or '0s'
+
+def entry_key(member_id, role_id):
+    """Pack a member and role id into one int, role ids are unique across guilds"""
+    return member_id << 64 | role_id
+
+class TimerWheel:
+    """Hierarchical timing wheel of deadlines in whole seconds
+
+    Scheduling, pushing back and cancelling are O(1), and memory is a slot
+    reference and a dict entry per key however far away the deadline is. Each
+    key sits in exactly one slot: an earlier deadline or a cancel takes it out
+    of its slot, while a later deadline leaves it where it is and the deadline
+    dict is checked when the slot comes up, putting the key into the slot
+    matching its new deadline. Slots of the coarser levels are cascaded into
+    finer ones as time reaches them.
+    """
+
+    def __init__(self, now):
+        self.now = int(now)
+        self.deadlines = {}  # key -> deadline, the source of truth the slots are checked against
+        self.slots = {}  # key -> the slot holding it
+        self.levels = [[set() for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.overflow = set()
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def get(self, key):
+        """Get the deadline of a key, None if it is not scheduled"""
+        return self.deadlines.get(key)
+
+    def schedule(self, key, deadline):
+        """Schedule a key, moving its deadline if it already has one"""
+        deadline = int(deadline)
+        old_deadline = self.deadlines.get(key)
+        self.deadlines[key] = deadline
+        # A later deadline is picked up when the key's current slot comes up
+        if old_deadline is None or deadline < old_deadline:
+            self.insert(key, deadline)
+
+    def cancel(self, key):
+        """Unschedule a key, returning False if it was not scheduled"""
+        if self.deadlines.pop(key, None) is None:
+            return False
+        self.slots.pop(key).discard(key)
+        return True
+
+    def insert(self, key, deadline):
+        """Move a key into the slot its deadline falls into"""
+        slot = self.slots.get(key)
+        if slot is not None:
+            slot.discard(key)
+
+        delta = deadline - self.now
+        if delta <= 0:
+            slot = self.levels[0][(self.now + 1) & SLOT_MASK]
+        else:
+            slot = self.overflow
+            for level in range(LEVELS):
+                if delta < 1 << (SLOT_BITS * (level + 1)):
+                    slot = self.levels[level][(deadline >> (SLOT_BITS * level)) & SLOT_MASK]
+                    break
+        slot.add(key)
+        self.slots[key] = slot
+
+    def advance(self, now):
+        """Move the wheel forward to now, returning the keys whose deadline has passed"""
+        due = []
+        now = int(now)
+        while self.now < now:
+            self.now += 1
+            tick = self.now
+            for level in range(LEVELS - 1, 0, -1):
+                if tick & ((1 << (SLOT_BITS * level)) - 1) == 0:
+                    slot = (tick >> (SLOT_BITS * level)) & SLOT_MASK
+                    keys, self.levels[level][slot] = self.levels[level][slot], set()
+                    self.requeue(keys, due)
+                    if level == LEVELS - 1 and self.overflow:
+                        keys, self.overflow = self.overflow, set()
+                        self.requeue(keys, due)
+
+            slot = tick & SLOT_MASK
+            keys, self.levels[0][slot] = self.levels[0][slot], set()
+            self.requeue(keys, due)
+        return due
+
+    def requeue(self, keys, due):
+        """Collect the due keys of a slot taken off the wheel and move the others to finer slots"""
+        deadlines = self.deadlines
+        for key in keys:
+            del self.slots[key]
+            deadline = deadlines[key]
+            if deadline <= self.now:
+                del deadlines[key]
+                due.append(key)
+            else:
+                self.insert(key, deadline)
+
+class RoleExpiry:
+    """Schedule of time-limited roles, taken back in rate-limited batches once they expire
+
+    Game roles with a duration expire that long after being granted, and the
+    verification role expires after the guild's re-verification period without
+    a message from the member. Grants are picked up from the role journal, so
+    every path that gives a role (reactions, the picker, raid releases, mass
+    role jobs) schedules its expiry. The schedule is snapshotted to disk every
+    checkpoint_interval seconds while it changes, and on shutdown.
+    """
+
+    def __init__(self):
+        self.path = EXPIRY_CONFIG['path']
+        self.wheel = TimerWheel(time.time())
+        self.guilds = {}  # role_id -> guild_id of every role with scheduled expiries
+        self.due = deque()
+        self.dirty = False
+        self.expired = 0
+        self.failed = 0
+
+    def role_ttl(self, guild_id, role_id):
+        """Get the seconds a role is kept for once granted, None if it does not expire"""
+        ttl = get_game_role_settings(guild_id).ttl(role_id)
+        if ttl is None:
+            settings = get_verification_settings(guild_id)
+            if settings.reverify_after and settings.role_id == role_id:
+                return settings.reverify_after
+        return ttl
+
+    def schedule(self, guild_id, member_id, role_id, deadline):
+        """Schedule a member's role to be taken back at a unix timestamp"""
+        self.guilds[role_id] = guild_id
+        self.wheel.schedule(entry_key(member_id, role_id), deadline)
+        self.dirty = True
+
+    def cancel(self, member_id, role_id):
+        """Drop the scheduled expiry of a member's role"""
+        if self.wheel.cancel(entry_key(member_id, role_id)):
+            self.dirty = True
+
+    async def cancel_role(self, role_id):
+        """Drop every scheduled and due expiry of a role whose duration was turned off, returning how many"""
+        keys = []
+        for i, key in enumerate(list(self.wheel.deadlines)):
+            if key & ROLE_MASK == role_id:
+                keys.append(key)
+            # Walking a large schedule, let the gateway through now and then
+            if i % 10000 == 9999:
+                await asyncio.sleep(0)
+        for key in keys:
+            self.wheel.cancel(key)
+
+        due = len(self.due)
+        self.due = deque(key for key in self.due if key & ROLE_MASK != role_id)
+        cancelled = len(keys) + due - len(self.due)
+        if cancelled:
+            self.dirty = True
+        return cancelled
+
+    def roles_changed(self, member, op, role_ids):
+        """Role journal listener scheduling the expiry of granted roles and dropping it for removed ones"""
+        if op == REMOVE:
+            for role_id in role_ids:
+                self.cancel(member.id, role_id)
+            return
+
+        now = time.time()
+        for role_id in role_ids:
+            ttl = self.role_ttl(member.guild.id, role_id)
+            if ttl:
+                self.schedule(member.guild.id, member.id, role_id, now + ttl)
+
+    def touch(self, member):
+        """Push back the re-verification deadline of a member who just sent a message"""
+        settings = get_verification_settings(member.guild.id)
+        if not settings.reverify_after or not settings.role_id:
+            return
+
+        deadline = self.wheel.get(entry_key(member.id, settings.role_id))
+        new_deadline = time.time() + settings.reverify_after
+        if deadline is None:
+            # Verified before re-verification was turned on, or by hand
+            if member.get_role(settings.role_id) is None:
+                return
+        elif new_deadline - deadline < EXPIRY_CONFIG['activity_granularity']:
+            # Active members would otherwise rewrite their deadline on every message
+            return
+        self.schedule(member.guild.id, member.id, settings.role_id, new_deadline)
+
+    async def seed(self, guild, role_id, seconds):
+        """Schedule the re-verification of cached members already holding the verification role, returning how many"""
+        role = guild.get_role(role_id)
+        if role is None:
+            return 0
+
+        deadline = time.time() + seconds
+        seeded = 0
+        for i, member in enumerate(role.members):
+            if entry_key(member.id, role_id) not in self.wheel:
+                self.schedule(guild.id, member.id, role_id, deadline)
+                seeded += 1
+            # Large guilds have a lot of verified members, let the gateway through now and then
+            if i % 1000 == 999:
+                await asyncio.sleep(0)
+        return seeded
+
+    def load(self):
+        """Load the schedule snapshot, expiries that passed while the bot was down come due at once"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        if not data.startswith(MAGIC) or (len(data) - len(MAGIC)) % 32:
+            logger.warning(f'{self.path} is not a role expiry snapshot, starting an empty schedule')
+            return
+
+        entries = array('Q')
+        entries.frombytes(data[len(MAGIC):])
+        for i in range(0, len(entries), 4):
+            self.guilds[entries[i + 2]] = entries[i]
+            self.wheel.schedule(entry_key(entries[i + 1], entries[i + 2]), entries[i + 3])
+        logger.info(f'Loaded {len(self.wheel)} scheduled role expiries')
+
+    def snapshot(self):
+        """Copy the schedule as (key, deadline) pairs, the due keys being written with a deadline of zero"""
+        return list(self.wheel.deadlines.items()) + [(key, 0) for key in self.due], dict(self.guilds)
+
+    def write(self, entries, guilds):
+        """Write a schedule snapshot to disk, blocking, run it in a worker thread"""
+        data = array('Q')
+        for key, deadline in entries:
+            role_id = key & ROLE_MASK
+            data.extend((guilds.get(role_id, 0), key >> 64, role_id, deadline))
+
+        path = self.path + '.tmp'
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            data.tofile(f)
+        os.replace(path, self.path)
+
+    async def save(self):
+        """Snapshot the schedule without blocking the event loop"""
+        self.dirty = False
+        entries, guilds = self.snapshot()
+        # Roles whose expiries have all passed are no longer needed to find their guild
+        self.guilds = {role_id: guilds[role_id] for role_id in {key & ROLE_MASK for key, _ in entries}}
+        try:
+            await asyncio.to_thread(self.write, entries, guilds)
+        except Exception:
+            # Try again at the next checkpoint
+            self.dirty = True
+            raise
+
+    async def expire_batch(self, bot):
+        """Take back the roles of the next batch of due expiries"""
+        for _ in range(min(EXPIRY_CONFIG['batch_size'], len(self.due))):
+            key = self.due.popleft()
+            self.dirty = True
+            # Granted again since it came due
+            if key in self.wheel:
+                continue
+
+            member_id, role_id = key >> 64, key & ROLE_MASK
+            guild = bot.get_guild(self.guilds.get(role_id, 0))
+            role = guild.get_role(role_id) if guild else None
+            # The schedule is authoritative, turning a duration off cancels the role's entries
+            if role is None:
+                continue
+            member = await resolve_member(guild, member_id)
+            if member is None or role not in member.roles:
+                continue
+
+            reverify = role_id == get_verification_settings(guild.id).role_id
+            try:
+                await role_journal.remove_roles(member, role, source=SOURCE_EXPIRY,
+                                                reason="Re-verification required after inactivity" if reverify else "Game role expired")
+                role_counters.record_uncached(guild, member, removed_ids=[role.id])
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.error(f'Error taking back expired role {role.name} from {member} in {guild.name}: {e}')
+                continue
+
+            self.expired += 1
+            logger.log(overload.event_log_level(), f'Role {role.name} expired for {member} in {guild.name}')
+            await self.clear_reaction(guild, member, role, reverify)
+
+            try:
+                if reverify:
+                    dm_embed = discord.Embed(
+                        title="⏰ Verification Expired",
+                        description=f"Your verification in **{guild.name}** expired after a period of inactivity. React again to regain access.",
+                        color=0xff9900
+                    )
+                else:
+                    dm_embed = discord.Embed(
+                        title="⏰ Game Role Expired",
+                        description=f"The **{role.name}** role in **{guild.name}** has expired. React again to pick it up.",
+                        color=0xff9900
+                    )
+                await overload.optional_dm(member, dm_embed)
+            except discord.HTTPException:
+                # DMs disabled or failing, the role is gone either way
+                pass
+
+    async def clear_reaction(self, guild, member, role, reverify):
+        """Take the member's reaction off the panels, so reacting again grants the role again"""
+        if reverify:
+            settings = get_verification_settings(guild.id)
+            targets = [(settings.channel_id, settings.message_id, settings.emoji)] if settings.message_id else []
+        else:
+            settings = get_game_role_settings(guild.id)
+            emoji = next((emoji for emoji, role_id in settings.game_roles.items() if role_id == role.id), None)
+            targets = [(channel_id, message_id, emoji) for channel_id, message_id in settings.panels] if emoji else []
+
+        for channel_id, message_id, emoji in targets:
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                await channel.get_partial_message(message_id).remove_reaction(emoji, member)
+            except discord.HTTPException as e:
+                # Without Manage Messages the member has to take the reaction off first
+                logger.debug(f'Could not clear the reaction of {member} on panel {message_id}: {e}')
+
+    async def run(self, bot):
+        """Advance the schedule, take back expired roles and checkpoint it until the bot closes"""
+        await bot.wait_until_ready()
+        last_checkpoint = time.monotonic()
+        try:
+            while not bot.is_closed():
+                await asyncio.sleep(EXPIRY_CONFIG['batch_interval'])
+                # One failing batch or checkpoint must not stop expiries for the rest of the process
+                try:
+                    self.due.extend(self.wheel.advance(time.time()))
+
+                    # Expiries are background work, they wait while the bot is shedding load
+                    if self.due and not overload.shedding(SKIP_DMS):
+                        await self.expire_batch(bot)
+
+                    if self.dirty and time.monotonic() - last_checkpoint >= EXPIRY_CONFIG['checkpoint_interval']:
+                        last_checkpoint = time.monotonic()
+                        await self.save()
+                except Exception as e:
+                    logger.error(f'Error in role expiry loop: {e}')
+        finally:
+            self.write(*self.snapshot())
+
+    def stats(self):
+        """Get the schedule size and expiry counters"""
+        return {'scheduled': len(self.wheel), 'due': len(self.due), 'expired': self.expired, 'failed': self.failed}
+
+role_expiry = RoleExpiry()
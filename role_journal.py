@@ -0,0 +1,335 @@
+import os
+import time
+import zlib
+import struct
+import asyncio
+import logging
+from array import array
+import discord
+from config import JOURNAL_CONFIG
+from member_cache import resolve_member
+
+logger = logging.getLogger('discord_bot.role_journal')
+
+MAGIC = b'RJNL\x01\x00\x00\x00'
+
+# kind, op, source, seq, guild_id, member_id, role_id, timestamp, followed by a crc32
+RECORD = struct.Struct('<BBBQQQQd')
+CRC = struct.Struct('<I')
+RECORD_SIZE = RECORD.size + CRC.size
+
+# Record kinds: an intent is written before the API call, one of the others once it is settled
+INTENT, DONE, FAILED, CANCELLED, EXPIRED = 1, 2, 3, 4, 5
+KIND_NAMES = {INTENT: 'pending', DONE: 'done', FAILED: 'failed', CANCELLED: 'cancelled', EXPIRED: 'expired'}
+
+ADD, REMOVE = 1, 2
+
+SOURCE_VERIFY, SOURCE_GAME_REACTION, SOURCE_PICKER, SOURCE_RAID, SOURCE_MASS, SOURCE_EXPIRY = 1, 2, 3, 4, 5, 6
+SOURCE_NAMES = {
+    SOURCE_VERIFY: 'verification reaction',
+    SOURCE_GAME_REACTION: 'game role reaction',
+    SOURCE_PICKER: 'role picker',
+    SOURCE_RAID: 'raid queue release',
+    SOURCE_MASS: 'mass role command',
+    SOURCE_EXPIRY: 'role expiry',
+}
+
+class JournalEntry:
+    """One journal record"""
+    __slots__ = ('kind', 'op', 'source', 'seq', 'guild_id', 'member_id', 'role_id', 'timestamp')
+
+    def __init__(self, kind, op, source, seq, guild_id, member_id, role_id, timestamp):
+        self.kind = kind
+        self.op = op
+        self.source = source
+        self.seq = seq
+        self.guild_id = guild_id
+        self.member_id = member_id
+        self.role_id = role_id
+        self.timestamp = timestamp
+
+    def pack(self):
+        """Encode the record with its checksum"""
+        body = RECORD.pack(self.kind, self.op, self.source, self.seq, self.guild_id, self.member_id, self.role_id, self.timestamp)
+        return body + CRC.pack(zlib.crc32(body))
+
+def unpack_records(data, base_offset):
+    """Yield (offset, entry) for each valid record in data, stopping at a torn or corrupt one"""
+    for start in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        body = data[start:start + RECORD.size]
+        (crc,) = CRC.unpack_from(data, start + RECORD.size)
+        if zlib.crc32(body) != crc:
+            return
+        yield base_offset + start, JournalEntry(*RECORD.unpack(body))
+
+def compacted_entries(entries, retention_cutoff):
+    """Keep unfinished intents, and the final record of finished ones inside the retention period"""
+    final = {}
+    for entry in entries:
+        if entry.kind == INTENT:
+            final.setdefault(entry.seq, entry)
+        else:
+            final[entry.seq] = entry
+    return [entry for entry in final.values() if entry.kind == INTENT or entry.timestamp >= retention_cutoff]
+
+class RoleJournal:
+    """Append-only journal of role change intents and their outcomes
+
+    Every role change the bot makes is written as an intent before the API call
+    and settled with a completion record after it, so changes cut off by a crash
+    can be replayed on the next start. Records are fixed size, and an in-memory
+    index of record offsets per member serves !roleaudit without a scan.
+    """
+
+    def __init__(self):
+        self.path = JOURNAL_CONFIG['path']
+        self.fd = None
+        self.size = 0
+        self.seq = 0
+        self.pending = {}  # seq -> intent entry
+        self.offsets = {}  # (guild_id, member_id) -> array of record offsets
+        self.compacted_size = 0
+        self.compacting = False
+        self.listeners = []  # called with (member, op, role_ids) after every change that went through
+        self.deferred = {}  # source -> called with (intent, seq) to replay that source's intents at its own pace
+
+    def open(self):
+        """Open the journal, dropping a torn record at the end and loading the pending intents"""
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(os.dup(fd), 'rb') as f:
+            data = f.read()
+
+        if not data.startswith(MAGIC):
+            if data:
+                logger.warning(f'{self.path} is not a role journal, starting a new one')
+            os.ftruncate(fd, 0)
+            os.write(fd, MAGIC)
+            data = MAGIC
+
+        valid_end = len(MAGIC)
+        for offset, entry in unpack_records(data[len(MAGIC):], len(MAGIC)):
+            self.index(offset, entry)
+            valid_end = offset + RECORD_SIZE
+
+        if valid_end < len(data):
+            logger.warning(f'Dropping {len(data) - valid_end} bytes of torn records at the end of {self.path}')
+            os.ftruncate(fd, valid_end)
+
+        self.fd = fd
+        self.size = self.compacted_size = valid_end
+        logger.info(f'Opened role journal with {(valid_end - len(MAGIC)) // RECORD_SIZE} records, {len(self.pending)} unfinished')
+
+    def index(self, offset, entry):
+        """Track a record in the pending intents and the per member offsets"""
+        self.seq = max(self.seq, entry.seq)
+        if entry.kind == INTENT:
+            self.pending[entry.seq] = entry
+        else:
+            self.pending.pop(entry.seq, None)
+
+        key = (entry.guild_id, entry.member_id)
+        offsets = self.offsets.get(key)
+        if offsets is None:
+            offsets = self.offsets[key] = array('Q')
+        offsets.append(offset)
+
+    def append(self, entry):
+        """Write a record to the end of the journal"""
+        if self.fd is None:
+            return
+        os.write(self.fd, entry.pack())
+        if JOURNAL_CONFIG['fsync']:
+            os.fsync(self.fd)
+        self.index(self.size, entry)
+        self.size += RECORD_SIZE
+
+    def begin(self, op, source, guild_id, member_id, role_ids):
+        """Record the intent to change roles of a member, returning the sequence numbers to settle"""
+        seqs = []
+        now = time.time()
+        for role_id in role_ids:
+            self.seq += 1
+            self.append(JournalEntry(INTENT, op, source, self.seq, guild_id, member_id, role_id, now))
+            seqs.append(self.seq)
+        return seqs
+
+    def finish(self, seqs, kind=DONE):
+        """Settle intents as done, failed, cancelled or expired"""
+        now = time.time()
+        for seq in seqs:
+            intent = self.pending.get(seq)
+            if intent is not None:
+                self.append(JournalEntry(kind, intent.op, intent.source, seq, intent.guild_id, intent.member_id, intent.role_id, now))
+
+    async def apply(self, member, op, roles, source, reason, seqs=None):
+        """Add or remove roles of a member with the change journaled around the API call"""
+        if seqs is None:
+            seqs = self.begin(op, source, member.guild.id, member.id, [role.id for role in roles])
+        try:
+            if op == ADD:
+                await member.add_roles(*roles, reason=reason)
+            else:
+                await member.remove_roles(*roles, reason=reason)
+        except discord.HTTPException:
+            self.finish(seqs, FAILED)
+            raise
+        self.finish(seqs)
+        self.notify(member, op, [role.id for role in roles])
+
+    def notify(self, member, op, role_ids):
+        """Tell the listeners about roles that were added or removed"""
+        if not role_ids:
+            return
+        for listener in self.listeners:
+            try:
+                listener(member, op, role_ids)
+            except Exception as e:
+                logger.error(f'Error in role change listener {listener.__qualname__}: {e}')
+
+    async def add_roles(self, member, *roles, source, reason):
+        """Journaled Member.add_roles"""
+        await self.apply(member, ADD, roles, source, reason)
+
+    async def remove_roles(self, member, *roles, source, reason):
+        """Journaled Member.remove_roles"""
+        await self.apply(member, REMOVE, roles, source, reason)
+
+    async def edit_roles(self, member, roles, added, removed, source, reason):
+        """Journaled Member.edit(roles=...), recording the roles added and removed by it"""
+        guild_id = member.guild.id
+        seqs = (self.begin(ADD, source, guild_id, member.id, [role.id for role in added])
+                + self.begin(REMOVE, source, guild_id, member.id, [role.id for role in removed]))
+        try:
+            await member.edit(roles=roles, reason=reason)
+        except discord.HTTPException:
+            self.finish(seqs, FAILED)
+            raise
+        self.finish(seqs)
+        self.notify(member, ADD, [role.id for role in added])
+        self.notify(member, REMOVE, [role.id for role in removed])
+
+    def history(self, guild_id, member_id, limit=10):
+        """Get the latest role changes of a member as (entry, status), newest first"""
+        offsets = self.offsets.get((guild_id, member_id))
+        if not offsets or self.fd is None:
+            return []
+
+        # Walk back from the newest record, each change is shown once with its final status
+        changes = {}
+        for offset in reversed(offsets):
+            data = os.pread(self.fd, RECORD_SIZE, offset)
+            for _, entry in unpack_records(data, offset):
+                if entry.seq not in changes:
+                    if len(changes) >= limit:
+                        return list(changes.values())
+                    changes[entry.seq] = (entry, KIND_NAMES[entry.kind])
+                elif entry.kind == INTENT:
+                    # Show when the change was asked for, not when it settled
+                    changes[entry.seq] = (entry, changes[entry.seq][1])
+        return list(changes.values())
+
+    async def replay(self, bot):
+        """Redo the role changes that were cut off by the previous process stopping"""
+        if not self.pending:
+            return
+
+        cutoff = time.time() - JOURNAL_CONFIG['replay_max_age']
+        replayed = deferred = expired = 0
+        for seq, intent in sorted(self.pending.items()):
+            if intent.timestamp < cutoff:
+                self.finish([seq], EXPIRED)
+                expired += 1
+                continue
+
+            replay_later = self.deferred.get(intent.source)
+            if replay_later is not None:
+                # Its owner paces the changes instead of redoing them all at once
+                replay_later(intent, seq)
+                deferred += 1
+                continue
+
+            guild = bot.get_guild(intent.guild_id)
+            role = guild.get_role(intent.role_id) if guild else None
+            member = await resolve_member(guild, intent.member_id) if role else None
+            if member is None:
+                self.finish([seq], EXPIRED)
+                expired += 1
+                continue
+
+            if (intent.op == ADD) == (role in member.roles):
+                # Went through before the process stopped, only the completion was lost
+                self.finish([seq])
+                continue
+
+            try:
+                await self.apply(member, intent.op, [role], intent.source, "Replayed role change after restart", [seq])
+                replayed += 1
+            except discord.HTTPException as e:
+                logger.error(f'Error replaying role change {seq}: {e}')
+
+        logger.info(f'Role journal replay: {replayed} changes redone, {deferred} handed back to be paced, {expired} expired')
+
+    def write_compacted(self, end, path):
+        """Write the compacted journal up to end into a new file, blocking, run it in a worker thread"""
+        with open(self.path, 'rb') as f:
+            data = f.read(end)
+        cutoff = time.time() - JOURNAL_CONFIG['retention_days'] * 86400
+        entries = compacted_entries((entry for _, entry in unpack_records(data[len(MAGIC):], len(MAGIC))), cutoff)
+
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            for entry in entries:
+                f.write(entry.pack())
+        return entries
+
+    async def compact(self):
+        """Rewrite the journal without settled intents and records past the retention period"""
+        if self.fd is None or self.compacting:
+            return
+        self.compacting = True
+        try:
+            start_time = time.perf_counter()
+            end = self.size
+            path = self.path + '.compact'
+            entries = await asyncio.to_thread(self.write_compacted, end, path)
+
+            # Records appended while the worker thread ran are carried over as is
+            tail = os.pread(self.fd, self.size - end, end)
+            with open(path, 'ab') as f:
+                f.write(tail)
+            os.replace(path, self.path)
+
+            old_size = self.size
+            os.close(self.fd)
+            self.fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self.pending.clear()
+            self.offsets.clear()
+            self.size = len(MAGIC)
+            for entry in entries:
+                self.index(self.size, entry)
+                self.size += RECORD_SIZE
+            for offset, entry in unpack_records(tail, self.size):
+                self.index(offset, entry)
+            self.size += len(tail)
+            self.compacted_size = self.size
+
+            elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+            logger.info(f'Compacted role journal from {old_size} to {self.size} bytes in {elapsed}ms')
+        finally:
+            self.compacting = False
+
+role_journal = RoleJournal()
+
+async def maintain_journal(bot):
+    """Replay unfinished role changes once connected, then compact the journal as it grows"""
+    await bot.wait_until_ready()
+    await role_journal.replay(bot)
+
+    while not bot.is_closed():
+        # Retained history can keep a compacted journal large, wait for it to double before compacting again
+        try:
+            if role_journal.size >= max(JOURNAL_CONFIG['compact_size'], 2 * role_journal.compacted_size):
+                await role_journal.compact()
+        except Exception as e:
+            logger.error(f'Error in journal maintenance loop: {e}')
+        await asyncio.sleep(JOURNAL_CONFIG['compact_check_interval'])
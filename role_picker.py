@@ -0,0 +1,125 @@
+import logging
+import discord
+from config import BOT_CONFIG, get_game_role_settings
+from role_stats import role_counters
+from role_journal import role_journal, SOURCE_PICKER
+
+logger = logging.getLogger('discord_bot.role_picker')
+
+# Discord allows at most 25 options in a select menu
+MAX_PICKER_OPTIONS = 25
+
+def picker_roles(guild, settings):
+    """Get the (emoji, role) pairs a picker panel offers, existing roles only and at most MAX_PICKER_OPTIONS"""
+    roles = []
+    for emoji, role_id in settings.game_roles.items():
+        role = guild.get_role(role_id)
+        if role:
+            roles.append((emoji, role))
+    return roles[:MAX_PICKER_OPTIONS]
+
+def build_picker_view(guild, settings):
+    """Build the persistent select menu and buttons for a game role picker panel, None if there is nothing to pick"""
+    options = [discord.SelectOption(label=role.name, value=str(role.id), emoji=emoji) for emoji, role in picker_roles(guild, settings)]
+    # Discord rejects a select menu without options
+    if not options:
+        return None
+
+    select = discord.ui.Select(
+        custom_id='gameroles:select',
+        placeholder='Pick the games you play',
+        min_values=0,
+        max_values=max(1, min(settings.max_selections, len(options))),
+        options=options,
+    )
+    clear = discord.ui.Button(
+        custom_id='gameroles:clear',
+        label='Remove all game roles',
+        style=discord.ButtonStyle.secondary,
+    )
+
+    view = discord.ui.View(timeout=None)
+    view.add_item(GameRoleSelect(select))
+    view.add_item(GameRoleClear(clear))
+    return view
+
+async def apply_game_roles(interaction, selected_role_ids):
+    """Give a member exactly the selected game roles with a single role edit"""
+    guild = interaction.guild
+    member = interaction.user
+    settings = get_game_role_settings(guild.id)
+
+    if not settings.enabled:
+        await interaction.response.send_message("❌ Game role selection is currently disabled.", ephemeral=True)
+        return
+
+    # Only roles the menu offers are touched, configured roles past the option limit are left alone
+    configured = {role.id for _, role in picker_roles(guild, settings)}
+    selected = {role_id for role_id in selected_role_ids if role_id in configured}
+
+    # Enforced up front, the menu's max_values can be stale if the limit changed after publishing
+    if len(selected) > settings.max_selections:
+        await interaction.response.send_message(
+            f"⚠️ You can only have {settings.max_selections} game roles maximum in **{guild.name}**!",
+            ephemeral=True
+        )
+        return
+
+    current = {role.id for role in member.roles if role.id in configured}
+    added = [guild.get_role(role_id) for role_id in selected - current]
+    removed = [guild.get_role(role_id) for role_id in current - selected]
+    added = [role for role in added if role]
+    removed = [role for role in removed if role]
+
+    if not added and not removed:
+        await interaction.response.send_message("ℹ️ Your game roles are already up to date.", ephemeral=True)
+        return
+
+    # The role edit and journal writes can outlast the 3 second interaction deadline
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    # Keep every non game role as is and swap the game roles in one request
+    roles = [role for role in member.roles if not role.is_default() and role not in removed] + added
+    try:
+        await role_journal.edit_roles(member, roles, added, removed, SOURCE_PICKER, "Game roles selected through role picker")
+    except discord.Forbidden:
+        await interaction.followup.send("❌ I don't have permission to manage some of these roles!", ephemeral=True)
+        return
+    except discord.HTTPException as e:
+        logger.error(f'Error setting game roles for {member} in {guild.name} through picker: {e}')
+        await interaction.followup.send("❌ Something went wrong updating your roles, please try again.", ephemeral=True)
+        return
+    role_counters.record_uncached(guild, member, [role.id for role in added], [role.id for role in removed])
+
+    logger.info(f'Game roles for {member} in {guild.name} set through picker: +{len(added)} -{len(removed)}')
+
+    embed = discord.Embed(
+        title="🎮 Game Roles Updated!",
+        color=BOT_CONFIG['embed_color']
+    )
+    if added:
+        embed.add_field(name="Added", value=", ".join(role.mention for role in added), inline=False)
+    if removed:
+        embed.add_field(name="Removed", value=", ".join(role.mention for role in removed), inline=False)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+class GameRoleSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'gameroles:select'):
+    """Select menu of a game role picker panel, routed by custom_id"""
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        # The select is rebuilt from the message, options and picked values included
+        return cls(item)
+
+    async def callback(self, interaction):
+        await apply_game_roles(interaction, [int(value) for value in self.item.values])
+
+class GameRoleClear(discord.ui.DynamicItem[discord.ui.Button], template=r'gameroles:clear'):
+    """Button that removes all game roles, routed by custom_id"""
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(item)
+
+    async def callback(self, interaction):
+        await apply_game_roles(interaction, [])
@@ -0,0 +1,118 @@
+import time
+import asyncio
+import logging
+from config import get_verification_settings, get_game_role_settings
+from member_cache import ensure_chunked
+
+logger = logging.getLogger('discord_bot.role_stats')
+
+class RoleCounters:
+    """Per guild member counts of the game and verification roles, kept up to date from events
+
+    Counts are seeded once from the member cache. After that, member updates
+    adjust them, so reading them costs O(configured roles) whatever the guild size.
+    """
+
+    def __init__(self):
+        self.guilds = {}  # guild_id -> {role_id: member count}
+        self.counting = set()  # (guild_id, role_id) of roles waiting to be counted
+
+    def tracked_role_ids(self, guild_id):
+        """Get the ids of the roles counted for a guild"""
+        role_ids = set(get_game_role_settings(guild_id).game_roles.role_ids)
+        verify_role_id = get_verification_settings(guild_id).role_id
+        if verify_role_id:
+            role_ids.add(verify_role_id)
+        return role_ids
+
+    def is_seeded(self, guild_id):
+        """Check if the counts of a guild have been seeded"""
+        return guild_id in self.guilds
+
+    async def ensure_seeded(self, guild):
+        """Seed the counts of a guild from its full member list, once"""
+        if guild.id in self.guilds:
+            return
+
+        await ensure_chunked(guild)
+        start_time = time.perf_counter()
+        counts = dict.fromkeys(self.tracked_role_ids(guild.id), 0)
+        for member in guild.members:
+            for role in member.roles:
+                if role.id in counts:
+                    counts[role.id] += 1
+        self.guilds[guild.id] = counts
+
+        elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+        logger.info(f'Seeded role counters for {guild.name} from {len(guild.members)} members in {elapsed}ms')
+
+    def counts(self, guild):
+        """Get the member count of each tracked role, or None if the guild is not seeded
+
+        Roles configured after seeding are missing until counted in the background.
+        """
+        counts = self.guilds.get(guild.id)
+        if counts is None:
+            return None
+
+        result = {}
+        for role_id in self.tracked_role_ids(guild.id):
+            if role_id in counts:
+                result[role_id] = counts[role_id]
+            else:
+                # Configured after seeding, left out until it has been counted
+                self.track(guild, role_id)
+        return result
+
+    def track(self, guild, role_id):
+        """Start counting a role configured after the guild was seeded, outside the calling command"""
+        counts = self.guilds.get(guild.id)
+        if counts is None or role_id in counts or (guild.id, role_id) in self.counting:
+            return
+        self.counting.add((guild.id, role_id))
+        asyncio.get_running_loop().call_soon(self.count_role, guild, role_id)
+
+    def count_role(self, guild, role_id):
+        """Count the cached members of a newly tracked role, apply() keeps the count current from then on"""
+        self.counting.discard((guild.id, role_id))
+        counts = self.guilds.get(guild.id)
+        if counts is None or role_id in counts:
+            return
+        # One step, so no role change event can land between counting and tracking
+        role = guild.get_role(role_id)
+        counts[role_id] = len(role.members) if role else 0
+
+    def apply(self, guild_id, added_ids=(), removed_ids=()):
+        """Adjust the counts for roles given to and taken from one member"""
+        counts = self.guilds.get(guild_id)
+        if counts is None:
+            return
+        for role_id in added_ids:
+            if role_id in counts:
+                counts[role_id] += 1
+        for role_id in removed_ids:
+            if role_id in counts:
+                counts[role_id] = max(0, counts[role_id] - 1)
+
+    def member_updated(self, before, after):
+        """Adjust the counts after a cached member's roles changed"""
+        if before.roles == after.roles:
+            return
+        before_ids = {role.id for role in before.roles}
+        after_ids = {role.id for role in after.roles}
+        self.apply(after.guild.id, after_ids - before_ids, before_ids - after_ids)
+
+    def record_uncached(self, guild, member, added_ids=(), removed_ids=()):
+        """Adjust the counts for a role change made by the bot to a member outside the cache
+
+        Cached members are counted from on_member_update instead, which would
+        otherwise count the same change twice.
+        """
+        if guild.get_member(member.id) is None:
+            self.apply(guild.id, added_ids, removed_ids)
+
+    def forget_guild(self, guild_id):
+        """Drop the counts of a guild the bot has left"""
+        self.guilds.pop(guild_id, None)
+
+role_counters = RoleCounters()
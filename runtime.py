@@ -0,0 +1,75 @@
+import json
+import asyncio
+import logging
+import discord
+from config import RUNTIME_CONFIG
+
+logger = logging.getLogger('discord_bot.runtime')
+
+# What run() ended up using, discord.py already decodes with orjson by itself when it is installed
+active_runtime = {'profile': 'default', 'loop': 'asyncio', 'json': 'orjson' if discord.utils.HAS_ORJSON else 'json'}
+
+def is_fast():
+    """Check if the fast runtime profile is active"""
+    return RUNTIME_CONFIG['profile'] == 'fast'
+
+def load_json_codec():
+    """Get the fastest installed JSON codec as (name, loads, dumps), falling back to the standard library"""
+    try:
+        import orjson
+        return 'orjson', orjson.loads, lambda obj: orjson.dumps(obj).decode('utf-8')
+    except ImportError:
+        pass
+
+    try:
+        import msgspec
+        encoder = msgspec.json.Encoder()
+        return 'msgspec', msgspec.json.decode, lambda obj: encoder.encode(obj).decode('utf-8')
+    except ImportError:
+        pass
+
+    try:
+        import ujson
+        return 'ujson', ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=True, escape_forward_slashes=False)
+    except ImportError:
+        pass
+
+    return 'json', json.loads, lambda obj: json.dumps(obj, separators=(',', ':'), ensure_ascii=True)
+
+def install_json_codec(name, loads, dumps):
+    """Use a JSON codec for gateway payloads and HTTP responses
+
+    discord.py looks these helpers up on discord.utils at call time, so
+    replacing them covers the gateway, HTTP and interaction parsing.
+    """
+    discord.utils._from_json = loads
+    discord.utils._to_json = dumps
+    return name
+
+def load_loop_factory():
+    """Get uvloop's event loop factory, or None if uvloop is not installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+def run(coro):
+    """Run the bot's main coroutine on the configured runtime profile"""
+    loop_factory = None
+    if is_fast():
+        active_runtime['profile'] = 'fast'
+
+        loop_factory = load_loop_factory()
+        if loop_factory is not None:
+            active_runtime['loop'] = 'uvloop'
+        else:
+            logger.warning('RUNTIME_PROFILE=fast but uvloop is not installed, using the default asyncio event loop')
+
+        active_runtime['json'] = install_json_codec(*load_json_codec())
+        if active_runtime['json'] == 'json':
+            logger.warning('RUNTIME_PROFILE=fast but no fast JSON codec is installed (orjson, msgspec or ujson), using the json module')
+
+    logger.info(f"Runtime profile {active_runtime['profile']}: {active_runtime['loop']} event loop, {active_runtime['json']} codec")
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coro)
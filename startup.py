@@ -0,0 +1,42 @@
+import time
+import logging
+
+logger = logging.getLogger('discord_bot.startup')
+
+class StartupProfiler:
+    """Records how long each phase of the bot's startup took"""
+
+    def __init__(self):
+        # Imported before anything else in main.py, so this is as close to process start as we get
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.phases = []  # (phase name, phase duration in seconds)
+
+    def mark(self, phase):
+        """Record the end of a startup phase, ignoring phases that were already recorded"""
+        if self.has_phase(phase):
+            return
+
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_time))
+        self.last_time = now
+
+    def has_phase(self, phase):
+        """Check if a phase has been recorded"""
+        return any(name == phase for name, _ in self.phases)
+
+    def total(self):
+        """Get the time from process start to the last recorded phase in seconds"""
+        return self.last_time - self.start_time
+
+    def breakdown(self):
+        """Get the startup breakdown as human readable lines"""
+        lines = [f"{name}: {duration * 1000:.1f}ms" for name, duration in self.phases]
+        lines.append(f"total: {self.total() * 1000:.1f}ms")
+        return lines
+
+    def log_breakdown(self):
+        """Write the startup breakdown to the log"""
+        logger.info('Startup breakdown: ' + ', '.join(self.breakdown()))
+
+startup_profiler = StartupProfiler()
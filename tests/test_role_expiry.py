@@ -0,0 +1,96 @@
+import asyncio
+import role_expiry
+from role_expiry import RoleExpiry, TimerWheel, entry_key
+
+GUILD_ID = 1
+MEMBER_ID = 10
+ROLE_ID = 20
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.name = f'role{role_id}'
+
+class FakeMember:
+    def __init__(self, member_id, role):
+        self.id = member_id
+        self.roles = [role]
+
+    async def send(self, **kwargs):
+        pass
+
+class FakeGuild:
+    def __init__(self, role, member):
+        self.id = GUILD_ID
+        self.name = 'guild'
+        self.role = role
+        self.member = member
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+    def get_member(self, member_id):
+        return self.member if member_id == self.member.id else None
+
+    def get_channel(self, channel_id):
+        return None
+
+class FakeBot:
+    def __init__(self, guild):
+        self.guild = guild
+
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+
+class FakeJournal:
+    def __init__(self):
+        self.removed = []
+
+    async def remove_roles(self, member, *roles, source, reason):
+        self.removed.append((member.id, [role.id for role in roles]))
+        for role in roles:
+            member.roles.remove(role)
+
+def test_persisted_expiry_is_applied_without_settings(tmp_path, monkeypatch):
+    path = str(tmp_path / 'role_expiry.bin')
+    before = RoleExpiry()
+    before.path = path
+    before.schedule(GUILD_ID, MEMBER_ID, ROLE_ID, 1)
+    before.write(*before.snapshot())
+
+    # A fresh process: the snapshot is loaded, the in-memory role settings are empty
+    after = RoleExpiry()
+    after.path = path
+    after.load()
+    after.due.extend(after.wheel.advance(after.wheel.now + 1))
+
+    role = FakeRole(ROLE_ID)
+    member = FakeMember(MEMBER_ID, role)
+    journal = FakeJournal()
+    monkeypatch.setattr(role_expiry, 'role_journal', journal)
+    asyncio.run(after.expire_batch(FakeBot(FakeGuild(role, member))))
+
+    assert journal.removed == [(MEMBER_ID, [ROLE_ID])]
+    assert role not in member.roles
+
+def test_cancel_role_drops_scheduled_expiries():
+    expiry = RoleExpiry()
+    expiry.schedule(GUILD_ID, MEMBER_ID, ROLE_ID, expiry.wheel.now + 60)
+    expiry.schedule(GUILD_ID, MEMBER_ID + 1, ROLE_ID + 1, expiry.wheel.now + 60)
+
+    assert asyncio.run(expiry.cancel_role(ROLE_ID)) == 1
+    assert entry_key(MEMBER_ID, ROLE_ID) not in expiry.wheel
+    assert entry_key(MEMBER_ID + 1, ROLE_ID + 1) in expiry.wheel
+
+def test_wheel_keeps_one_copy_of_a_churned_key():
+    wheel = TimerWheel(0)
+    key = entry_key(MEMBER_ID, ROLE_ID)
+    for deadline in range(1000, 0, -1):
+        wheel.schedule(key, deadline)
+        wheel.cancel(key)
+        wheel.schedule(key, deadline + 500)
+
+    slots = [slot for level in wheel.levels for slot in level] + [wheel.overflow]
+    assert sum(len(slot) for slot in slots) == 1
+    assert wheel.advance(600) == [key]
+    assert len(wheel) == 0 and not wheel.slots
@@ -0,0 +1,25 @@
+import threading
+from sampling_profiler import SamplingProfiler
+
+def on_message():
+    process_commands()
+
+def process_commands():
+    busy_command()
+
+def busy_command():
+    pass
+
+def test_command_inside_on_message_is_attributed_to_the_command():
+    labels = {
+        on_message.__code__: 'event:on_message',
+        busy_command.__code__: 'command:busy',
+    }
+    profiler = SamplingProfiler(threading.get_ident(), labels)
+    profiler.stacks[(on_message.__code__, process_commands.__code__, busy_command.__code__)] = 5
+    profiler.stacks[(on_message.__code__, process_commands.__code__)] = 2
+    profiler.samples = 7
+
+    handlers = profiler.by_handler()
+    assert handlers['command:busy'] == 5
+    assert handlers['event:on_message'] == 2